@@ -0,0 +1,29 @@
+"""
+Benchmark of the fleet simulator, with an increasing number of processes.
+Run from the repository root: python -m benchmarks.bench_fleet
+"""
+import os
+import random
+
+from src.fleet import RobotSpec, simulate_fleet
+
+
+def make_fleet(robots: int, size: int, commands: int, seed: int = 0) -> list[RobotSpec]:
+    rng = random.Random(seed)
+    specs = []
+    for _ in range(robots):
+        obstacles = {(rng.randrange(size), rng.randrange(size)) for _ in range(size * size // 20)}
+        obstacles.discard((0, 0))
+        specs.append(RobotSpec("".join(rng.choice("ffffflr") for _ in range(commands)),
+                               tuple(obstacles), (size, size), drain=0))
+    return specs
+
+
+if __name__ == "__main__":
+    fleet = make_fleet(1000, 50, 500)
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        report = simulate_fleet(fleet, workers)
+        print(f"{workers} workers: {report.elapsed:.2f} s, {report.throughput:.0f} commands/s, "
+              f"coverage {report.coverage:.1%}, {report.obstacle_hits} obstacle hits")
+        workers *= 2
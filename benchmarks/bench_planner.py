@@ -0,0 +1,30 @@
+"""
+Benchmark of the coverage planner.
+Run from the repository root: python -m benchmarks.bench_planner
+"""
+import random
+import time
+
+from src.planner import plan_coverage
+
+
+def bench(width: int, height: int, obstacle_ratio: float, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    obstacles = {(rng.randrange(width), rng.randrange(height)) for _ in range(int(width * height * obstacle_ratio))}
+    obstacles.discard((0, 0))
+
+    start = time.perf_counter()
+    commands = plan_coverage(width, height, obstacles)
+    elapsed = time.perf_counter() - start
+
+    rotations = commands.count("l") + commands.count("r")
+    print(f"{width}x{height}, {len(obstacles)} obstacles: {elapsed:.2f} s, "
+          f"{len(commands)} commands, {rotations} rotations")
+
+
+if __name__ == "__main__":
+    bench(100, 100, 0.0)
+    bench(100, 100, 0.05)
+    bench(1000, 1000, 0.0)
+    bench(1000, 1000, 0.01)
+    bench(1000, 1000, 0.05)
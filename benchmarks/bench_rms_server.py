@@ -0,0 +1,48 @@
+"""
+Benchmark of the RMS server: commands per second over one connection, binary and text mode,
+with simulated robots (see sim/).
+Run from the repository root: python -m benchmarks.bench_rms_server
+"""
+import asyncio
+import time
+
+from sim.GPIO import SimGPIO
+from sim.board import I2C
+from sim.ibs import IBS
+from sim.world import SimWorld
+from src.cleaning_robot import CleaningRobot
+from src.rms_server import RMSClient, RMSServer
+
+
+def make_robots(count: int) -> list[CleaningRobot]:
+    robots = []
+    for _ in range(count):
+        world = SimWorld(size=(64, 64), drain=0)
+        robot = CleaningRobot(gpio=SimGPIO(world), ibs=IBS(I2C(), world=world))
+        robot.initialize_robot()
+        robots.append(robot)
+    return robots
+
+
+async def bench(binary: bool, robots: int, commands: int, window: int) -> None:
+    server = await RMSServer(make_robots(robots)).start_tcp()
+    client = await RMSClient.connect_tcp(*server.sockets[0].getsockname()[:2], binary=binary)
+    sequence = [(i % robots, "frfl"[i // robots % 4]) for i in range(commands)]
+
+    start = time.perf_counter()
+    for offset in range(0, commands, window):
+        await client.execute_many(sequence[offset:offset + window])
+    elapsed = time.perf_counter() - start
+
+    await client.close()
+    server.close()
+    await server.wait_closed()
+    mode = "binary" if binary else "text"
+    print(f"{mode}, {robots} robots, {window} commands in flight: {commands / elapsed:.0f} commands/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(True, 8, 10_000, 64))  # Warm up
+    for window in (1, 64, 1024):
+        asyncio.run(bench(True, 8, 50_000, window))
+        asyncio.run(bench(False, 8, 50_000, window))
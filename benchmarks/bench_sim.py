@@ -0,0 +1,44 @@
+"""
+Benchmark of the simulation backend.
+Run from the repository root: python -m benchmarks.bench_sim
+"""
+import random
+import time
+
+import sim.GPIO as GPIO
+from sim.board import I2C
+from sim.ibs import IBS
+from sim.world import SimWorld
+from src.cleaning_robot import CleaningRobot
+
+
+def bench_pins(operations: int) -> None:
+    GPIO.use_world(SimWorld())
+    start = time.perf_counter()
+    for i in range(operations):
+        GPIO.output(CleaningRobot.RECHARGE_LED_PIN, i & 1)
+        GPIO.input(CleaningRobot.GARBAGE_BAG_PIN)
+    elapsed = time.perf_counter() - start
+    print(f"{2 * operations} pin operations: {elapsed:.2f} s, {2 * operations / elapsed / 1e6:.1f} M ops/s")
+
+
+def bench_robot(size: int, commands: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    obstacles = {(rng.randrange(size), rng.randrange(size)) for _ in range(size * size // 20)}
+    obstacles.discard((0, 0))
+    world = SimWorld(obstacles, size=(size, size), drain=0)
+    robot = CleaningRobot(gpio=GPIO.SimGPIO(world), ibs=IBS(I2C(), world=world))
+    robot.initialize_robot()
+    sequence = "".join(rng.choice("ffffflr") for _ in range(commands))
+
+    start = time.perf_counter()
+    for command in sequence:
+        robot.execute_command(command)
+    elapsed = time.perf_counter() - start
+    print(f"{commands} commands in a {size}x{size} room: {elapsed:.2f} s, {commands / elapsed:.0f} commands/s, "
+          f"{world.cells_moved} cells moved")
+
+
+if __name__ == "__main__":
+    bench_pins(1_000_000)
+    bench_robot(100, 100_000)
@@ -0,0 +1,41 @@
+"""
+Benchmark of the robot startup: importing the robot module, creating a robot and executing its first command,
+each measured in a fresh interpreter.
+Run from the repository root: python -m benchmarks.bench_startup [backend]
+(auto by default, i.e., the real hardware on a Raspberry Pi; use sim elsewhere)
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+_PROBE = """
+import json, time
+start = time.perf_counter()
+from src.cleaning_robot import CleaningRobot, BACKEND
+imported = time.perf_counter()
+robot = CleaningRobot()
+robot.initialize_robot()
+created = time.perf_counter()
+if BACKEND.name != "mock":  # The mocks return no battery reading
+    robot.execute_command("r")
+done = time.perf_counter()
+print(json.dumps({"backend": BACKEND.name, "import": imported - start, "create": created - imported,
+                  "first_command": done - created, "total": done - start}))
+"""
+
+
+def bench(backend: str, runs: int = 10) -> None:
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", _PROBE], capture_output=True, text=True, check=True,
+                                env={**os.environ, "CLEANING_ROBOT_BACKEND": backend})
+        samples.append(json.loads(result.stdout.splitlines()[-1]))
+    print(f"{samples[0]['backend']} backend, median of {runs} cold starts:", ", ".join(
+        f"{stage} {statistics.median(sample[stage] for sample in samples) * 1000:.1f} ms"
+        for stage in ("import", "create", "first_command", "total")))
+
+
+if __name__ == "__main__":
+    bench(sys.argv[1] if len(sys.argv) > 1 else "auto")
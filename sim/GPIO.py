@@ -0,0 +1,169 @@
+"""
+Simulation backend for RPi.GPIO: pin levels live in a SimWorld, whose robot body is moved by the motor pins.
+Select it by setting CLEANING_ROBOT_BACKEND=sim before importing src.cleaning_robot.
+"""
+from sim.world import SimWorld, RISING, FALLING, BOTH
+
+BCM = 11
+BOARD = 10
+HARD_PWM = 43
+HIGH = 1
+I2C = 42
+IN = 1
+LOW = 0
+OUT = 0
+PUD_DOWN = 21
+PUD_OFF = 20
+PUD_UP = 22
+RPI_INFO = {'MANUFACTURER': 'Sony', 'P1_REVISION': 3, 'PROCESSOR': 'BCM2837', 'RAM': '1G', 'REVISION': 'a020d3', 'TYPE': 'Pi 3 Model B+'}
+RPI_REVISION = 3
+SERIAL = 40
+SPI = 41
+UNKNOWN = -1
+VERSION = '0.7.0'
+
+world = None
+_gpio = None
+
+
+class SimGPIO:
+    """
+    The GPIO functions bound to one world, so that robots simulated side by side in one process
+    do not share pins, e.g., CleaningRobot(gpio=SimGPIO(SimWorld()))
+    """
+
+    BOARD = BOARD
+    BCM = BCM
+    IN = IN
+    OUT = OUT
+    HIGH = HIGH
+    LOW = LOW
+    RISING = RISING
+    FALLING = FALLING
+    BOTH = BOTH
+
+    def __init__(self, world: SimWorld):
+        self.world = world
+        # Bound methods of the world, so that a pin read or write is a single call
+        self.output = world.output
+        self.input = world.input
+        self._mode = None
+        self._functions = {}
+
+    def setmode(self, mode):
+        self._mode = mode
+
+    def getmode(self):
+        return self._mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, channel, direction, initial=UNKNOWN, pull_up_down=PUD_OFF):
+        for pin in channel if isinstance(channel, (list, tuple)) else (channel,):
+            self._functions[pin] = direction
+            if direction == OUT and initial != UNKNOWN:
+                self.world.output(pin, initial)
+
+    def gpio_function(self, channel):
+        return self._functions.get(channel, IN)
+
+    def add_event_detect(self, channel, edge, callback=None, bouncetime=None):
+        self.world.add_event_detect(channel, edge, callback)
+
+    def add_event_callback(self, channel, callback):
+        self.world.add_event_callback(channel, callback)
+
+    def remove_event_detect(self, channel):
+        self.world.remove_event_detect(channel)
+
+    def event_detected(self, channel):
+        return False
+
+    def cleanup(self, channel=None):
+        if channel is None:
+            self._functions.clear()
+        else:
+            for pin in channel if isinstance(channel, (list, tuple)) else (channel,):
+                self._functions.pop(pin, None)
+
+    def PWM(self, channel, frequency):
+        return PWM(channel, frequency, self.world)
+
+
+def use_world(new_world: SimWorld) -> SimWorld:
+    """
+    Make the GPIO functions of this module act on another world
+    :return: the new world
+    """
+    global world, _gpio, output, input
+    world = new_world
+    _gpio = SimGPIO(new_world)
+    output = _gpio.output
+    input = _gpio.input
+    return new_world
+
+
+def setmode(mode):
+    _gpio.setmode(mode)
+
+
+def getmode():
+    return _gpio.getmode()
+
+
+def setwarnings(flag):
+    pass
+
+
+def setup(channel, direction, initial=UNKNOWN, pull_up_down=PUD_OFF):
+    _gpio.setup(channel, direction, initial, pull_up_down)
+
+
+def gpio_function(channel):
+    return _gpio.gpio_function(channel)
+
+
+def add_event_detect(channel, edge, callback=None, bouncetime=None):
+    _gpio.add_event_detect(channel, edge, callback, bouncetime)
+
+
+def add_event_callback(channel, callback):
+    _gpio.add_event_callback(channel, callback)
+
+
+def remove_event_detect(channel):
+    _gpio.remove_event_detect(channel)
+
+
+def event_detected(channel):
+    return False
+
+
+def cleanup(channel=None):
+    _gpio.cleanup(channel)
+
+
+class PWM:
+
+    def __init__(self, channel, frequency, sim_world: SimWorld | None = None):
+        self.channel = channel
+        self.frequency = frequency
+        self.dutycycle = 0
+        self.world = world if sim_world is None else sim_world
+
+    def start(self, dutycycle):
+        self.ChangeDutyCycle(dutycycle)
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def ChangeDutyCycle(self, dutycycle):
+        self.dutycycle = dutycycle
+        self.world.duty[self.channel] = dutycycle
+
+    def stop(self):
+        self.ChangeDutyCycle(0)
+
+
+use_world(SimWorld())
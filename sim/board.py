@@ -0,0 +1,5 @@
+# Simulation counterpart of https://github.com/adafruit/Adafruit_Blinka
+class I2C:
+
+    def __init__(self):
+        pass
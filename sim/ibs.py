@@ -0,0 +1,19 @@
+from sim import GPIO
+from sim.board import I2C
+from sim.world import SimWorld
+
+
+class IBS:
+    """
+    Battery sensor reading the charge of a simulated world, by default the one of sim.GPIO
+    """
+
+    def __init__(self, i2c: I2C, address: int = 0x77, world: SimWorld | None = None):
+        self.address = address
+        self.world = world
+
+    def get_charge_left(self) -> int:
+        """
+        :return: the charge left (i.e., a percentage value from 0 to 100)
+        """
+        return (GPIO.world if self.world is None else self.world).charge_left()
@@ -0,0 +1,181 @@
+"""
+State of the virtual hardware: the level of every pin, the room and the pose of the robot body in it,
+the battery and the scripted container events.
+"""
+from typing import Iterable
+
+HEADINGS = "NESW"
+DX = (0, 1, 0, -1)
+DY = (1, 0, -1, 0)
+
+RISING = 31
+FALLING = 32
+BOTH = 33
+
+PIN_COUNT = 64
+
+
+class SimWorld:
+    """
+    A room with obstacles and a robot body driven by the motor pins, as seen through the GPIO pins and the IBS.
+    The body moves by one cell (or a quarter turn) each time a running motor is stopped, and by one more cell
+    each time the infrared sensor is read while the wheel motor runs, which is when a robot moving
+    several cells with one activation checks the cell ahead.
+    """
+
+    def __init__(self, obstacles: Iterable[tuple[int, int]] = (), size: tuple[int, int] | None = None,
+                 pose: tuple[int, int, str] = (0, 0, "N"), charge: float = 100.0, drain: float = 0.1,
+                 events: Iterable[tuple[int, int, int]] = (), infrared: int = 15,
+                 wheel: tuple[int, int] = (22, 18), rotation: tuple[int, int] = (29, 31), standby: int = 33,
+                 containers: Iterable[int] = (9, 10, 11)):
+        """
+        :param obstacles: cells containing an obstacle
+        :param size: (width, height) of the room, surrounded by walls; None for an unbounded room
+        :param pose: (x, y, heading) of the robot body
+        :param charge: battery charge left, in percent
+        :param drain: charge used by each motor activation, in percent
+        :param events: (activation, pin, level) container events, applied once the motors have been
+            activated that many times, e.g., (50, 9, 0) empties the garbage bag at the 50th activation
+        :param infrared: the pin of the infrared sensor
+        :param wheel: the (IN1, IN2) pins of the wheel motor, which moves forward when IN1 is high
+        :param rotation: the (IN1, IN2) pins of the rotation motor, which turns left when IN1 is high
+        :param standby: the STBY pin, low while both motors are disabled
+        :param containers: the pins of the container sensors, high while the containers are fine
+        """
+        self.levels = bytearray(PIN_COUNT)
+        for pin in containers:
+            self.levels[pin] = 1
+        self.duty = {}  # PWM channel -> duty cycle
+        self.obstacles = set(obstacles)
+        self.size = size
+        self.x, self.y = pose[0], pose[1]
+        self.heading = HEADINGS.index(pose[2])
+        self.charge = float(charge)
+        self.drain = drain
+        self.events = sorted(events, reverse=True)  # Popped from the end, earliest first
+        self.infrared = infrared
+        self.wheel = wheel
+        self.rotation = rotation
+        self.standby = standby
+        self.motor_pins = frozenset((*wheel, *rotation, standby))
+
+        self.callbacks = {}  # Pin -> (edge, [callbacks])
+        self.activations = 0
+        self.cells_moved = 0
+        self.collisions = 0  # Moves into an obstacle or a wall, which the body refuses
+        self._wheel_running = False
+        self._rotation_running = 0  # 1 turning left, -1 turning right, 0 stopped
+        self._facing_obstacle = False  # The last infrared read during the current move saw an obstacle
+
+    @property
+    def pose(self) -> tuple[int, int, str]:
+        return self.x, self.y, HEADINGS[self.heading]
+
+    def blocked(self, x: int, y: int) -> bool:
+        if (x, y) in self.obstacles:
+            return True
+        if self.size is None:
+            return False
+        return not (0 <= x < self.size[0] and 0 <= y < self.size[1])
+
+    def obstacle_ahead(self) -> bool:
+        return self.blocked(self.x + DX[self.heading], self.y + DY[self.heading])
+
+    def charge_left(self) -> int:
+        return max(int(self.charge), 0)
+
+    def output(self, channel, value) -> None:
+        """
+        Same as RPi.GPIO.output: channel and value may be lists, or a list of channels with one value
+        """
+        levels = self.levels
+        if channel.__class__ is int:
+            levels[channel] = 1 if value else 0
+            if channel in self.motor_pins:
+                self._update_motors()
+            return
+
+        if value.__class__ in (list, tuple):
+            for pin, pin_value in zip(channel, value):
+                levels[pin] = 1 if pin_value else 0
+        else:
+            level = 1 if value else 0
+            for pin in channel:
+                levels[pin] = level
+        if not self.motor_pins.isdisjoint(channel):
+            self._update_motors()
+
+    def input(self, channel: int) -> int:
+        if channel != self.infrared:
+            return self.levels[channel]
+        if self._wheel_running:
+            # The robot checks the next cell as it reaches a cell: the body completed one cell of the move
+            self._move()
+            self._facing_obstacle = self.obstacle_ahead()
+            return 1 if self._facing_obstacle else 0
+        return 1 if self.obstacle_ahead() else 0
+
+    def set_input(self, channel: int, value) -> None:
+        """
+        Change the level of an input pin, calling the callbacks registered for the edge
+        """
+        level = 1 if value else 0
+        if self.levels[channel] == level:
+            return
+        self.levels[channel] = level
+        detection = self.callbacks.get(channel)
+        if detection is None:
+            return
+        edge, callbacks = detection
+        if edge == BOTH or edge == (RISING if level else FALLING):
+            for callback in list(callbacks):
+                callback(channel)
+
+    def add_event_detect(self, channel: int, edge: int, callback=None) -> None:
+        self.callbacks[channel] = (edge, [callback] if callback is not None else [])
+
+    def add_event_callback(self, channel: int, callback) -> None:
+        self.callbacks[channel][1].append(callback)
+
+    def remove_event_detect(self, channel: int) -> None:
+        self.callbacks.pop(channel, None)
+
+    def _update_motors(self) -> None:
+        levels = self.levels
+        enabled = levels[self.standby]
+        in1, in2 = self.wheel
+        wheel_running = bool(enabled and levels[in1] and not levels[in2])
+        in1, in2 = self.rotation
+        rotation_running = (levels[in1] - levels[in2]) if enabled else 0
+
+        if wheel_running != self._wheel_running:
+            self._wheel_running = wheel_running
+            if wheel_running:
+                self._facing_obstacle = False
+                self._activated()
+            elif not self._facing_obstacle:
+                self._move()
+        if rotation_running != self._rotation_running:
+            turning = self._rotation_running
+            self._rotation_running = rotation_running
+            if rotation_running:
+                self._activated()
+            else:
+                self.heading = (self.heading - turning) % 4
+
+    def _move(self) -> None:
+        x = self.x + DX[self.heading]
+        y = self.y + DY[self.heading]
+        if self.blocked(x, y):
+            self.collisions += 1
+            return
+        self.x, self.y = x, y
+        self.cells_moved += 1
+
+    def _activated(self) -> None:
+        self.activations += 1
+        self.charge -= self.drain
+        events = self.events
+        while events and events[-1][0] <= self.activations:
+            _, pin, level = events.pop()
+            self.set_input(pin, level)
@@ -0,0 +1,99 @@
+import threading
+import time
+
+from src.cleaning_robot import CleaningRobotError
+
+
+class BatteryMonitor:
+    """
+    Polls the IBS on a background thread and caches the last charge reading,
+    so that the robot does not need an I2C transaction for every command.
+    """
+
+    def __init__(self, ibs, interval: float = 5.0, max_age: float = 30.0, smoothing: float = 0.2):
+        """
+        :param ibs: the IBS to poll
+        :param interval: seconds between two readings
+        :param max_age: seconds after which a cached reading is stale and the IBS is queried directly
+        :param smoothing: weight of the newest reading in the exponential moving average (0 < smoothing <= 1)
+        """
+        if interval <= 0 or max_age <= 0:
+            raise CleaningRobotError("interval and max_age must be positive")
+        if not 0 < smoothing <= 1:
+            raise CleaningRobotError("smoothing must be in (0, 1]")
+
+        self.ibs = ibs
+        self.interval = interval
+        self.max_age = max_age
+        self.smoothing = smoothing
+
+        # (charge left, smoothed charge left, monotonic time of the reading), replaced atomically
+        self._reading = None
+        # Held during an IBS transaction: the poller and a command reading a stale value never share the bus
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="battery-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def sample(self) -> int:
+        """
+        Query the IBS and update the cached readings
+        :return: the charge left
+        """
+        with self._lock:
+            return self._sample()
+
+    def _sample(self) -> int:
+        charge_left = self.ibs.get_charge_left()
+        previous = self._reading
+        if previous is None:
+            smoothed = float(charge_left)
+        else:
+            smoothed = previous[1] + self.smoothing * (charge_left - previous[1])
+        self._reading = (charge_left, smoothed, time.monotonic())
+        return charge_left
+
+    def _fresh_reading(self) -> tuple[int, float, float]:
+        reading = self._reading
+        with self._lock:
+            if self._reading is reading:  # The poller did not sample while we waited for the bus
+                self._sample()
+            return self._reading
+
+    def is_stale(self) -> bool:
+        reading = self._reading
+        return reading is None or time.monotonic() - reading[2] > self.max_age
+
+    def charge_left(self) -> int:
+        """
+        :return: the last charge read from the IBS, read again if the cached value is stale
+        """
+        if self.is_stale():
+            return self._fresh_reading()[0]
+        return self._reading[0]
+
+    def smoothed_charge_left(self) -> float:
+        """
+        :return: the exponential moving average of the readings
+        """
+        if self.is_stale():
+            return self._fresh_reading()[1]
+        return self._reading[1]
@@ -0,0 +1,342 @@
+import os
+import struct
+import zlib
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+
+# Robot state flags
+RECHARGE_LED_ON = 1
+CLEANING_SYSTEM_ON = 2
+CHARGE_LOW = 4
+CHARGE_KNOWN = 8  # The charge has been read, CHARGE_LOW is meaningful
+GARBAGE_BAG_LED_ON = 16
+GARBAGE_BAG_OK = 32
+SOAP_CONTAINER_LED_ON = 64
+SOAP_CONTAINER_OK = 128
+WATER_CONTAINER_LED_ON = 256
+WATER_CONTAINER_OK = 512
+POSE_UNKNOWN = 1024  # The robot was not initialized
+OBSTACLE = 2048  # Journal only: the step found an obstacle in front of the robot
+TELEMETRY = 4096  # Journal only: the step carries the record of the step in the TelemetryLog
+
+NO_HEADING = 255
+NO_CHARGE = -1
+TELEMETRY_RECORD_SIZE = 28  # src.telemetry.RECORD.itemsize, known without importing NumPy
+
+FORMAT_VERSION = 3
+
+
+class Checkpointer:
+    """
+    Saves the state of a robot in a directory so that, after a power loss, it resumes where it was instead of
+    starting again from (0,0,N) with an empty map.
+    Every step appends a small record to a journal (one write, a few microseconds), and every
+    snapshot_every steps the whole state, RoomMap and TelemetryLog included, is written to a snapshot file
+    which atomically replaces the previous one, and the journal starts again.
+    The journal records of a robot with a TelemetryLog carry the telemetry record of their step and the flush
+    cursor of the log, so the telemetry is restored up to the last step too.
+    A record cut by the power loss fails its CRC and is ignored, with the ones after it.
+    """
+
+    SNAPSHOT_FILE = "robot.snapshot"
+    JOURNAL_FILE = "robot.journal"
+
+    # Snapshot layout: header, robot state, sections (tag, length, payload), CRC32 of everything before it
+    _SNAPSHOT_HEADER = struct.Struct("<6sHQ")  # magic, format version, sequence number of the last step included
+    _SNAPSHOT_MAGIC = b"CRSNAP"
+    _STATE = struct.Struct("<iiBHh")  # x, y, heading, flags, charge
+    _SECTION = struct.Struct("<cQ")  # tag, payload length
+    _MAP_SECTION = b"M"
+    _MAP_HEADER = struct.Struct("<qqqq")  # origin x, origin y, width, height, followed by the grid
+    _TELEMETRY_SECTION = b"T"
+    # capacity, steps recorded, steps flushed, steps dropped, followed by the stored records
+    _TELEMETRY_HEADER = struct.Struct("<qqqq")
+    _CRC = struct.Struct("<I")
+
+    # Journal layout: header, then one record per step
+    _JOURNAL_HEADER = struct.Struct("<6sH")  # magic, format version
+    _JOURNAL_MAGIC = b"CRJRNL"
+    _STEP = struct.Struct("<QiiBHhii")  # sequence number, x, y, heading, flags, charge, obstacle x, obstacle y
+    _TELEMETRY_STEP = struct.Struct("<qq")  # steps flushed, steps dropped, followed by the telemetry record
+    _NO_TELEMETRY = bytes(_TELEMETRY_STEP.size + TELEMETRY_RECORD_SIZE)
+
+    def __init__(self, directory: str, snapshot_every: int = 1000, sync: bool = False):
+        """
+        :param directory: where the snapshot and the journal are kept, created if needed
+        :param snapshot_every: number of steps between two snapshots
+        :param sync: if True, every journal record is flushed to the storage with fsync (much slower,
+            but a step is never lost)
+        """
+        if snapshot_every < 1:
+            raise CleaningRobotError("snapshot_every must be a positive number of steps")
+        os.makedirs(directory, exist_ok=True)
+        self.snapshot_path = os.path.join(directory, self.SNAPSHOT_FILE)
+        self.journal_path = os.path.join(directory, self.JOURNAL_FILE)
+        self.snapshot_every = snapshot_every
+        self.sync = sync
+        self.sequence = 0  # Sequence number of the last step recorded
+        self._snapshot_sequence = 0
+        self._journal = None
+
+    @staticmethod
+    def _state(robot: CleaningRobot) -> tuple[int, int, int, int, int]:
+        flags = 0
+        if robot.recharge_led_on:
+            flags |= RECHARGE_LED_ON
+        if robot.cleaning_system_on:
+            flags |= CLEANING_SYSTEM_ON
+        if robot._charge_low is not None:
+            flags |= CHARGE_KNOWN | (CHARGE_LOW if robot._charge_low else 0)
+        if robot.garbage_bag_led_on:
+            flags |= GARBAGE_BAG_LED_ON
+        if robot.garbage_bag_resource_available:
+            flags |= GARBAGE_BAG_OK
+        if robot.soap_container_led_on:
+            flags |= SOAP_CONTAINER_LED_ON
+        if robot.soap_container_resource_available:
+            flags |= SOAP_CONTAINER_OK
+        if robot.water_container_led_on:
+            flags |= WATER_CONTAINER_LED_ON
+        if robot.water_container_resource_available:
+            flags |= WATER_CONTAINER_OK
+        if robot.pos_x is None:
+            flags |= POSE_UNKNOWN
+        heading = NO_HEADING if robot._heading is None else robot._heading
+        charge = NO_CHARGE if robot.last_charge_left is None else robot.last_charge_left
+        return robot.pos_x or 0, robot.pos_y or 0, heading, flags, charge
+
+    @staticmethod
+    def _apply_state(robot: CleaningRobot, x: int, y: int, heading: int, flags: int, charge: int) -> None:
+        if flags & POSE_UNKNOWN:
+            robot.pos_x = robot.pos_y = None
+        else:
+            robot.pos_x, robot.pos_y = x, y
+        robot._heading = None if heading == NO_HEADING else heading
+        robot.recharge_led_on = bool(flags & RECHARGE_LED_ON)
+        robot.cleaning_system_on = bool(flags & CLEANING_SYSTEM_ON)
+        robot._charge_low = bool(flags & CHARGE_LOW) if flags & CHARGE_KNOWN else None
+        robot.last_charge_left = None if charge == NO_CHARGE else charge
+        robot.garbage_bag_led_on = bool(flags & GARBAGE_BAG_LED_ON)
+        robot.garbage_bag_resource_available = bool(flags & GARBAGE_BAG_OK)
+        robot.soap_container_led_on = bool(flags & SOAP_CONTAINER_LED_ON)
+        robot.soap_container_resource_available = bool(flags & SOAP_CONTAINER_OK)
+        robot.water_container_led_on = bool(flags & WATER_CONTAINER_LED_ON)
+        robot.water_container_resource_available = bool(flags & WATER_CONTAINER_OK)
+
+    def record_step(self, robot: CleaningRobot, status: str) -> None:
+        """
+        Append the state of the robot after a step to the journal, taking a snapshot when it is time to.
+        Called by the robot when it is its checkpointer.
+        """
+        if self._journal is None:
+            self._open_journal(truncate=not os.path.exists(self.journal_path))
+        self.sequence += 1
+        x, y, heading, flags, charge = self._state(robot)
+        obstacle_x = obstacle_y = 0
+        if status[0] == "(":
+            obstacle_x, obstacle_y = robot._next_cell()
+            if robot.room_map is None or robot.room_map.is_obstacle(obstacle_x, obstacle_y):
+                flags |= OBSTACLE  # Not a cell held by another robot
+        telemetry = robot.telemetry
+        if telemetry is not None and telemetry.count:
+            flags |= TELEMETRY
+            last = telemetry.records[(telemetry.count - 1) % telemetry.capacity]
+            telemetry_step = self._TELEMETRY_STEP.pack(telemetry._flushed, telemetry.dropped) + last.tobytes()
+        else:
+            telemetry_step = self._NO_TELEMETRY
+        record = self._STEP.pack(self.sequence, x, y, heading, flags, charge, obstacle_x, obstacle_y) + telemetry_step
+        os.write(self._journal, record + self._CRC.pack(zlib.crc32(record)))
+        if self.sync:
+            os.fsync(self._journal)
+        if self.sequence - self._snapshot_sequence >= self.snapshot_every:
+            self.snapshot(robot)
+
+    def _open_journal(self, truncate: bool) -> None:
+        if truncate:
+            self._journal = os.open(self.journal_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            os.write(self._journal, self._JOURNAL_HEADER.pack(self._JOURNAL_MAGIC, FORMAT_VERSION))
+        else:
+            self._journal = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND)
+
+    def snapshot(self, robot: CleaningRobot) -> None:
+        """
+        Write the whole state of the robot, replacing the previous snapshot atomically, and empty the journal
+        """
+        parts = [self._SNAPSHOT_HEADER.pack(self._SNAPSHOT_MAGIC, FORMAT_VERSION, self.sequence),
+                 self._STATE.pack(*self._state(robot))]
+        room_map = robot.room_map
+        if room_map is not None and hasattr(room_map, "grid"):  # A RoomMap
+            grid = room_map.grid
+            payload = self._MAP_HEADER.pack(room_map.origin_x, room_map.origin_y, *grid.shape) + grid.tobytes()
+            parts.append(self._SECTION.pack(self._MAP_SECTION, len(payload)) + payload)
+        elif room_map is not None and hasattr(room_map, "flush"):
+            room_map.flush()  # A ChunkedMap persists itself: its chunks are written with the snapshot
+        if robot.telemetry is not None:
+            telemetry = robot.telemetry
+            payload = self._TELEMETRY_HEADER.pack(telemetry.capacity, telemetry.count, telemetry._flushed,
+                                                  telemetry.dropped) + telemetry.latest().tobytes()
+            parts.append(self._SECTION.pack(self._TELEMETRY_SECTION, len(payload)) + payload)
+        data = b"".join(parts)
+
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data + self._CRC.pack(zlib.crc32(data)))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._snapshot_sequence = self.sequence
+
+        # The steps of the journal are in the snapshot now
+        if self._journal is not None:
+            os.close(self._journal)
+        self._open_journal(truncate=True)
+
+    def restore(self, robot: CleaningRobot) -> bool:
+        """
+        Bring the robot back to its last saved state: the snapshot, then the steps of the journal after it.
+        A RoomMap and a TelemetryLog are created if the robot has none and the snapshot contains them.
+        :return: False if nothing was saved
+        """
+        restored = self._restore_snapshot(robot)
+        restored = self._replay_journal(robot) or restored
+        return restored
+
+    def resume(self, robot: CleaningRobot) -> bool:
+        """
+        Restore the robot, or initialize it if nothing was saved, and checkpoint it from now on
+        :return: True if the robot was restored
+        """
+        restored = self.restore(robot)
+        if restored:
+            robot._charge_low = None  # The pins were reset with the power: set them again on the next reading
+            robot.check_cleaning_resources()  # Used to turn on the LEDs
+        else:
+            robot.initialize_robot()
+            self.snapshot(robot)  # The starting state, which the journal records build on
+        robot.checkpointer = self
+        return restored
+
+    def _restore_snapshot(self, robot: CleaningRobot) -> bool:
+        if not os.path.exists(self.snapshot_path):
+            return False
+        with open(self.snapshot_path, "rb") as file:
+            data = file.read()
+        body, crc = data[:-self._CRC.size], data[-self._CRC.size:]
+        if len(data) < self._SNAPSHOT_HEADER.size + self._CRC.size or self._CRC.unpack(crc)[0] != zlib.crc32(body):
+            raise CleaningRobotError(f"{self.snapshot_path} is damaged")
+        magic, version, sequence = self._SNAPSHOT_HEADER.unpack_from(body, 0)
+        if magic != self._SNAPSHOT_MAGIC or version != FORMAT_VERSION:
+            raise CleaningRobotError(f"{self.snapshot_path} is not a snapshot of version {FORMAT_VERSION}")
+
+        offset = self._SNAPSHOT_HEADER.size
+        self._apply_state(robot, *self._STATE.unpack_from(body, offset))
+        offset += self._STATE.size
+        while offset < len(body):
+            tag, length = self._SECTION.unpack_from(body, offset)
+            offset += self._SECTION.size
+            payload = body[offset:offset + length]
+            offset += length
+            if tag == self._MAP_SECTION:
+                self._restore_map(robot, payload)
+            elif tag == self._TELEMETRY_SECTION:
+                self._restore_telemetry(robot, payload)
+
+        self.sequence = self._snapshot_sequence = sequence
+        return True
+
+    def _restore_map(self, robot: CleaningRobot, payload: bytes) -> None:
+        import numpy as np
+        from src.room_map import RoomMap
+
+        origin_x, origin_y, width, height = self._MAP_HEADER.unpack_from(payload, 0)
+        grid = np.frombuffer(payload, dtype=np.uint8, offset=self._MAP_HEADER.size).reshape(width, height).copy()
+        if robot.room_map is None:
+            robot.room_map = RoomMap()
+        robot.room_map.grid = grid
+        robot.room_map.origin_x, robot.room_map.origin_y = origin_x, origin_y
+        robot.room_map.version += 1
+
+    def _restore_telemetry(self, robot: CleaningRobot, payload: bytes) -> None:
+        import numpy as np
+        from src.telemetry import RECORD, TelemetryLog
+
+        capacity, count, flushed, dropped = self._TELEMETRY_HEADER.unpack_from(payload, 0)
+        records = np.frombuffer(payload, dtype=RECORD, offset=self._TELEMETRY_HEADER.size)
+        if robot.telemetry is None:
+            robot.telemetry = TelemetryLog(capacity)
+        telemetry = robot.telemetry
+        records = records[-telemetry.capacity:]
+        first = count - len(records)
+        telemetry.records[np.arange(first, count) % telemetry.capacity] = records
+        telemetry.count = count
+        # The records already flushed are not appended to the file again
+        telemetry._flushed = flushed
+        telemetry.dropped = dropped
+
+    def _replay_telemetry(self, robot: CleaningRobot, telemetry_step: bytes) -> None:
+        import numpy as np
+        from src.telemetry import RECORD
+
+        telemetry = robot.telemetry
+        flushed, dropped = self._TELEMETRY_STEP.unpack_from(telemetry_step, 0)
+        telemetry.records[telemetry.count % telemetry.capacity] = np.frombuffer(
+            telemetry_step, dtype=RECORD, count=1, offset=self._TELEMETRY_STEP.size)[0]
+        telemetry.count += 1
+        telemetry._flushed = flushed
+        telemetry.dropped = dropped
+
+    def _replay_journal(self, robot: CleaningRobot) -> bool:
+        if not os.path.exists(self.journal_path):
+            return False
+        with open(self.journal_path, "rb") as file:
+            data = file.read()
+        header_size = self._JOURNAL_HEADER.size
+        if len(data) < header_size or self._JOURNAL_HEADER.unpack_from(data, 0) != (self._JOURNAL_MAGIC, FORMAT_VERSION):
+            raise CleaningRobotError(f"{self.journal_path} is not a journal of version {FORMAT_VERSION}")
+
+        replayed = False
+        step_size = self._STEP.size + len(self._NO_TELEMETRY)
+        record_size = step_size + self._CRC.size
+        offset = header_size
+        while offset + record_size <= len(data):
+            record = data[offset:offset + step_size]
+            crc, = self._CRC.unpack_from(data, offset + step_size)
+            if crc != zlib.crc32(record):
+                break  # Cut by the power loss
+            offset += record_size
+            sequence, x, y, heading, flags, charge, obstacle_x, obstacle_y = self._STEP.unpack_from(record, 0)
+            if sequence <= self.sequence:
+                continue  # Already in the snapshot
+            self._replay_step(robot, x, y, heading, flags, charge, obstacle_x, obstacle_y)
+            if flags & TELEMETRY and robot.telemetry is not None:
+                self._replay_telemetry(robot, record[self._STEP.size:])
+            self.sequence = sequence
+            replayed = True
+
+        if offset < len(data):
+            # Drop the damaged tail, so that the next records are appended after the valid ones
+            os.truncate(self.journal_path, offset)
+        return replayed
+
+    def _replay_step(self, robot: CleaningRobot, x: int, y: int, heading: int, flags: int, charge: int,
+                     obstacle_x: int, obstacle_y: int) -> None:
+        previous_x, previous_y = robot.pos_x, robot.pos_y
+        self._apply_state(robot, x, y, heading, flags, charge)
+        room_map = robot.room_map
+        if room_map is None or flags & POSE_UNKNOWN:
+            return
+        if previous_x is not None and robot._heading is not None and (previous_x == x or previous_y == y):
+            # A run-length move cleans every cell between the two poses
+            dx, dy = CleaningRobot.DX[robot._heading], CleaningRobot.DY[robot._heading]
+            steps = abs(x - previous_x) + abs(y - previous_y)
+            if (previous_x + dx * steps, previous_y + dy * steps) == (x, y):
+                for step in range(1, steps):
+                    room_map.mark_cleaned(previous_x + dx * step, previous_y + dy * step)
+        room_map.mark_cleaned(x, y)
+        if flags & OBSTACLE:
+            room_map.mark_obstacle(obstacle_x, obstacle_y)
+
+    def close(self) -> None:
+        if self._journal is not None:
+            os.close(self._journal)
+            self._journal = None
@@ -0,0 +1,179 @@
+import os
+import shutil
+import tempfile
+import zlib
+from collections import OrderedDict
+
+from src.cleaning_robot import CleaningRobotError
+
+
+class ChunkedMap:
+    """
+    Sparse map of the room made of fixed-size square chunks, one byte of flags per cell.
+    Only the most recently used chunks stay in memory, the others are spilled to compressed files.
+    It records the same flags as RoomMap and can be used as the room_map of a CleaningRobot, including with
+    a DockRouter. The changed chunks are written by flush, which a Checkpointer calls at every snapshot.
+    """
+
+    OBSTACLE = 1
+    CLEANED = 2
+
+    CHUNK_BITS_FILE = "chunk_bits"  # Written in the directory, the chunk files can only be read with the same size
+
+    def __init__(self, directory: str | None = None, chunk_bits: int = 6, max_chunks: int = 256):
+        """
+        :param directory: where cold chunks are spilled (a new temporary directory if None, removed by close)
+        :param chunk_bits: chunks are 2**chunk_bits cells wide and high; it must be the one the directory
+            was written with
+        :param max_chunks: maximum number of chunks kept in memory
+        """
+        if max_chunks < 1:
+            raise CleaningRobotError("max_chunks must be at least 1")
+
+        self._temporary = directory is None
+        self.directory = directory if directory is not None else tempfile.mkdtemp(prefix="cleaning-robot-map-")
+        os.makedirs(self.directory, exist_ok=True)
+        self.chunk_bits = chunk_bits
+        self.chunk_size = 1 << chunk_bits
+        self._mask = self.chunk_size - 1
+        self.max_chunks = max_chunks
+
+        self._chunks = OrderedDict()  # (chunk x, chunk y) -> bytearray, least recently used first
+        self._dirty = set()  # Resident chunks changed since they were last written
+        self._spilled = set(self._chunk_keys_on_disk())
+        self._check_chunk_bits()
+        self.version = 0  # Incremented every time an obstacle is added, like RoomMap.version
+        self._chunk_bounds = None  # (min x, min y, max x, max y) of the chunks, None when there is none
+        for key in self._spilled:
+            self._extend_bounds(key)
+
+    def _check_chunk_bits(self) -> None:
+        path = os.path.join(self.directory, self.CHUNK_BITS_FILE)
+        if os.path.exists(path):
+            with open(path) as file:
+                stored = int(file.read())
+            if stored != self.chunk_bits:
+                raise CleaningRobotError(f"{self.directory} holds chunks of {stored} bits, not {self.chunk_bits}")
+        elif self._spilled:
+            raise CleaningRobotError(f"The chunk size of the chunks in {self.directory} is unknown")
+        else:
+            with open(path, "w") as file:
+                file.write(str(self.chunk_bits))
+
+    def _extend_bounds(self, key: tuple[int, int]) -> None:
+        chunk_x, chunk_y = key
+        bounds = self._chunk_bounds
+        if bounds is None:
+            self._chunk_bounds = (chunk_x, chunk_y, chunk_x, chunk_y)
+        else:
+            self._chunk_bounds = (min(bounds[0], chunk_x), min(bounds[1], chunk_y),
+                                  max(bounds[2], chunk_x), max(bounds[3], chunk_y))
+
+    def bounds(self) -> tuple[int, int, int, int]:
+        """
+        :return: (min x, min y, max x, max y) of the cells covered by the chunks, like RoomMap.bounds
+        """
+        if self._chunk_bounds is None:
+            return 0, 0, 0, 0
+        min_x, min_y, max_x, max_y = self._chunk_bounds
+        return (min_x << self.chunk_bits, min_y << self.chunk_bits,
+                ((max_x + 1) << self.chunk_bits) - 1, ((max_y + 1) << self.chunk_bits) - 1)
+
+    @property
+    def resident_chunks(self) -> int:
+        return len(self._chunks)
+
+    def cell(self, x: int, y: int) -> int:
+        """
+        :return: the flags of a cell, 0 for cells that have never been marked
+        """
+        chunk = self._chunk((x >> self.chunk_bits, y >> self.chunk_bits), create=False)
+        if chunk is None:
+            return 0
+        return chunk[((x & self._mask) << self.chunk_bits) | (y & self._mask)]
+
+    def is_obstacle(self, x: int, y: int) -> bool:
+        return bool(self.cell(x, y) & self.OBSTACLE)
+
+    def is_cleaned(self, x: int, y: int) -> bool:
+        return bool(self.cell(x, y) & self.CLEANED)
+
+    def mark_obstacle(self, x: int, y: int) -> None:
+        self._mark(x, y, self.OBSTACLE)
+
+    def mark_cleaned(self, x: int, y: int) -> None:
+        self._mark(x, y, self.CLEANED)
+
+    def _mark(self, x: int, y: int, flag: int) -> None:
+        key = (x >> self.chunk_bits, y >> self.chunk_bits)
+        chunk = self._chunk(key, create=True)
+        index = ((x & self._mask) << self.chunk_bits) | (y & self._mask)
+        if not chunk[index] & flag:
+            chunk[index] |= flag
+            self._dirty.add(key)
+            if flag == self.OBSTACLE:
+                self.version += 1
+
+    def _chunk(self, key: tuple[int, int], create: bool) -> bytearray | None:
+        chunks = self._chunks
+        chunk = chunks.get(key)
+        if chunk is not None:
+            chunks.move_to_end(key)
+            return chunk
+
+        if key in self._spilled:
+            with open(self._chunk_path(key), "rb") as file:
+                chunk = bytearray(zlib.decompress(file.read()))
+        elif create:
+            chunk = bytearray(self.chunk_size * self.chunk_size)
+            self._extend_bounds(key)
+        else:
+            return None
+
+        if len(chunks) >= self.max_chunks:
+            self._evict()
+        chunks[key] = chunk
+        return chunk
+
+    def _evict(self) -> None:
+        key, chunk = self._chunks.popitem(last=False)
+        if key in self._dirty:
+            self._write_chunk(key, chunk)
+            self._dirty.discard(key)
+
+    def _write_chunk(self, key: tuple[int, int], chunk: bytearray) -> None:
+        path = self._chunk_path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(zlib.compress(chunk, 1))
+        os.replace(tmp_path, path)
+        self._spilled.add(key)
+
+    def flush(self) -> None:
+        """
+        Write all the changed chunks to disk, so that the map can be reopened from its directory
+        """
+        for key in self._dirty:
+            self._write_chunk(key, self._chunks[key])
+        self._dirty.clear()
+
+    def close(self) -> None:
+        """
+        Write the changed chunks, or remove the directory if it is a temporary one
+        """
+        if self._temporary:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._chunks.clear()
+            self._dirty.clear()
+            self._spilled.clear()
+        else:
+            self.flush()
+
+    def _chunk_path(self, key: tuple[int, int]) -> str:
+        return os.path.join(self.directory, f"{key[0]}_{key[1]}.chunk")
+
+    def _chunk_keys_on_disk(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".chunk"):
+                cx, cy = name[:-len(".chunk")].split("_")
+                yield int(cx), int(cy)
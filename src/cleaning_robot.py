@@ -1,17 +1,13 @@
 
 import time
+from typing import Iterable, Iterator, NamedTuple
 
-DEPLOYMENT = False  # This variable is to understand whether you are deploying on the actual hardware
+from src.gpio_output import GPIOOutput
+from src.hardware import select_backend
 
-try:
-    import RPi.GPIO as GPIO
-    import board
-    import IBS
-    DEPLOYMENT = True
-except:
-    import mock.GPIO as GPIO
-    import mock.board as board
-    import mock.ibs as IBS
+BACKEND = select_backend()  # See src.hardware; set CLEANING_ROBOT_BACKEND to choose it
+GPIO = BACKEND.gpio
+DEPLOYMENT = BACKEND.deployment  # This variable is to understand whether you are deploying on the actual hardware
 
 
 class CleaningRobot:
@@ -38,39 +34,78 @@ class CleaningRobot:
     PWMB = 32
     STBY = 33
 
+    # Pins set up by __init__, in one call per direction; the outputs start low
+    INPUT_PINS = (GARBAGE_BAG_PIN, SOAP_CONTAINER_PIN, WATER_CONTAINER_PIN, INFRARED_PIN)
+    OUTPUT_PINS = (LED_GARBAGE_BAG, LED_SOAP_CONTAINER, LED_WATER_CONTAINER, RECHARGE_LED_PIN, CLEANING_SYSTEM_PIN,
+                   PWMA, AIN2, AIN1, PWMB, BIN2, BIN1, STBY)
+
     N = 'N'
     S = 'S'
     E = 'E'
     W = 'W'
 
+    # The heading is stored as an index in HEADINGS (clockwise order) and only turned into a letter for the status
+    HEADINGS = (N, E, S, W)
+    HEADING_INDEX = {N: 0, E: 1, S: 2, W: 3}
+    # Offsets of the cell in front of the robot, by heading index
+    DX = (0, 1, 0, -1)
+    DY = (1, 0, -1, 0)
+    # Heading index after a rotation, by heading index
+    LEFT_OF = (3, 0, 1, 2)
+    RIGHT_OF = (1, 2, 3, 0)
+
     LEFT = 'l'
     RIGHT = 'r'
     FORWARD = 'f'
 
-    def __init__(self):
-        GPIO.setmode(GPIO.BOARD)
-        GPIO.setwarnings(False)
-        GPIO.setup(self.INFRARED_PIN, GPIO.IN)
-        GPIO.setup(self.RECHARGE_LED_PIN, GPIO.OUT)
-        GPIO.setup(self.CLEANING_SYSTEM_PIN, GPIO.OUT)
+    MOTOR_ACTIVATION_TIME = 1  # Seconds needed by a motor to move the robot by one step
+
+    LOW_CHARGE = 10  # Under this charge left, the robot stops cleaning and turns on the recharge LED
+
+    # __dict__ is kept so that methods can still be replaced on an instance (e.g., with a MagicMock)
+    __slots__ = (
+        "gpio", "gpio_output", "_ibs",
+        "pos_x", "pos_y", "_heading",
+        "recharge_led_on", "cleaning_system_on", "_charge_low", "last_charge_left", "battery_monitor",
+        "garbage_bag_led_on", "garbage_bag_resource_available",
+        "soap_container_led_on", "soap_container_resource_available",
+        "water_container_led_on", "water_container_resource_available",
+        "resource_monitor", "room_map", "cell_claims", "dock_router", "dock_route", "motion_controller", "telemetry",
+        "checkpointer", "wait_for_motors", "__dict__",
+    )
 
-        GPIO.setup(self.PWMA, GPIO.OUT)
-        GPIO.setup(self.AIN2, GPIO.OUT)
-        GPIO.setup(self.AIN1, GPIO.OUT)
-        GPIO.setup(self.PWMB, GPIO.OUT)
-        GPIO.setup(self.BIN2, GPIO.OUT)
-        GPIO.setup(self.BIN1, GPIO.OUT)
-        GPIO.setup(self.STBY, GPIO.OUT)
+    def __init__(self, gpio=None, ibs=None, wait_for_motors: bool | None = None):
+        """
+        :param gpio: the GPIO library driving this robot, by default the one imported by this module;
+            a robot of a simulated fleet gets its own (e.g., sim.GPIO.SimGPIO)
+        :param ibs: the battery sensor, by default an IBS on the I2C bus, created on the first battery read
+        :param wait_for_motors: whether the moves wait for the motors, by default only when deploying on the actual
+            hardware; False replays a session at full speed (see src.trace.replay)
+        """
+        if gpio is None:
+            gpio = GPIO
+        self.gpio = gpio
+        self.gpio_output = GPIOOutput(gpio)
 
-        ic2 = board.I2C()
-        self.ibs = IBS.IBS(ic2)
+        gpio.setmode(gpio.BOARD)
+        gpio.setwarnings(False)
+        gpio.setup(self.INPUT_PINS, gpio.IN)
+        gpio.setup(self.OUTPUT_PINS, gpio.OUT, initial=gpio.LOW)
+
+        self._ibs = ibs
+        self.wait_for_motors = DEPLOYMENT if wait_for_motors is None else wait_for_motors
 
         self.pos_x = None
         self.pos_y = None
-        self.heading = None
+        self._heading = None
 
         self.recharge_led_on = False
         self.cleaning_system_on = False
+        self._charge_low = None  # Unknown until the first battery reading
+        self.last_charge_left = None
+
+        # Optional BatteryMonitor caching the IBS readings
+        self.battery_monitor = None
 
         self.garbage_bag_led_on = False
         self.garbage_bag_resource_available = False
@@ -81,175 +116,555 @@ class CleaningRobot:
         self.water_container_led_on = False
         self.water_container_resource_available = False
 
+        # Optional ResourceMonitor keeping the resources state up to date through GPIO events
+        self.resource_monitor = None
+
+        # Optional map (e.g., RoomMap) where obstacles and cleaned cells are recorded
+        self.room_map = None
+
+        # Optional claims on cells shared with other robots (e.g., SharedRoomMap.claims): the robot does not
+        # enter a cell held by another robot
+        self.cell_claims = None
+
+        # Optional DockRouter; when the battery runs low, the route back to the dock is stored in dock_route
+        self.dock_router = None
+        self.dock_route = None
+
+        # Optional MotionController driving PWMA and PWMB with speed ramps instead of plain HIGH/LOW
+        self.motion_controller = None
+
+        # Optional TelemetryLog where every executed step is recorded
+        self.telemetry = None
+
+        # Optional Checkpointer saving the state after every step, to resume after a power loss
+        self.checkpointer = None
+
+    @property
+    def ibs(self):
+        if self._ibs is None:
+            # Setting up the I2C bus is slow, so it waits until the battery is needed
+            self._ibs = BACKEND.create_ibs()
+        return self._ibs
+
+    @ibs.setter
+    def ibs(self, ibs) -> None:
+        self._ibs = ibs
+
     def initialize_robot(self) -> None:
         self.pos_x = 0
         self.pos_y = 0
         self.heading = self.N
         self.check_cleaning_resources()  # Used to turn on the LEDs
+        if self.room_map is not None:
+            self.room_map.mark_cleaned(self.pos_x, self.pos_y)
+        if self.cell_claims is not None:
+            self.cell_claims.claim(self.pos_x, self.pos_y)
+            self.cell_claims.arrived(self.pos_x, self.pos_y)
+
+    @property
+    def heading(self) -> str | None:
+        if self._heading is None:
+            return None
+        return self.HEADINGS[self._heading]
+
+    @heading.setter
+    def heading(self, heading: str | None) -> None:
+        if heading is None:
+            self._heading = None
+            return
+        if heading not in self.HEADING_INDEX:
+            raise CleaningRobotError("Heading is not a correct value.")
+        self._heading = self.HEADING_INDEX[heading]
 
     def robot_status(self) -> str:
         return f"{self.pos_x},{self.pos_y},{self.heading}"
 
     def execute_command(self, command: str) -> str:
         self.manage_cleaning_system()
+        resources_ok = self.check_cleaning_resources()
+        return self._execute_step(command, resources_ok)
 
-        if not self.check_cleaning_resources():
-            return self.robot_status()
+    def execute_commands(self, sequence: Iterable[str], refresh_every: int = 1, optimize: bool = False) -> Iterator[str]:
+        """
+        Execute a sequence of commands, yielding the robot status after each step
+        :param sequence: the commands to execute, e.g., "fflfrff"
+        :param refresh_every: number of steps between two battery and cleaning resources reads
+        :param optimize: if True, runs of rotations are reduced to their net effect before being executed
+        (see src.command_optimizer), so there is one status for each optimized command
+        """
+        if refresh_every < 1:
+            raise CleaningRobotError("refresh_every must be a positive number of steps")
 
-        if not self.cleaning_system_on and self.recharge_led_on:
-            return f"!({self.pos_x},{self.pos_y},{self.heading})"
+        if optimize:
+            from src.command_optimizer import optimize_commands
+            sequence = optimize_commands(sequence)
 
-        if command == self.FORWARD:
-            return self._handle_forward_command()
+        resources_ok = False
+        for step, command in enumerate(sequence):
+            if step % refresh_every == 0:
+                self.manage_cleaning_system()
+                resources_ok = self.check_cleaning_resources()
 
-        if command in (self.LEFT, self.RIGHT):
-            self._handle_rotation_command(command)
-            return self.robot_status()
+            status = self._execute_step(command, resources_ok)
+            yield status
+
+            # The robot cannot go any further: missing resources, low battery or obstacle
+            if not resources_ok or status[0] in "!(":
+                return
+
+    def preview(self, commands: str, start_pose: tuple | None = None, obstacles=None, origin: tuple[int, int] = (0, 0)):
+        """
+        Compute the trajectory of a command string without moving the robot (see src.preview.preview)
+        :param start_pose: the (x, y, heading) to start from, the current pose if None
+        """
+        from src.preview import preview  # NumPy is only needed when previewing
+
+        if start_pose is None:
+            start_pose = (self.pos_x, self.pos_y, self.heading)
+        return preview(commands, start_pose, obstacles, origin)
+
+    def _execute_step(self, command: str, resources_ok: bool) -> str:
+        if self.telemetry is None and self.checkpointer is None:
+            return self._step(command, resources_ok)
+        start = time.perf_counter()
+        status = self._step(command, resources_ok)
+        self._record_step(command, status, time.perf_counter() - start)
+        return status
+
+    def _execute_move(self, command: str) -> str:
+        """
+        Same as _execute_step, without checking the battery and the cleaning resources first
+        (used by move_forward and return_to_dock)
+        """
+        if self.telemetry is None and self.checkpointer is None:
+            return self._move(command)
+        start = time.perf_counter()
+        status = self._move(command)
+        self._record_step(command, status, time.perf_counter() - start)
+        return status
+
+    def _record_step(self, command: str, status: str, duration: float) -> None:
+        """
+        Every executed step ends here, whichever method executed it, so the telemetry and the checkpoints
+        follow every change of the pose
+        """
+        if self.telemetry is not None:
+            self.telemetry.record(self, command, status, duration)
+        if self.checkpointer is not None:
+            self.checkpointer.record_step(self, status)
+
+    def _parse_command(self, command: str) -> tuple[str, int | None]:
+        """
+        :return: the action ("f", "l" or "r") and, for a run-length forward command (e.g., "f5"),
+            the number of cells to move
+        """
+        if command == self.FORWARD or command == self.LEFT or command == self.RIGHT:
+            return command, None
+
+        # Run-length forward command; isdigit alone would accept digits such as "²" that int() rejects
+        cells = command[1:]
+        if command[:1] == self.FORWARD and cells.isascii() and cells.isdigit():
+            return self.FORWARD, int(cells)
 
         raise CleaningRobotError("Invalid command")
 
+    def _step(self, command: str, resources_ok: bool) -> str:
+        stop_status = self._stop_status(resources_ok)
+        if stop_status is not None:
+            return stop_status
+        return self._move(command)
+
+    def _move(self, command: str) -> str:
+        action, cells = self._parse_command(command)
+        if action == self.FORWARD:
+            return self._handle_forward_command() if cells is None else self._move_forward(cells)
+
+        self._handle_rotation_command(action)
+        return self.robot_status()
+
+    async def execute_command_async(self, command: str) -> str:
+        """
+        Same as execute_command, but waits for the motors without blocking the event loop.
+        If the task is cancelled while a motor is running, the motor is stopped and the status is left unchanged.
+        """
+        self.manage_cleaning_system()
+        stop_status = self._stop_status(self.check_cleaning_resources())
+        if stop_status is not None:
+            if self.telemetry is not None or self.checkpointer is not None:
+                self._record_step(command, stop_status, 0.0)
+            return stop_status
+        return await self._execute_move_async(command)
+
+    async def _execute_move_async(self, command: str) -> str:
+        if self.telemetry is None and self.checkpointer is None:
+            return await self._move_async(command)
+        start = time.perf_counter()
+        try:
+            status = await self._move_async(command)
+        except BaseException:
+            # Cancelled: the cells already crossed by a run-length move are kept
+            self._record_step(command, self.robot_status(), time.perf_counter() - start)
+            raise
+        self._record_step(command, status, time.perf_counter() - start)
+        return status
+
+    async def _move_async(self, command: str) -> str:
+        action, cells = self._parse_command(command)
+        if action == self.FORWARD:
+            if cells is not None:
+                return await self._move_forward_async(cells)
+            blocked_status = self._blocked_status()
+            if blocked_status is not None:
+                return blocked_status
+            await self.activate_wheel_motor_async()
+            self._update_position_moving_forward()
+            self._record_cleaned()
+            return self.robot_status()
+
+        await self.activate_rotation_motor_async(action)
+        self._update_heading(action)
+        return self.robot_status()
+
+    def _stop_status(self, resources_ok: bool) -> str | None:
+        if not resources_ok:
+            return self.robot_status()
+
+        if not self.cleaning_system_on and self.recharge_led_on:
+            return f"!({self.pos_x},{self.pos_y},{self.heading})"
+
+        return None
+
     def _handle_forward_command(self) -> str:
-        if self.obstacle_found():
-            return self._obstacle_detected_response()
+        blocked_status = self._blocked_status()
+        if blocked_status is not None:
+            return blocked_status
 
         self.activate_wheel_motor()
         self._update_position_moving_forward()
+        self._record_cleaned()
         return self.robot_status()
 
+    def move_forward(self, cells: int) -> str:
+        """
+        Move forward by several cells with a single activation of the wheel motor.
+        The infrared sensor is checked before every cell, so the robot stops in front of the first obstacle
+        and the result is the same as the one of the last of `cells` "f" commands.
+        :param cells: the number of cells to move
+        """
+        return self._execute_move(f"{self.FORWARD}{cells}")
+
+    def _move_forward(self, cells: int) -> str:
+        blocked_status = self._start_moving_forward(cells)
+        if blocked_status is not None:
+            return blocked_status
+
+        reached_cell, move_status = self._cell_by_cell(cells)
+        self._start_wheel_motor()
+        try:
+            self._drive(self.PWMA, cells, reached_cell)
+        finally:
+            self._stop_wheel_motor()
+        return move_status()
+
+    async def move_forward_async(self, cells: int) -> str:
+        """
+        Same as move_forward, but waits for the motor without blocking the event loop
+        """
+        return await self._execute_move_async(f"{self.FORWARD}{cells}")
+
+    async def _move_forward_async(self, cells: int) -> str:
+        blocked_status = self._start_moving_forward(cells)
+        if blocked_status is not None:
+            return blocked_status
+
+        reached_cell, move_status = self._cell_by_cell(cells)
+        self._start_wheel_motor()
+        try:
+            await self._drive_async(self.PWMA, cells, reached_cell)
+        finally:
+            self._stop_wheel_motor()
+        return move_status()
+
+    def _start_moving_forward(self, cells: int) -> str | None:
+        if cells < 1:
+            raise CleaningRobotError("The robot must move by at least one cell")
+        return self._blocked_status()
+
+    def _cell_by_cell(self, cells: int):
+        """
+        :return: the on_step callback of _drive moving the robot by one cell and checking the cell in front
+            of it, and a function returning the status at the end of the move
+        """
+        blocked_status = None
+
+        def reached_cell(moved: int) -> bool:
+            nonlocal blocked_status
+            self._update_position_moving_forward()
+            self._record_cleaned()
+            if moved < cells:
+                blocked_status = self._blocked_status()
+            return blocked_status is None
+
+        return reached_cell, lambda: blocked_status or self.robot_status()
+
     def _handle_rotation_command(self, direction: str):
         self.activate_rotation_motor(direction)
+        self._update_heading(direction)
 
+    def _update_heading(self, direction: str):
         if direction == self.LEFT:
-            self.heading = self._rotate_left()
+            self._heading = self._rotate_left()
         elif direction == self.RIGHT:
-            self.heading = self._rotate_right()
+            self._heading = self._rotate_right()
 
     def _update_position_moving_forward(self):
-        if self.heading == self.E:
-            self.pos_x += 1
-        elif self.heading == self.W:
-            self.pos_x -= 1
-        elif self.heading == self.N:
-            self.pos_y += 1
-        elif self.heading == self.S:
-            self.pos_y -= 1
-        else:
+        if self._heading is None:
             raise CleaningRobotError("Heading is not a correct value.")
+        self.pos_x += self.DX[self._heading]
+        self.pos_y += self.DY[self._heading]
 
-    def _obstacle_detected_response(self) -> str:
-        next_x, next_y = self.pos_x, self.pos_y
+    def _next_cell(self) -> tuple[int, int]:
+        """
+        :return: the coordinates of the cell in front of the robot
+        """
+        return self.pos_x + self.DX[self._heading], self.pos_y + self.DY[self._heading]
 
-        if self.heading == self.E:
-            next_x += 1
-        elif self.heading == self.W:
-            next_x -= 1
-        elif self.heading == self.N:
-            next_y += 1
-        elif self.heading == self.S:
-            next_y -= 1
+    def _record_cleaned(self) -> None:
+        if self.room_map is not None:
+            self.room_map.mark_cleaned(self.pos_x, self.pos_y)
+        if self.cell_claims is not None:
+            self.cell_claims.arrived(self.pos_x, self.pos_y)
 
+    def _blocked_status(self) -> str | None:
+        """
+        :return: the status to return instead of moving forward, None if the cell in front of the robot is free
+        """
+        if self.obstacle_found():
+            return self._obstacle_detected_response()
+        if self.cell_claims is not None:
+            next_x, next_y = self._next_cell()
+            if not self.cell_claims.claim(next_x, next_y):
+                # Another robot is in the way: reported like an obstacle, but not recorded in the map
+                return f"({self.pos_x},{self.pos_y},{self.heading})({next_x},{next_y})"
+        return None
+
+    def _obstacle_detected_response(self) -> str:
+        next_x, next_y = self._next_cell()
+        if self.room_map is not None:
+            self.room_map.mark_obstacle(next_x, next_y)
         return f"({self.pos_x},{self.pos_y},{self.heading})({next_x},{next_y})"
 
-    def _rotate_left(self) -> str:
-        rotations = {self.N: self.W, self.W: self.S, self.S: self.E, self.E: self.N}
-        return rotations[self.heading]
+    def _rotate_left(self) -> int:
+        return self.LEFT_OF[self._heading]
 
-    def _rotate_right(self) -> str:
-        rotations = {self.N: self.E, self.E: self.S, self.S: self.W, self.W: self.N}
-        return rotations[self.heading]
+    def _rotate_right(self) -> int:
+        return self.RIGHT_OF[self._heading]
 
     def obstacle_found(self) -> bool:
-        return GPIO.input(self.INFRARED_PIN)
+        return self.gpio.input(self.INFRARED_PIN)
 
     def manage_cleaning_system(self) -> None:
-        charge_left = self.ibs.get_charge_left()
-        if charge_left < 10:
-            GPIO.output(self.RECHARGE_LED_PIN, True)
-            GPIO.output(self.CLEANING_SYSTEM_PIN, False)
+        self._apply_charge_left(self._read_charge_left())
+
+    def _apply_charge_left(self, charge_left: int) -> None:
+        self.last_charge_left = charge_left
+        charge_low = charge_left < self.LOW_CHARGE
+        if charge_low == self._charge_low:
+            return  # Threshold not crossed, the pins are already set
+
+        self._charge_low = charge_low
+        if charge_low:
+            self.gpio_output.write(self.RECHARGE_LED_PIN, True)
+            self.gpio_output.write(self.CLEANING_SYSTEM_PIN, False)
             self.recharge_led_on = True
             self.cleaning_system_on = False
         else:
-            GPIO.output(self.RECHARGE_LED_PIN, False)
-            GPIO.output(self.CLEANING_SYSTEM_PIN, True)
+            self.gpio_output.write(self.RECHARGE_LED_PIN, False)
+            self.gpio_output.write(self.CLEANING_SYSTEM_PIN, True)
             self.recharge_led_on = False
             self.cleaning_system_on = True
 
+        if charge_low and self.dock_router is not None and self._heading is not None:
+            try:
+                self.dock_route = self.dock_router.route(self.pos_x, self.pos_y, self.heading)
+            except CleaningRobotError:
+                # The robot still stops; return_to_dock tries again once more of the room is known
+                self.dock_route = None
+
+    def return_to_dock(self, max_attempts: int = 10) -> str:
+        """
+        Drive the robot back to the dock along dock_route, even if the battery is low.
+        If an unexpected obstacle is met, the route is computed again.
+        :param max_attempts: maximum number of routes tried
+        :return: the robot status at the end of the route
+        """
+        if self.dock_router is None:
+            raise CleaningRobotError("No dock router")
+
+        status = self.robot_status()
+        for _ in range(max_attempts):
+            if self.dock_route is None:
+                self.dock_route = self.dock_router.route(self.pos_x, self.pos_y, self.heading)
+
+            route, self.dock_route = self.dock_route, None
+            for command in route:
+                status = self._execute_move(command)
+                if status[0] == "(":
+                    break  # The obstacle is now in the map, try another route
+            else:
+                return status
+
+        raise CleaningRobotError("The dock could not be reached")
+
+    def _read_charge_left(self) -> int:
+        if self.battery_monitor is not None:
+            return self.battery_monitor.charge_left()
+        return self.ibs.get_charge_left()
+
     def activate_wheel_motor(self) -> None:
         """
         Let the robot move forward by activating its wheel motor
         """
-        # Drive the motor clockwise
-        GPIO.output(self.AIN1, GPIO.HIGH)
-        GPIO.output(self.AIN2, GPIO.LOW)
-        # Set the motor speed
-        GPIO.output(self.PWMA, GPIO.HIGH)
-        # Disable STBY
-        GPIO.output(self.STBY, GPIO.HIGH)
+        self._start_wheel_motor()
 
-        if DEPLOYMENT: # Sleep only if you are deploying on the actual hardware
-            time.sleep(1) # Wait for the motor to actually move
+        self._drive(self.PWMA)  # Wait for the motor to actually move
 
         # Stop the motor
-        GPIO.output(self.AIN1, GPIO.LOW)
-        GPIO.output(self.AIN2, GPIO.LOW)
-        GPIO.output(self.PWMA, GPIO.LOW)
-        GPIO.output(self.STBY, GPIO.LOW)
+        self._stop_wheel_motor()
+
+    async def activate_wheel_motor_async(self) -> None:
+        """
+        Same as activate_wheel_motor, but waits for the motor with asyncio.sleep
+        """
+        self._start_wheel_motor()
+        try:
+            await self._drive_async(self.PWMA)
+        finally:
+            self._stop_wheel_motor()
+
+    def _start_wheel_motor(self) -> None:
+        # Drive the motor clockwise, set the motor speed and disable STBY
+        self._write_motor_pins(self.AIN1, self.AIN2, self.PWMA, self.gpio.HIGH, self.gpio.LOW, self.gpio.HIGH)
+
+    def _stop_wheel_motor(self) -> None:
+        self._write_motor_pins(self.AIN1, self.AIN2, self.PWMA, self.gpio.LOW, self.gpio.LOW, self.gpio.LOW)
 
     def activate_rotation_motor(self, direction) -> None:
         """
         Let the robot rotate towards a given direction
         :param direction: "l" to turn left, "r" to turn right
         """
+        self._start_rotation_motor(direction)
+
+        self._drive(self.PWMB)  # Wait for the motor to actually move
+
+        # Stop the motor
+        self._stop_rotation_motor()
+
+    async def activate_rotation_motor_async(self, direction) -> None:
+        """
+        Same as activate_rotation_motor, but waits for the motor with asyncio.sleep
+        :param direction: "l" to turn left, "r" to turn right
+        """
+        self._start_rotation_motor(direction)
+        try:
+            await self._drive_async(self.PWMB)
+        finally:
+            self._stop_rotation_motor()
+
+    def _start_rotation_motor(self, direction) -> None:
         if direction == self.LEFT:
-            GPIO.output(self.BIN1, GPIO.HIGH)
-            GPIO.output(self.BIN2, GPIO.LOW)
+            bin1, bin2 = self.gpio.HIGH, self.gpio.LOW
         elif direction == self.RIGHT:
-            GPIO.output(self.BIN1, GPIO.LOW)
-            GPIO.output(self.BIN2, GPIO.HIGH)
+            bin1, bin2 = self.gpio.LOW, self.gpio.HIGH
+        else:
+            bin1, bin2 = self.gpio.LOW, self.gpio.LOW
 
-        GPIO.output(self.PWMB, GPIO.HIGH)
-        GPIO.output(self.STBY, GPIO.HIGH)
+        self._write_motor_pins(self.BIN1, self.BIN2, self.PWMB, bin1, bin2, self.gpio.HIGH)
 
-        if DEPLOYMENT:  # Sleep only if you are deploying on the actual hardware
-            time.sleep(1)  # Wait for the motor to actually move
+    def _stop_rotation_motor(self) -> None:
+        self._write_motor_pins(self.BIN1, self.BIN2, self.PWMB, self.gpio.LOW, self.gpio.LOW, self.gpio.LOW)
 
-        # Stop the motor
-        GPIO.output(self.BIN1, GPIO.LOW)
-        GPIO.output(self.BIN2, GPIO.LOW)
-        GPIO.output(self.PWMB, GPIO.LOW)
-        GPIO.output(self.STBY, GPIO.LOW)
+    def _write_motor_pins(self, in1: int, in2: int, pwm: int, in1_value, in2_value, level) -> None:
+        if self.motion_controller is None:
+            self.gpio_output.write_many((in1, in2, pwm, self.STBY), (in1_value, in2_value, level, level))
+        else:
+            # The speed is set by the motion controller through PWM
+            self.gpio_output.write_many((in1, in2, self.STBY), (in1_value, in2_value, level))
+
+    def _drive(self, pwm: int, steps: int = 1, on_step=None) -> None:
+        """
+        Wait for a running motor to move the robot by some cells (or quarter turns)
+        :param pwm: the PWM pin of the motor
+        :param on_step: called with the number of steps completed after each step; returning False stops
+        """
+        if self.motion_controller is not None:
+            self.motion_controller.run(pwm, steps, time.sleep if self.wait_for_motors else None, on_step)
+            return
+
+        for step in range(1, steps + 1):
+            if self.wait_for_motors:  # Sleep only if you are deploying on the actual hardware
+                time.sleep(self.MOTOR_ACTIVATION_TIME)
+            if on_step is not None and not on_step(step):
+                return
+
+    async def _drive_async(self, pwm: int, steps: int = 1, on_step=None) -> None:
+        """
+        Same as _drive, but waits with asyncio.sleep
+        """
+        if self.motion_controller is not None:
+            await self.motion_controller.run_async(pwm, steps, self.wait_for_motors, on_step)
+            return
+
+        import asyncio  # Only imported by asyncio users, it is slow to import
+        for step in range(1, steps + 1):
+            await asyncio.sleep(self.MOTOR_ACTIVATION_TIME if self.wait_for_motors else 0)
+            if on_step is not None and not on_step(step):
+                return
 
     def check_garbage_bag(self) -> bool:
-        self.garbage_bag_resource_available = GPIO.input(self.GARBAGE_BAG_PIN)
+        return self._apply_garbage_bag(self.gpio.input(self.GARBAGE_BAG_PIN))
+
+    def _apply_garbage_bag(self, available: bool) -> bool:
+        self.garbage_bag_resource_available = available
         if not self.garbage_bag_resource_available:
-            GPIO.output(self.LED_GARBAGE_BAG, True)
+            self.gpio_output.write(self.LED_GARBAGE_BAG, True)
             self.garbage_bag_led_on = True
         else:
-            GPIO.output(self.LED_GARBAGE_BAG, False)
+            self.gpio_output.write(self.LED_GARBAGE_BAG, False)
             self.garbage_bag_led_on = False
         return self.garbage_bag_resource_available
 
     def check_soap_container(self) -> bool:
-        self.soap_container_resource_available = GPIO.input(self.SOAP_CONTAINER_PIN)
+        return self._apply_soap_container(self.gpio.input(self.SOAP_CONTAINER_PIN))
+
+    def _apply_soap_container(self, available: bool) -> bool:
+        self.soap_container_resource_available = available
         if not self.soap_container_resource_available:
-            GPIO.output(self.LED_SOAP_CONTAINER, True)
+            self.gpio_output.write(self.LED_SOAP_CONTAINER, True)
             self.soap_container_led_on = True
         else:
-            GPIO.output(self.LED_SOAP_CONTAINER, False)
+            self.gpio_output.write(self.LED_SOAP_CONTAINER, False)
             self.soap_container_led_on = False
         return self.soap_container_resource_available
 
     def check_water_container(self) -> bool:
-        self.water_container_resource_available = GPIO.input(self.WATER_CONTAINER_PIN)
+        return self._apply_water_container(self.gpio.input(self.WATER_CONTAINER_PIN))
+
+    def _apply_water_container(self, available: bool) -> bool:
+        self.water_container_resource_available = available
         if not self.water_container_resource_available:
-            GPIO.output(self.LED_WATER_CONTAINER, True)
+            self.gpio_output.write(self.LED_WATER_CONTAINER, True)
             self.water_container_led_on = True
         else:
-            GPIO.output(self.LED_WATER_CONTAINER, False)
+            self.gpio_output.write(self.LED_WATER_CONTAINER, False)
             self.water_container_led_on = False
         return self.water_container_resource_available
 
     def check_cleaning_resources(self) -> bool:
+        if self.resource_monitor is not None and self.resource_monitor.running:
+            return self.resource_monitor.resources_available()
+
         garbage_bag = self.check_garbage_bag()
         soap_container = self.check_soap_container()
         water_container = self.check_water_container()
@@ -258,3 +673,29 @@ class CleaningRobot:
 class CleaningRobotError(Exception):
     pass
 
+
+class RobotStatus(NamedTuple):
+    """
+    Parsed form of the strings returned by CleaningRobot.execute_command
+    """
+    x: int
+    y: int
+    heading: str
+    obstacle: tuple[int, int] | None = None  # Cell of the obstacle, for "(x,y,h)(ox,oy)"
+    recharge: bool = False  # True for "!(x,y,h)"
+
+    @classmethod
+    def parse(cls, status: str) -> "RobotStatus":
+        try:
+            if status.startswith("!("):
+                x, y, heading = status[2:-1].split(",")
+                return cls(int(x), int(y), heading, recharge=True)
+            if status.startswith("("):
+                pose, obstacle = status[1:-1].split(")(")
+                x, y, heading = pose.split(",")
+                obstacle_x, obstacle_y = obstacle.split(",")
+                return cls(int(x), int(y), heading, (int(obstacle_x), int(obstacle_y)))
+            x, y, heading = status.split(",")
+            return cls(int(x), int(y), heading)
+        except ValueError:
+            raise CleaningRobotError(f"Invalid status: {status}")
@@ -0,0 +1,36 @@
+from typing import Iterable, Iterator
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.planner import turn_commands
+
+
+def optimize_commands(commands: Iterable[str], lookahead: int = 8) -> Iterator[str]:
+    """
+    Replace every run of rotations with the fewest rotations having the same net effect,
+    e.g., "rrr" becomes "l" and "llll" disappears. The pose after every other command is unchanged.
+    Commands are processed as a stream with a bounded lookahead: rotations are held back until the next
+    other command, or until lookahead of them are pending, so a long (or endless) run of rotations
+    is still executed as it arrives; each window of lookahead rotations is reduced on its own.
+    :param commands: the commands, either a string or any iterable of commands
+    :param lookahead: maximum number of rotations held back
+    :return: the optimized commands, one at a time
+    """
+    if lookahead < 1:
+        raise CleaningRobotError("lookahead must be at least one command")
+
+    rotation = 0  # Net quarter turns to the right of the pending run
+    pending = 0  # Rotations held back
+    for command in commands:
+        if command == CleaningRobot.RIGHT or command == CleaningRobot.LEFT:
+            rotation += 1 if command == CleaningRobot.RIGHT else -1
+            pending += 1
+            if pending < lookahead:
+                continue
+        if rotation & 3:
+            yield from turn_commands(0, rotation & 3)
+        rotation = pending = 0
+        if command != CleaningRobot.RIGHT and command != CleaningRobot.LEFT:
+            yield command
+
+    if rotation & 3:
+        yield from turn_commands(0, rotation & 3)
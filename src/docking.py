@@ -0,0 +1,105 @@
+from collections import deque
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.planner import path_to_commands
+
+_DX = CleaningRobot.DX
+_DY = CleaningRobot.DY
+
+
+class DockRouter:
+    """
+    Shortest routes from anywhere in a RoomMap back to the dock.
+    The distance field of the dock is computed once with a breadth-first search and cached until
+    an obstacle is added to the map (or the map grows), so that a route is a sequence of table lookups.
+    Cells never seen by the robot are assumed to be free.
+    """
+
+    def __init__(self, room_map, dock: tuple[int, int] = (0, 0), margin: int = 1):
+        """
+        :param room_map: the RoomMap of the robot
+        :param dock: the cell of the docking station
+        :param margin: cells added around the map, so that routes can go around obstacles on its border
+        """
+        self.room_map = room_map
+        self.dock = dock
+        self.margin = margin
+        self._field = None
+        self._field_key = None
+        self.computations = 0  # Number of distance fields computed, i.e., cache misses
+
+    def distance_field(self) -> tuple[list[int], tuple[int, int, int, int]]:
+        """
+        :return: the distances from the dock (-1 for unreachable cells), in column-major order,
+        and the (min x, min y, width, height) of the area they cover
+        """
+        key = (self.room_map.version, self.room_map.bounds())
+        if key != self._field_key:
+            self._field = self._compute_field()
+            self._field_key = key
+        return self._field
+
+    def _compute_field(self) -> tuple[list[int], tuple[int, int, int, int]]:
+        self.computations += 1
+        min_x, min_y, max_x, max_y = self.room_map.bounds()
+        dock_x, dock_y = self.dock
+        min_x = min(min_x, dock_x) - self.margin
+        min_y = min(min_y, dock_y) - self.margin
+        width = max(max_x, dock_x) + self.margin - min_x + 1
+        height = max(max_y, dock_y) + self.margin - min_y + 1
+
+        is_obstacle = self.room_map.is_obstacle
+        distances = [-1] * (width * height)
+        start = (dock_x - min_x) * height + dock_y - min_y
+        distances[start] = 0
+        queue = deque((start,))
+        while queue:
+            cell = queue.popleft()
+            x, y = divmod(cell, height)
+            for heading in range(4):
+                next_x = x + _DX[heading]
+                next_y = y + _DY[heading]
+                if not (0 <= next_x < width and 0 <= next_y < height):
+                    continue
+                neighbour = next_x * height + next_y
+                if distances[neighbour] == -1 and not is_obstacle(next_x + min_x, next_y + min_y):
+                    distances[neighbour] = distances[cell] + 1
+                    queue.append(neighbour)
+        return distances, (min_x, min_y, width, height)
+
+    def distance(self, x: int, y: int) -> int:
+        """
+        :return: the number of forward moves from a cell to the dock, -1 if the dock cannot be reached
+        """
+        distances, (min_x, min_y, width, height) = self.distance_field()
+        if not (0 <= x - min_x < width and 0 <= y - min_y < height):
+            return -1
+        return distances[(x - min_x) * height + y - min_y]
+
+    def route(self, x: int, y: int, heading: str) -> str:
+        """
+        :return: the commands moving the robot from its pose to the dock, along a shortest path that keeps
+        the current heading whenever possible
+        """
+        distances, (min_x, min_y, width, height) = self.distance_field()
+        if self.distance(x, y) == -1:
+            raise CleaningRobotError(f"The dock cannot be reached from ({x},{y})")
+
+        heading_index = CleaningRobot.HEADING_INDEX[heading]
+        path = [(x, y)]
+        current = heading_index
+        cell = (x - min_x) * height + y - min_y
+        while distances[cell] > 0:
+            local_x, local_y = divmod(cell, height)
+            # Try going straight first, then turning
+            for candidate in (current, CleaningRobot.LEFT_OF[current], CleaningRobot.RIGHT_OF[current],
+                              CleaningRobot.LEFT_OF[CleaningRobot.LEFT_OF[current]]):
+                next_x = local_x + _DX[candidate]
+                next_y = local_y + _DY[candidate]
+                if 0 <= next_x < width and 0 <= next_y < height \
+                        and distances[next_x * height + next_y] == distances[cell] - 1:
+                    cell = next_x * height + next_y
+                    current = candidate
+                    path.append((next_x + min_x, next_y + min_y))
+                    break
+        return path_to_commands(path, heading_index)[0]
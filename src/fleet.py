@@ -0,0 +1,135 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, NamedTuple, Sequence
+
+from sim.GPIO import SimGPIO
+from sim.ibs import IBS as SimIBS
+from sim.board import I2C
+from sim.world import SimWorld
+from src.cleaning_robot import CleaningRobot, RobotStatus
+
+
+class RobotSpec(NamedTuple):
+    """
+    A robot of a simulated fleet: its room and the commands it is fed
+    """
+    commands: str | Sequence[str]  # e.g., "ffrff" or ["f5", "r", "f2"]
+    obstacles: tuple[tuple[int, int], ...] = ()
+    size: tuple[int, int] | None = None  # (width, height) of the room, None for an unbounded room
+    pose: tuple[int, int, str] = (0, 0, "N")
+    charge: float = 100.0
+    drain: float = 0.1  # Charge used by each motor activation
+    events: tuple[tuple[int, int, int], ...] = ()  # Container events, see SimWorld
+
+
+class RobotResult(NamedTuple):
+    commands: int  # Commands executed before the stream ended or the robot had to stop
+    cells_cleaned: int  # Distinct cells visited, the start cell included
+    coverage: float | None  # Cleaned cells over the free cells of the room, None for an unbounded room
+    obstacle_hits: int  # Commands refused because of an obstacle ahead
+    stopped: bool  # True if the battery or the cleaning resources ran out
+    status: str  # Last status returned by the robot
+    elapsed: float  # Seconds of simulation
+
+
+class FleetReport(NamedTuple):
+    robots: list[RobotResult]
+    commands: int
+    cells_cleaned: int
+    obstacle_hits: int
+    stopped: int
+    elapsed: float  # Wall clock seconds for the whole fleet
+
+    @property
+    def throughput(self) -> float:
+        """
+        :return: commands executed per second of wall clock by the whole fleet
+        """
+        return self.commands / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def coverage(self) -> float | None:
+        """
+        :return: mean coverage of the robots in bounded rooms
+        """
+        coverages = [robot.coverage for robot in self.robots if robot.coverage is not None]
+        return sum(coverages) / len(coverages) if coverages else None
+
+
+def simulate_robot(spec: RobotSpec) -> RobotResult:
+    """
+    Run one robot on its own simulated hardware, feeding it the commands of the spec one by one.
+    The robot keeps going after an obstacle, and stops when the battery or the cleaning resources run out.
+    """
+    start = time.perf_counter()
+    world = SimWorld(spec.obstacles, spec.size, spec.pose, spec.charge, spec.drain, spec.events)
+    robot = CleaningRobot(gpio=SimGPIO(world), ibs=SimIBS(I2C(), world=world))
+    robot.initialize_robot()
+    robot.pos_x, robot.pos_y, robot.heading = spec.pose
+
+    visited = {(robot.pos_x, robot.pos_y)}
+    executed = 0
+    obstacle_hits = 0
+    stopped = False
+    status = robot.robot_status()
+    for command in spec.commands:
+        previous_x, previous_y = robot.pos_x, robot.pos_y
+        status = robot.execute_command(command)
+        robot_status = RobotStatus.parse(status)
+        if robot_status.recharge or not (robot.garbage_bag_resource_available and
+                                         robot.soap_container_resource_available and
+                                         robot.water_container_resource_available):
+            stopped = True
+            break
+        executed += 1
+        # A run-length move (e.g., "f5") cleans every cell it crosses, not only the last one
+        dx, dy = CleaningRobot.DX[robot._heading], CleaningRobot.DY[robot._heading]
+        for step in range(1, abs(robot_status.x - previous_x) + abs(robot_status.y - previous_y) + 1):
+            visited.add((previous_x + dx * step, previous_y + dy * step))
+        if robot_status.obstacle is not None:
+            obstacle_hits += 1
+
+    coverage = None
+    if spec.size is not None:
+        width, height = spec.size
+        free = width * height - sum(1 for x, y in set(spec.obstacles) if 0 <= x < width and 0 <= y < height)
+        coverage = len(visited) / free if free else 0.0
+    return RobotResult(executed, len(visited), coverage, obstacle_hits, stopped, status, time.perf_counter() - start)
+
+
+def _simulate_shard(specs: list[RobotSpec]) -> list[RobotResult]:
+    return [simulate_robot(spec) for spec in specs]
+
+
+def simulate_fleet(specs: Iterable[RobotSpec], workers: int | None = None, shards_per_worker: int = 4) -> FleetReport:
+    """
+    Simulate a fleet, sharding the robots across a pool of processes.
+    Every robot has its own simulated hardware, so the robots of a shard run independently.
+    :param specs: the robots of the fleet
+    :param workers: number of processes, by default the number of CPUs
+    :param shards_per_worker: the robots are split into this many shards per process, to balance the load
+    :return: the results of the robots, in the order of specs, and their totals
+    """
+    specs = list(specs)
+    workers = workers or os.cpu_count() or 1
+    shard_count = max(min(len(specs), workers * shards_per_worker), 1)
+    shard_size = -(-len(specs) // shard_count)
+    shards = [specs[i:i + shard_size] for i in range(0, len(specs), shard_size)]
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = [result for shard in shards for result in _simulate_shard(shard)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [result for shard_results in pool.map(_simulate_shard, shards) for result in shard_results]
+    elapsed = time.perf_counter() - start
+
+    return FleetReport(
+        robots=results,
+        commands=sum(result.commands for result in results),
+        cells_cleaned=sum(result.cells_cleaned for result in results),
+        obstacle_hits=sum(result.obstacle_hits for result in results),
+        stopped=sum(1 for result in results if result.stopped),
+        elapsed=elapsed,
+    )
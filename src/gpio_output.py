@@ -0,0 +1,61 @@
+class GPIOOutput:
+    """
+    Output layer keeping a shadow copy of the level of every output pin,
+    so that writing a pin with the level it already has does not reach the GPIO library.
+    """
+
+    def __init__(self, gpio):
+        """
+        :param gpio: the GPIO library (RPi.GPIO or a mock) actually driving the pins
+        """
+        self.gpio = gpio
+        self._levels = {}
+        self.writes = 0  # Pin writes forwarded to the GPIO library
+        self.elided = 0  # Pin writes skipped because the pin already had the level
+
+    def write(self, pin: int, value) -> None:
+        level = 1 if value else 0
+        if self._levels.get(pin) == level:
+            self.elided += 1
+            return
+        self._levels[pin] = level
+        self.writes += 1
+        self.gpio.output(pin, value)
+
+    def write_many(self, pins, values) -> None:
+        """
+        Write several pins, in order, with a single call to the GPIO library
+        :param pins: the pins to write
+        :param values: the values to write, one for each pin
+        """
+        changed_pins = []
+        changed_values = []
+        levels = self._levels
+        for pin, value in zip(pins, values):
+            level = 1 if value else 0
+            if levels.get(pin) == level:
+                self.elided += 1
+                continue
+            levels[pin] = level
+            changed_pins.append(pin)
+            changed_values.append(value)
+
+        if not changed_pins:
+            return
+        self.writes += len(changed_pins)
+        if len(changed_pins) == 1:
+            self.gpio.output(changed_pins[0], changed_values[0])
+        else:
+            self.gpio.output(changed_pins, changed_values)
+
+    def level(self, pin: int) -> int | None:
+        """
+        :return: the last level written to the pin, None if it has never been written
+        """
+        return self._levels.get(pin)
+
+    def invalidate(self) -> None:
+        """
+        Forget the shadow levels, e.g., after the pins have been reset by someone else
+        """
+        self._levels.clear()
@@ -0,0 +1,82 @@
+"""
+Selection of the hardware backend driving the robots: the real Raspberry Pi libraries, the simulation (sim/)
+or the mocks (mock/). Only the GPIO library is imported when the backend is selected, the I2C and battery
+sensor libraries are imported the first time the battery is read.
+"""
+import importlib
+import os
+
+
+class Backend:
+    """
+    The libraries of a hardware backend, each one imported on first use
+    """
+
+    def __init__(self, name: str, gpio: str, board: str, ibs: str, deployment: bool):
+        """
+        :param gpio: module name of the GPIO library (the RPi.GPIO interface)
+        :param board: module name of the library providing I2C (the Adafruit Blinka interface)
+        :param ibs: module name of the library of the battery sensor
+        :param deployment: True for the real hardware, where the robot waits for its motors
+        """
+        self.name = name
+        self.deployment = deployment
+        self._module_names = {"gpio": gpio, "board": board, "ibs": ibs}
+        self._modules = {}
+
+    def _module(self, kind: str):
+        module = self._modules.get(kind)
+        if module is None:
+            module = self._modules[kind] = importlib.import_module(self._module_names[kind])
+        return module
+
+    @property
+    def gpio(self):
+        return self._module("gpio")
+
+    @property
+    def board(self):
+        return self._module("board")
+
+    @property
+    def ibs(self):
+        return self._module("ibs")
+
+    def create_ibs(self):
+        """
+        :return: a battery sensor on the I2C bus
+        """
+        return self.ibs.IBS(self.board.I2C())
+
+    def __repr__(self) -> str:
+        return f"Backend({self.name!r})"
+
+
+BACKENDS = {
+    "rpi": Backend("rpi", "RPi.GPIO", "board", "IBS", deployment=True),
+    "sim": Backend("sim", "sim.GPIO", "sim.board", "sim.ibs", deployment=False),
+    "mock": Backend("mock", "mock.GPIO", "mock.board", "mock.ibs", deployment=False),
+}
+
+
+def select_backend(name: str | None = None) -> Backend:
+    """
+    :param name: "rpi", "sim", "mock" or "auto"; by default the CLEANING_ROBOT_BACKEND environment variable,
+        or "auto" if it is not set, which uses the Raspberry Pi libraries when RPi.GPIO can be imported
+        and the mocks otherwise
+    :return: the backend, with its GPIO library imported
+    """
+    if name is None:
+        name = os.getenv("CLEANING_ROBOT_BACKEND", "auto")
+    if name == "auto":
+        backend = BACKENDS["rpi"]
+        try:
+            backend.gpio
+        except (ImportError, RuntimeError):  # RPi.GPIO raises RuntimeError when not on a Raspberry Pi
+            backend = BACKENDS["mock"]
+    elif name in BACKENDS:
+        backend = BACKENDS[name]
+    else:
+        raise ValueError(f"Unknown hardware backend {name!r}, expected one of: auto, {', '.join(BACKENDS)}")
+    backend.gpio  # Import it now, so that a missing library is reported at startup
+    return backend
@@ -0,0 +1,248 @@
+import bisect
+import time
+from typing import Mapping
+
+# Upper bounds of the latency buckets, in seconds
+DEFAULT_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0)
+
+# Stage name -> robot method timed for it
+STAGES = {
+    "command": "execute_command",
+    "battery": "_read_charge_left",
+    "resources": "check_cleaning_resources",
+    "infrared": "obstacle_found",
+    "motor": "_drive",  # For run-length moves it includes the infrared reads done between cells
+    "status": "robot_status",
+}
+
+# Stage name -> coroutine method timed for it, on the path of execute_command_async
+ASYNC_STAGES = {
+    "command": "execute_command_async",
+    "motor": "_drive_async",
+}
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets
+    """
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last bucket is for values above every bound
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """
+        :return: (upper bound, number of values up to it) for every bucket, the last bound being infinity
+        """
+        buckets = []
+        running = 0
+        for bound, count in zip((*self.bounds, float("inf")), self.counts):
+            running += count
+            buckets.append((bound, running))
+        return buckets
+
+
+class _CountingGPIO:
+    """
+    GPIO library counting the pins read and written through it
+    """
+
+    def __init__(self, gpio, instrumentation: "Instrumentation"):
+        self._gpio = gpio
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        return getattr(self._gpio, name)
+
+    def input(self, channel):
+        self._instrumentation.gpio_inputs += 1
+        return self._gpio.input(channel)
+
+    def output(self, channel, value):
+        self._instrumentation.gpio_outputs += 1 if isinstance(channel, int) else len(channel)
+        self._gpio.output(channel, value)
+
+
+class _CountingIBS:
+    """
+    IBS counting the I2C transactions done through it.
+    Without an IBS, it creates the one of the backend when the battery is first needed, like the robot does.
+    """
+
+    def __init__(self, ibs, instrumentation: "Instrumentation"):
+        self._ibs = ibs
+        self._instrumentation = instrumentation
+
+    @property
+    def wrapped(self):
+        """
+        :return: the IBS, None if it was not created yet
+        """
+        return self._ibs
+
+    def _target(self):
+        if self._ibs is None:
+            from src.cleaning_robot import BACKEND
+            self._ibs = BACKEND.create_ibs()
+        return self._ibs
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def get_charge_left(self) -> int:
+        self._instrumentation.i2c_transactions += 1
+        return self._target().get_charge_left()
+
+
+class Instrumentation:
+    """
+    Times the stages of command execution of a robot and counts its GPIO and I2C operations.
+    attach() wraps the methods of that robot instance only, and detach() restores them: a robot without
+    instrumentation attached runs the plain methods, so there is no cost at all when it is disabled.
+    The IBS of the robot is not created by attach(), and the reads of its battery monitor are counted too.
+    """
+
+    def __init__(self, robot, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.robot = robot
+        self.histograms = {stage: Histogram(buckets) for stage in STAGES}
+        self.gpio_inputs = 0
+        self.gpio_outputs = 0  # Pins written, a bulk write of several pins counts each of them
+        self.i2c_transactions = 0
+        self._originals = None
+
+    @property
+    def attached(self) -> bool:
+        return self._originals is not None
+
+    def attach(self) -> "Instrumentation":
+        if self.attached:
+            return self
+        robot = self.robot
+        monitor = robot.battery_monitor
+        self._originals = {
+            "gpio": robot.gpio, "ibs": robot._ibs, "output_gpio": robot.gpio_output.gpio,
+            "monitor": monitor, "monitor_ibs": None if monitor is None else monitor.ibs,
+            "methods": {name: robot.__dict__.get(name) for name in (*STAGES.values(), *ASYNC_STAGES.values())},
+        }
+        for stage, name in STAGES.items():
+            setattr(robot, name, self._timed(getattr(robot, name), self.histograms[stage]))
+        for stage, name in ASYNC_STAGES.items():
+            setattr(robot, name, self._timed_async(getattr(robot, name), self.histograms[stage]))
+        robot.gpio = _CountingGPIO(robot.gpio, self)
+        robot.gpio_output.gpio = _CountingGPIO(robot.gpio_output.gpio, self)
+        robot.ibs = _CountingIBS(robot._ibs, self)  # Not robot.ibs, which would set up the I2C bus
+        if monitor is not None:
+            monitor.ibs = _CountingIBS(monitor.ibs, self)
+        return self
+
+    def detach(self) -> None:
+        if not self.attached:
+            return
+        robot = self.robot
+        originals = self._originals
+        for name, method in originals["methods"].items():
+            if method is None:
+                delattr(robot, name)  # Back to the class method
+            else:
+                setattr(robot, name, method)  # e.g., a method replaced by a test
+        robot.gpio = originals["gpio"]
+        robot.gpio_output.gpio = originals["output_gpio"]
+        # The IBS may have been created while attached
+        robot.ibs = originals["ibs"] if originals["ibs"] is not None else robot._ibs.wrapped
+        if originals["monitor"] is not None:
+            originals["monitor"].ibs = originals["monitor_ibs"]
+        self._originals = None
+
+    def __enter__(self) -> "Instrumentation":
+        return self.attach()
+
+    def __exit__(self, *exc_info) -> None:
+        self.detach()
+
+    @staticmethod
+    def _timed(method, histogram: Histogram):
+        perf_counter = time.perf_counter
+        observe = histogram.observe
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                observe(perf_counter() - start)
+
+        return timed
+
+    @staticmethod
+    def _timed_async(method, histogram: Histogram):
+        perf_counter = time.perf_counter
+        observe = histogram.observe
+
+        async def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                observe(perf_counter() - start)
+
+        return timed
+
+    def reset(self) -> None:
+        for histogram in self.histograms.values():
+            histogram.__init__(histogram.bounds)
+        self.gpio_inputs = self.gpio_outputs = self.i2c_transactions = 0
+
+    def stats(self) -> dict:
+        """
+        :return: the counters, and for every stage the number of calls, the total seconds
+            and the cumulative buckets (see Histogram.cumulative)
+        """
+        return {
+            "stages": {stage: {"count": histogram.count, "sum": histogram.total, "buckets": histogram.cumulative()}
+                       for stage, histogram in self.histograms.items()},
+            "gpio_inputs": self.gpio_inputs,
+            "gpio_outputs": self.gpio_outputs,
+            "i2c_transactions": self.i2c_transactions,
+        }
+
+    def prometheus(self, robot: str = "0") -> str:
+        """
+        :param robot: value of the robot label
+        :return: the stats in the Prometheus text exposition format
+        """
+        return prometheus_text({robot: self})
+
+
+def prometheus_text(instrumentations: Mapping[str, Instrumentation]) -> str:
+    """
+    :param instrumentations: robot label -> instrumentation of the robot
+    :return: the stats of several robots in the Prometheus text exposition format
+    """
+    lines = ["# HELP cleaning_robot_stage_seconds Time spent in each stage of command execution",
+             "# TYPE cleaning_robot_stage_seconds histogram"]
+    for robot, instrumentation in instrumentations.items():
+        for stage, histogram in instrumentation.histograms.items():
+            labels = f'robot="{robot}",stage="{stage}"'
+            for bound, count in histogram.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'cleaning_robot_stage_seconds_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f"cleaning_robot_stage_seconds_sum{{{labels}}} {histogram.total!r}")
+            lines.append(f"cleaning_robot_stage_seconds_count{{{labels}}} {histogram.count}")
+
+    for name, description in (("gpio_inputs", "GPIO pins read"), ("gpio_outputs", "GPIO pins written"),
+                              ("i2c_transactions", "I2C transactions with the battery sensor")):
+        lines.append(f"# HELP cleaning_robot_{name}_total {description}")
+        lines.append(f"# TYPE cleaning_robot_{name}_total counter")
+        for robot, instrumentation in instrumentations.items():
+            lines.append(f'cleaning_robot_{name}_total{{robot="{robot}"}} {getattr(instrumentation, name)}')
+    return "\n".join(lines) + "\n"
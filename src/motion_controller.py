@@ -0,0 +1,216 @@
+import asyncio
+import math
+from typing import Callable
+
+from src.cleaning_robot import CleaningRobotError
+
+
+class MotionController:
+    """
+    Drives the speed of the motors through GPIO.PWM with trapezoidal profiles: the duty cycle ramps up
+    to the cruise value, stays there, and ramps down, so that the current drawn when starting stays
+    within limits and a step lasts as long as the profile requires instead of a fixed time.
+    Distances are in motor steps: one cell for the wheel motor, a quarter turn for the rotation motor.
+    """
+
+    def __init__(self, gpio, frequency: float = 1000, cruise_duty: float = 80.0, acceleration: float = 400.0,
+                 full_speed: float = 2.0, ramp_steps: int = 8):
+        """
+        :param gpio: the GPIO library providing PWM
+        :param frequency: PWM frequency in Hz
+        :param cruise_duty: duty cycle (0.0 to 100.0) at cruise speed
+        :param acceleration: maximum change of the duty cycle per second
+        :param full_speed: motor steps per second at 100% duty cycle
+        :param ramp_steps: number of duty cycle changes used for each ramp
+        """
+        if not 0 < cruise_duty <= 100:
+            raise CleaningRobotError("cruise_duty must be in (0, 100]")
+        if acceleration <= 0 or full_speed <= 0 or ramp_steps < 1:
+            raise CleaningRobotError("acceleration, full_speed and ramp_steps must be positive")
+
+        self.gpio = gpio
+        self.frequency = frequency
+        self.cruise_duty = cruise_duty
+        self.acceleration = acceleration
+        self.full_speed = full_speed
+        self.ramp_steps = ramp_steps
+        self._pwms = {}
+        self._profiles = {}
+        self._segments = {}
+
+    def _pwm(self, channel: int):
+        pwm = self._pwms.get(channel)
+        if pwm is None:
+            pwm = self._pwms[channel] = self.gpio.PWM(channel, self.frequency)
+            pwm.start(0)
+        return pwm
+
+    def profile(self, distance: float) -> list[tuple[float, float]]:
+        """
+        :param distance: motor steps to travel
+        :return: the (duty cycle, seconds) pairs to apply in order; the motor covers exactly the distance
+        """
+        cached = self._profiles.get(distance)
+        if cached is not None:
+            return cached
+
+        # Speed is proportional to the duty cycle
+        acceleration = self.full_speed * self.acceleration / 100  # Steps per second squared
+        peak_duty = self.cruise_duty
+        peak_speed = self.full_speed * peak_duty / 100
+        ramp_time = peak_speed / acceleration
+        ramp_distance = peak_speed * ramp_time / 2
+        if 2 * ramp_distance > distance:
+            # Too short to reach the cruise speed: triangular profile
+            peak_speed = math.sqrt(acceleration * distance)
+            peak_duty = 100 * peak_speed / self.full_speed
+            ramp_time = peak_speed / acceleration
+            ramp_distance = distance / 2
+        cruise_time = (distance - 2 * ramp_distance) / peak_speed
+
+        # Each ramp step uses the mean duty cycle of its interval, so that the distance is preserved
+        step_time = ramp_time / self.ramp_steps
+        ramp_up = [(peak_duty * (i + 0.5) / self.ramp_steps, step_time) for i in range(self.ramp_steps)]
+        profile = ramp_up + ([(peak_duty, cruise_time)] if cruise_time > 0 else []) + ramp_up[::-1]
+        self._profiles[distance] = profile
+        return profile
+
+    def segments(self, distance: int) -> list[tuple[float, float]]:
+        """
+        :param distance: motor steps to travel
+        :return: the profile of the distance with its phases split at every step boundary, so that waiting
+            for one segment after the other, each step is completed at the end of a segment
+        """
+        cached = self._segments.get(distance)
+        if cached is not None:
+            return cached
+
+        segments = []
+        travelled = 0.0
+        for duty, seconds in self.profile(distance):
+            speed = self.full_speed * duty / 100
+            while True:
+                next_step = math.floor(travelled + 1e-9) + 1
+                to_next_step = (next_step - travelled) / speed
+                if next_step > distance or to_next_step >= seconds - 1e-12:
+                    segments.append((duty, seconds))
+                    travelled += speed * seconds
+                    break
+                segments.append((duty, to_next_step))
+                travelled = next_step
+                seconds -= to_next_step
+        self._segments[distance] = segments
+        return segments
+
+    def braking_profile(self, duty: float) -> list[tuple[float, float]]:
+        """
+        :param duty: the duty cycle the motor is running at
+        :return: the (duty cycle, seconds) pairs bringing the motor to a stop from that duty cycle with the
+            same deceleration as the end of a profile. The robot travels the braking distance,
+            (full_speed * duty / 100) ** 2 / (2 * deceleration) steps, beyond the step it was stopped at.
+        """
+        ramp_time = duty / self.acceleration
+        step_time = ramp_time / self.ramp_steps
+        return [(duty * (i + 0.5) / self.ramp_steps, step_time) for i in reversed(range(self.ramp_steps))]
+
+    def duration(self, distance: float) -> float:
+        """
+        :return: the seconds needed to travel a distance
+        """
+        return sum(seconds for _, seconds in self.profile(distance))
+
+    def run(self, channel: int, distance: int, sleep: Callable[[float], None] | None = None,
+            on_step: Callable[[int], bool] | None = None) -> int:
+        """
+        Drive the PWM channel along the profile of a distance, then stop it
+        :param sleep: function waiting for a number of seconds, None to skip waiting (e.g., in simulation)
+        :param on_step: called with the number of steps completed every time a step is completed;
+        returning False brakes the motor along the deceleration ramp (see braking_profile)
+        :return: the number of steps completed
+        """
+        pwm = self._pwm(channel)
+        tracker = _StepTracker(self.full_speed, distance, on_step)
+        current_duty = None
+        try:
+            # Waiting segment by segment, on_step is called when the step is actually completed
+            for duty, seconds in self.segments(distance):
+                if duty != current_duty:
+                    pwm.ChangeDutyCycle(duty)
+                    current_duty = duty
+                if sleep is not None:
+                    sleep(seconds)
+                if not tracker.advance(duty, seconds):
+                    for braking_duty, braking_seconds in self.braking_profile(duty):
+                        pwm.ChangeDutyCycle(braking_duty)
+                        if sleep is not None:
+                            sleep(braking_seconds)
+                    break
+            else:
+                tracker.finish()
+        finally:
+            # Only reached before the end of a ramp on an exception: an emergency stop
+            pwm.ChangeDutyCycle(0)
+        return tracker.completed
+
+    async def run_async(self, channel: int, distance: int, realtime: bool = True,
+                        on_step: Callable[[int], bool] | None = None) -> int:
+        """
+        Same as run, but waits with asyncio.sleep (only yielding to the event loop if realtime is False)
+        """
+        pwm = self._pwm(channel)
+        tracker = _StepTracker(self.full_speed, distance, on_step)
+        current_duty = None
+        try:
+            for duty, seconds in self.segments(distance):
+                if duty != current_duty:
+                    pwm.ChangeDutyCycle(duty)
+                    current_duty = duty
+                await asyncio.sleep(seconds if realtime else 0)
+                if not tracker.advance(duty, seconds):
+                    for braking_duty, braking_seconds in self.braking_profile(duty):
+                        pwm.ChangeDutyCycle(braking_duty)
+                        await asyncio.sleep(braking_seconds if realtime else 0)
+                    break
+            else:
+                tracker.finish()
+        finally:
+            pwm.ChangeDutyCycle(0)
+        return tracker.completed
+
+    def stop(self) -> None:
+        """
+        Stop PWM generation on every channel
+        """
+        for pwm in self._pwms.values():
+            pwm.stop()
+        self._pwms.clear()
+
+
+class _StepTracker:
+    """
+    Counts the steps completed while following a profile
+    """
+
+    def __init__(self, full_speed: float, distance: int, on_step: Callable[[int], bool] | None):
+        self.full_speed = full_speed
+        self.distance = distance
+        self.on_step = on_step
+        self.travelled = 0.0
+        self.completed = 0
+
+    def advance(self, duty: float, seconds: float) -> bool:
+        self.travelled += self.full_speed * duty / 100 * seconds
+        # Tolerance for the rounding errors of the profile
+        while self.completed < self.distance and self.travelled >= self.completed + 1 - 1e-9:
+            if not self._complete_step():
+                return False
+        return True
+
+    def finish(self) -> None:
+        while self.completed < self.distance:
+            if not self._complete_step():
+                return
+
+    def _complete_step(self) -> bool:
+        self.completed += 1
+        return self.on_step is None or self.on_step(self.completed) is not False
@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+
+class PipelinedExecutor:
+    """
+    Executes commands like CleaningRobot.execute_commands (reading the sensors before every step), but reads
+    the battery needed by the next step over I2C while the motor of the current step is running.
+    That reading is taken before the motor stops, so it is only used when it is far enough from the low
+    charge threshold for the move not to cross it; otherwise the battery is read again after the move.
+    The statuses are then the same as the ones of serial execution.
+    The cleaning resources and the infrared sensor are read after the motor stops (GPIO reads are cheap),
+    so a container removed during a move is seen by the next step.
+    """
+
+    def __init__(self, robot, max_drain_per_step: float = 10.0):
+        """
+        :param max_drain_per_step: upper bound of the charge used by one step: a prefetched charge less than
+            this above the low charge threshold is read again once the motor has stopped
+        """
+        self.robot = robot
+        self.max_drain_per_step = max_drain_per_step
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sensor-prefetch")
+        self.prefetch_failures = 0  # Prefetched readings discarded because reading failed
+        self.prefetch_discarded = 0  # Prefetched readings discarded because they were too close to the threshold
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "PipelinedExecutor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def read_sensors(self) -> tuple:
+        """
+        Read the battery and the cleaning resources without changing any pin or robot field
+        :return: the charge left and the availability of the resources (None when kept by a ResourceMonitor)
+        """
+        return self.robot._read_charge_left(), self._read_resources()
+
+    def _read_resources(self) -> tuple | None:
+        robot = self.robot
+        if robot.resource_monitor is not None and robot.resource_monitor.running:
+            return None
+        return (robot.gpio.input(robot.GARBAGE_BAG_PIN),
+                robot.gpio.input(robot.SOAP_CONTAINER_PIN),
+                robot.gpio.input(robot.WATER_CONTAINER_PIN))
+
+    def _apply_readings(self, readings: tuple) -> bool:
+        robot = self.robot
+        charge_left, resources = readings
+        robot._apply_charge_left(charge_left)
+        if resources is None:
+            return robot.check_cleaning_resources()
+
+        garbage_bag = robot._apply_garbage_bag(resources[0])
+        soap_container = robot._apply_soap_container(resources[1])
+        water_container = robot._apply_water_container(resources[2])
+        return garbage_bag and soap_container and water_container
+
+    def run(self, commands: Iterable[str]) -> Iterator[str]:
+        """
+        Execute the commands, yielding the robot status after each step.
+        Stops after a step that reports missing resources, a low battery or an obstacle.
+        """
+        robot = self.robot
+        iterator = iter(commands)
+        command = next(iterator, None)
+        if command is None:
+            return
+
+        readings = self.read_sensors()
+        while True:
+            resources_ok = self._apply_readings(readings)
+            next_command = next(iterator, None)
+            prefetch = self._pool.submit(robot._read_charge_left) if next_command is not None else None
+
+            try:
+                status = robot._execute_step(command, resources_ok)
+            except BaseException:
+                if prefetch is not None:
+                    prefetch.cancel()
+                raise
+
+            yield status
+
+            if next_command is None or not resources_ok or status[0] in "!(":
+                if prefetch is not None:
+                    prefetch.cancel()  # The readings will never be used
+                return
+
+            try:
+                charge_left = prefetch.result()
+            except Exception:
+                self.prefetch_failures += 1
+                charge_left = None
+            if charge_left is not None and charge_left < robot.LOW_CHARGE + self.max_drain_per_step:
+                # The move may have taken the battery under the threshold since it was read
+                self.prefetch_discarded += 1
+                charge_left = None
+            if charge_left is None:
+                charge_left = robot._read_charge_left()  # Roll back to a serial read
+            readings = (charge_left, self._read_resources())
+            command = next_command
@@ -0,0 +1,315 @@
+import bisect
+import heapq
+from collections import deque
+from typing import Iterable
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+
+_DX = CleaningRobot.DX
+_DY = CleaningRobot.DY
+_NORTH = CleaningRobot.HEADING_INDEX[CleaningRobot.N]
+_SOUTH = CleaningRobot.HEADING_INDEX[CleaningRobot.S]
+
+# Rotations turning a heading into another one, by (target - current) % 4
+_TURNS = ("", CleaningRobot.RIGHT, CleaningRobot.RIGHT * 2, CleaningRobot.LEFT)
+_ROTATIONS = tuple(len(turns) for turns in _TURNS)
+
+_INVERT = bytes((1, 0)) + bytes(254)
+
+
+def turn_commands(heading: int, target: int) -> str:
+    """
+    :return: the shortest rotation commands turning the heading index into the target heading index
+    """
+    return _TURNS[(target - heading) & 3]
+
+
+def heading_towards(x: int, y: int, next_x: int, next_y: int) -> int:
+    """
+    :return: the heading index to move from a cell to an adjacent one
+    """
+    for heading in range(4):
+        if x + _DX[heading] == next_x and y + _DY[heading] == next_y:
+            return heading
+    raise CleaningRobotError(f"({next_x},{next_y}) is not adjacent to ({x},{y})")
+
+
+def path_to_commands(path: list[tuple[int, int]], heading: int) -> tuple[str, int]:
+    """
+    Turn a path of adjacent cells into commands
+    :param path: the cells to visit, starting from the cell the robot is in
+    :param heading: the initial heading index of the robot
+    :return: the commands and the final heading index
+    """
+    commands = []
+    for (x, y), (next_x, next_y) in zip(path, path[1:]):
+        target = heading_towards(x, y, next_x, next_y)
+        commands.append(turn_commands(heading, target))
+        commands.append(CleaningRobot.FORWARD)
+        heading = target
+    return "".join(commands), heading
+
+
+def plan_coverage(width: int, height: int, obstacles: Iterable[tuple[int, int]] = (),
+                  start: tuple = (0, 0, CleaningRobot.N)) -> str:
+    """
+    Plan a route visiting every cell of a rectangular room reachable from the start.
+    The room is swept column by column (boustrophedon), so that most of the route is made of straight runs
+    along y and the robot only turns twice when moving to the next column. Transfers between runs are
+    straight moves where possible, or an A* search where every rotation costs like a forward move.
+    :param width: number of cells along x, the room spans x in [0, width)
+    :param height: number of cells along y, the room spans y in [0, height)
+    :param obstacles: cells containing an obstacle
+    :param start: the (x, y, heading) of the robot, as set by initialize_robot by default
+    :return: the route, as a string of "f", "l" and "r" commands
+    """
+    if width < 1 or height < 1:
+        raise CleaningRobotError("The room must contain at least one cell")
+
+    blocked = bytearray(width * height)
+    for x, y in obstacles:
+        if 0 <= x < width and 0 <= y < height:
+            blocked[x * height + y] = 1
+
+    x, y, heading = start
+    if not (0 <= x < width and 0 <= y < height) or blocked[x * height + y]:
+        raise CleaningRobotError("The robot must start from a free cell of the room")
+    if heading not in CleaningRobot.HEADING_INDEX:
+        raise CleaningRobotError("Heading is not a correct value.")
+    heading = CleaningRobot.HEADING_INDEX[heading]
+
+    free = _reachable_cells(blocked, width, height, x, y) if any(blocked) else bytearray(b"\x01") * (width * height)
+    covered = bytearray(width * height)
+    covered[x * height + y] = 1
+    commands = []
+    upwards = True
+
+    for column in range(width):
+        runs = _runs(free, column * height, height)
+        if not runs:
+            continue
+        if not upwards:
+            runs = [(last, first) for first, last in reversed(runs)]
+        sweep_heading = _NORTH if upwards else _SOUTH
+
+        for entry, exit in runs:
+            low, high = min(entry, exit), max(entry, exit)
+            if covered.find(0, column * height + low, column * height + high + 1) == -1:
+                continue  # Already covered while moving around
+
+            final_heading = sweep_heading if entry != exit else None
+            transfer, heading = _transfer(free, covered, width, height, x, y, heading, column, entry, final_heading)
+            commands.append(transfer)
+            x, y = column, exit
+            if entry != exit:
+                commands.append(CleaningRobot.FORWARD * (high - low))
+                covered[column * height + low:column * height + high + 1] = b"\x01" * (high - low + 1)
+
+        upwards = not upwards
+
+    return "".join(commands)
+
+
+def _runs(free: bytearray, offset: int, height: int) -> list[tuple[int, int]]:
+    """
+    :return: the (first y, last y) of the runs of free cells of a column
+    """
+    runs = []
+    end = offset + height
+    start = free.find(1, offset, end)
+    while start != -1:
+        stop = free.find(0, start, end)
+        if stop == -1:
+            stop = end
+        runs.append((start - offset, stop - 1 - offset))
+        start = free.find(1, stop, end)
+    return runs
+
+
+def _reachable_cells(blocked: bytearray, width: int, height: int, x: int, y: int) -> bytearray:
+    """
+    Flood fill over the runs of free cells of the columns, rather than over single cells
+    :return: 1 for the cells reachable from (x, y), 0 for the others
+    """
+    free = blocked.translate(_INVERT)
+    runs = [_runs(free, column * height, height) for column in range(width)]
+    firsts = [[first for first, _ in column_runs] for column_runs in runs]
+    visited = [bytearray(len(column_runs)) for column_runs in runs]
+
+    start = bisect.bisect_right(firsts[x], y) - 1
+    visited[x][start] = 1
+    queue = deque(((x, start),))
+    reachable = bytearray(width * height)
+    while queue:
+        column, index = queue.popleft()
+        first, last = runs[column][index]
+        reachable[column * height + first:column * height + last + 1] = b"\x01" * (last - first + 1)
+        for next_column in (column - 1, column + 1):
+            if not 0 <= next_column < width:
+                continue
+            # Runs of the next column overlapping this one
+            next_index = bisect.bisect_right(firsts[next_column], last) - 1
+            while next_index >= 0 and runs[next_column][next_index][1] >= first:
+                if not visited[next_column][next_index]:
+                    visited[next_column][next_index] = 1
+                    queue.append((next_column, next_index))
+                next_index -= 1
+    return reachable
+
+
+def _transfer(free: bytearray, covered: bytearray, width: int, height: int,
+              x: int, y: int, heading: int, target_x: int, target_y: int, target_heading: int | None) -> tuple[str, int]:
+    """
+    Plan the commands moving the robot from its pose to the target cell (and heading, if given).
+    The cells visited on the way are marked as covered.
+    :return: the commands and the final heading index
+    """
+    if (x, y) == (target_x, target_y):
+        if target_heading is None:
+            return "", heading
+        return turn_commands(heading, target_heading), target_heading
+
+    route = _straight_transfer(free, width, height, x, y, heading, target_x, target_y, target_heading)
+    if route is None:
+        route = _search_transfer(free, width, height, x, y, heading, target_x, target_y, target_heading)
+    commands, heading, legs = route
+    for first, stop, stride in legs:
+        covered[first:stop:stride] = b"\x01" * len(range(first, stop, stride))
+    return commands, heading
+
+
+def _straight_transfer(free: bytearray, width: int, height: int, x: int, y: int, heading: int,
+                       target_x: int, target_y: int, target_heading: int | None) -> tuple | None:
+    """
+    Most transfers are L-shaped moves, or U-shaped moves around a few obstacles, on free cells;
+    these are planned without searching.
+    :return: the commands, the final heading index and the visited cells (as slices of the grid);
+    None if no such move is possible
+    """
+    candidates = [((x, target_y),)] if x == target_x or y == target_y else [((x, target_y),), ((target_x, y),)]
+    # A detour through a side column only makes sense if the move is not along a single row, and vice versa
+    detours = []
+    if y != target_y:
+        detours += [((side_x, y), (side_x, target_y)) for side_x in (x - 1, x + 1, target_x - 1, target_x + 1)
+                    if 0 <= side_x < width and side_x not in (x, target_x)]
+    if x != target_x:
+        detours += [((x, side_y), (target_x, side_y)) for side_y in (y - 1, y + 1, target_y - 1, target_y + 1)
+                    if 0 <= side_y < height and side_y not in (y, target_y)]
+    lower_bound = _estimate(x, y, heading, target_x, target_y, target_heading)
+
+    for group in (candidates, detours):
+        best = None
+        for corners in dict.fromkeys(group):
+            route = _waypoints_route(free, height, [(x, y), *corners, (target_x, target_y)], heading, target_heading)
+            if route is not None and (best is None or len(route[0]) < len(best[0])):
+                best = route
+                if len(route[0]) == lower_bound:
+                    break
+        if best is not None:
+            return best
+    return None
+
+
+def _waypoints_route(free: bytearray, height: int, waypoints: list[tuple[int, int]],
+                     heading: int, target_heading: int | None) -> tuple | None:
+    commands = []
+    legs = []
+    for (from_x, from_y), (to_x, to_y) in zip(waypoints, waypoints[1:]):
+        length = abs(to_x - from_x) + abs(to_y - from_y)
+        if length == 0:
+            continue
+        leg_heading = heading_towards(from_x, from_y, from_x + (to_x > from_x) - (to_x < from_x),
+                                      from_y + (to_y > from_y) - (to_y < from_y))
+        # Cells of the leg, as a slice of the column-major grid
+        step = _DX[leg_heading] * height + _DY[leg_heading]
+        start = from_x * height + from_y
+        first, last = sorted((start + step, start + step * length))
+        leg = (first, last + 1, abs(step))
+        if 0 in free[leg[0]:leg[1]:leg[2]]:
+            return None
+        legs.append(leg)
+        commands.append(turn_commands(heading, leg_heading))
+        commands.append(CleaningRobot.FORWARD * length)
+        heading = leg_heading
+
+    if target_heading is not None:
+        commands.append(turn_commands(heading, target_heading))
+        heading = target_heading
+    return "".join(commands), heading, legs
+
+
+def _search_transfer(free: bytearray, width: int, height: int, x: int, y: int, heading: int,
+                     target_x: int, target_y: int, target_heading: int | None) -> tuple:
+    """
+    A* search over (x, y, heading) states, where every rotation costs like a forward move
+    :return: the commands, the final heading index and the visited cells (as slices of the grid)
+    """
+    start = (x, y, heading)
+    parents = {start: None}
+    costs = {start: 0}
+    queue = [(_estimate(x, y, heading, target_x, target_y, target_heading), 0, start)]
+    while queue:
+        _, cost, state = heapq.heappop(queue)
+        if cost > costs[state]:
+            continue
+        state_x, state_y, state_heading = state
+        if state_x == target_x and state_y == target_y and (target_heading is None or state_heading == target_heading):
+            commands, cells = _unwind(parents, state, height)
+            return commands, state_heading, cells
+
+        successors = [(state_x, state_y, CleaningRobot.LEFT_OF[state_heading], CleaningRobot.LEFT),
+                      (state_x, state_y, CleaningRobot.RIGHT_OF[state_heading], CleaningRobot.RIGHT)]
+        next_x = state_x + _DX[state_heading]
+        next_y = state_y + _DY[state_heading]
+        if 0 <= next_x < width and 0 <= next_y < height and free[next_x * height + next_y]:
+            successors.append((next_x, next_y, state_heading, CleaningRobot.FORWARD))
+
+        for next_x, next_y, next_heading, command in successors:
+            next_state = (next_x, next_y, next_heading)
+            next_cost = cost + 1
+            if next_cost < costs.get(next_state, next_cost + 1):
+                costs[next_state] = next_cost
+                parents[next_state] = (state, command)
+                estimate = next_cost + _estimate(next_x, next_y, next_heading, target_x, target_y, target_heading)
+                heapq.heappush(queue, (estimate, -next_cost, next_state))
+
+    raise CleaningRobotError(f"Cell ({target_x},{target_y}) cannot be reached")
+
+
+def _estimate(x: int, y: int, heading: int, target_x: int, target_y: int, target_heading: int | None) -> int:
+    """
+    Lower bound of the cost to the target: the distance plus the rotations needed to face every direction
+    the robot has to move along, and the target heading
+    """
+    directions = []
+    if target_x != x:
+        directions.append(1 if target_x > x else 3)
+    if target_y != y:
+        directions.append(0 if target_y > y else 2)
+
+    best = None
+    for order in (directions, directions[::-1]):
+        rotations = 0
+        current = heading
+        for direction in order:
+            rotations += _ROTATIONS[(direction - current) & 3]
+            current = direction
+        if target_heading is not None:
+            rotations += _ROTATIONS[(target_heading - current) & 3]
+        if best is None or rotations < best:
+            best = rotations
+    return abs(target_x - x) + abs(target_y - y) + best
+
+
+def _unwind(parents: dict, state: tuple, height: int) -> tuple[str, list[tuple[int, int, int]]]:
+    commands = []
+    cells = []
+    while parents[state] is not None:
+        previous, command = parents[state]
+        commands.append(command)
+        if command == CleaningRobot.FORWARD:
+            cell = state[0] * height + state[1]
+            cells.append((cell, cell + 1, 1))
+        state = previous
+    commands.reverse()
+    return "".join(commands), cells
@@ -0,0 +1,71 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+
+# Heading change of every command byte (-1 for a left rotation, +1 for a right one)
+_TURN = np.zeros(256, dtype=np.int64)
+_TURN[ord(CleaningRobot.LEFT)] = -1
+_TURN[ord(CleaningRobot.RIGHT)] = 1
+
+_VALID = np.zeros(256, dtype=bool)
+for _command in (CleaningRobot.LEFT, CleaningRobot.RIGHT, CleaningRobot.FORWARD):
+    _VALID[ord(_command)] = True
+
+_DX = np.array(CleaningRobot.DX, dtype=np.int64)
+_DY = np.array(CleaningRobot.DY, dtype=np.int64)
+
+
+class Trajectory(NamedTuple):
+    """
+    Poses of the robot after each executed command.
+    Headings are indexes in CleaningRobot.HEADINGS.
+    """
+    x: np.ndarray
+    y: np.ndarray
+    heading: np.ndarray
+    blocked_step: int | None = None  # Index of the forward command stopped by an obstacle
+    blocked_cell: tuple[int, int] | None = None  # Cell containing that obstacle
+
+
+def preview(commands: str, start_pose: tuple = (0, 0, CleaningRobot.N),
+            obstacles: np.ndarray | None = None, origin: tuple[int, int] = (0, 0)) -> Trajectory:
+    """
+    Compute the trajectory of the robot for a command string without touching any hardware
+    :param commands: the commands, e.g., "fflfrff"
+    :param start_pose: the (x, y, heading) the robot starts from
+    :param obstacles: optional boolean grid, obstacles[x - origin_x, y - origin_y] is True for cells with an obstacle
+    :param origin: coordinates of the cell obstacles[0, 0]
+    :return: the trajectory, truncated before the first forward command hitting an obstacle
+    """
+    try:
+        codes = np.frombuffer(commands.encode("ascii"), dtype=np.uint8)
+    except UnicodeEncodeError:
+        raise CleaningRobotError("Invalid command")
+    if not _VALID[codes].all():
+        raise CleaningRobotError("Invalid command")
+
+    x0, y0, heading0 = start_pose
+    if heading0 not in CleaningRobot.HEADING_INDEX:
+        raise CleaningRobotError("Heading is not a correct value.")
+
+    heading = (CleaningRobot.HEADING_INDEX[heading0] + np.cumsum(_TURN[codes])) & 3
+    forward = codes == ord(CleaningRobot.FORWARD)
+    x = x0 + np.cumsum(np.where(forward, _DX[heading], 0))
+    y = y0 + np.cumsum(np.where(forward, _DY[heading], 0))
+
+    if obstacles is None:
+        return Trajectory(x, y, heading)
+
+    # Up to the first blocked step, x and y of a forward command are the cell the robot tries to enter
+    gx = x - origin[0]
+    gy = y - origin[1]
+    inside = forward & (gx >= 0) & (gx < obstacles.shape[0]) & (gy >= 0) & (gy < obstacles.shape[1])
+    blocked = np.zeros(len(codes), dtype=bool)
+    blocked[inside] = obstacles[gx[inside], gy[inside]]
+    if not blocked.any():
+        return Trajectory(x, y, heading)
+
+    step = int(np.argmax(blocked))
+    return Trajectory(x[:step], y[:step], heading[:step], step, (int(x[step]), int(y[step])))
@@ -0,0 +1,212 @@
+import heapq
+import math
+from typing import Iterable
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError, RobotStatus
+from src.planner import path_to_commands
+
+_INFINITY = math.inf
+
+
+class DStarLite:
+    """
+    Incremental shortest path planner (D* Lite, Koenig and Likhachev) from the robot cell to a goal cell
+    of a rectangular room. The search state is kept between calls, so that when the robot reports a new
+    obstacle only the part of the search affected by it is repaired.
+    """
+
+    def __init__(self, width: int, height: int, start: tuple[int, int], goal: tuple[int, int],
+                 obstacles: Iterable[tuple[int, int]] = ()):
+        """
+        :param width: number of cells along x, the room spans x in [0, width)
+        :param height: number of cells along y, the room spans y in [0, height)
+        :param start: the cell the robot is in
+        :param goal: the cell the robot must reach
+        :param obstacles: cells known to contain an obstacle
+        """
+        self.width = width
+        self.height = height
+        self.blocked = bytearray(width * height)
+        for x, y in obstacles:
+            if self._inside(x, y):
+                self.blocked[x * height + y] = 1
+        self.start = self._cell(*start)
+        self._start_x, self._start_y = start
+        self.goal = self._cell(*goal)
+
+        self._g = {}
+        self._rhs = {self.goal: 0}
+        self._km = 0
+        self._last = self.start
+        self._queue = []
+        self._queued = {}  # Cell -> key of its valid entry in the queue (other entries are stale)
+        self._push(self.goal)
+        self.expansions = 0  # Cells expanded so far, to measure how much each repair costs
+
+    def _inside(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def _cell(self, x: int, y: int) -> int:
+        if not self._inside(x, y):
+            raise CleaningRobotError(f"Cell ({x},{y}) is outside the room")
+        return x * self.height + y
+
+    def _coordinates(self, cell: int) -> tuple[int, int]:
+        return divmod(cell, self.height)
+
+    def _neighbours(self, cell: int) -> list[int]:
+        x, y = divmod(cell, self.height)
+        neighbours = []
+        if x > 0:
+            neighbours.append(cell - self.height)
+        if x < self.width - 1:
+            neighbours.append(cell + self.height)
+        if y > 0:
+            neighbours.append(cell - 1)
+        if y < self.height - 1:
+            neighbours.append(cell + 1)
+        return neighbours
+
+    def _cost(self, cell: int, neighbour: int) -> float:
+        return _INFINITY if self.blocked[cell] or self.blocked[neighbour] else 1
+
+    def _heuristic(self, cell: int, other: int) -> int:
+        x, y = divmod(cell, self.height)
+        other_x, other_y = divmod(other, self.height)
+        return abs(x - other_x) + abs(y - other_y)
+
+    def _key(self, cell: int) -> tuple[float, float]:
+        g = self._g.get(cell, _INFINITY)
+        rhs = self._rhs.get(cell, _INFINITY)
+        best = g if g < rhs else rhs
+        x, y = divmod(cell, self.height)
+        return best + abs(x - self._start_x) + abs(y - self._start_y) + self._km, best
+
+    def _push(self, cell: int) -> None:
+        key = self._key(cell)
+        self._queued[cell] = key
+        heapq.heappush(self._queue, (key, cell))
+
+    def _top(self) -> tuple[tuple[float, float], int] | None:
+        queue = self._queue
+        while queue:
+            key, cell = queue[0]
+            if self._queued.get(cell) == key:
+                return key, cell
+            heapq.heappop(queue)  # Stale entry
+        return None
+
+    def _update_rhs(self, cell: int) -> None:
+        if cell == self.goal:
+            return
+        best = _INFINITY
+        blocked = self.blocked
+        if not blocked[cell]:
+            g = self._g
+            for neighbour in self._neighbours(cell):
+                if not blocked[neighbour]:
+                    cost = g.get(neighbour, _INFINITY) + 1
+                    if cost < best:
+                        best = cost
+        self._rhs[cell] = best
+
+    def _update_queue(self, cell: int) -> None:
+        if self._g.get(cell, _INFINITY) != self._rhs.get(cell, _INFINITY):
+            self._push(cell)
+        else:
+            self._queued.pop(cell, None)
+
+    def _update_vertex(self, cell: int) -> None:
+        self._update_rhs(cell)
+        self._update_queue(cell)
+
+    def compute_shortest_path(self) -> None:
+        g = self._g
+        rhs = self._rhs
+        blocked = self.blocked
+        while True:
+            top = self._top()
+            start_g = g.get(self.start, _INFINITY)
+            start_rhs = rhs.get(self.start, _INFINITY)
+            if top is None or (top[0] >= self._key(self.start) and start_rhs == start_g):
+                return
+
+            old_key, cell = top
+            new_key = self._key(cell)
+            self.expansions += 1
+            if old_key < new_key:
+                self._push(cell)
+            elif g.get(cell, _INFINITY) > rhs.get(cell, _INFINITY):
+                # The cell became consistent with a lower cost: only the neighbours it improves change
+                cell_g = g[cell] = rhs[cell]
+                self._queued.pop(cell, None)
+                for neighbour in self._neighbours(cell):
+                    if neighbour != self.goal and not blocked[neighbour] and cell_g + 1 < rhs.get(neighbour, _INFINITY):
+                        rhs[neighbour] = cell_g + 1
+                        self._update_queue(neighbour)
+            else:
+                # The cell cost went up: the neighbours relying on it look for another way
+                old_g = g.get(cell, _INFINITY)
+                g[cell] = _INFINITY
+                for neighbour in (cell, *self._neighbours(cell)):
+                    if neighbour == cell or rhs.get(neighbour, _INFINITY) == old_g + 1:
+                        self._update_rhs(neighbour)
+                    self._update_queue(neighbour)
+
+    def move_to(self, x: int, y: int) -> None:
+        """
+        Tell the planner the robot is now in another cell
+        """
+        self.start = self._cell(x, y)
+        self._start_x, self._start_y = x, y
+
+    def add_obstacle(self, x: int, y: int) -> None:
+        """
+        Tell the planner a cell contains an obstacle; the search is repaired on the next path request
+        """
+        if not self._inside(x, y):
+            return  # Walls are already outside the room
+        cell = x * self.height + y
+        if self.blocked[cell]:
+            return
+        self._km += self._heuristic(self._last, self.start)
+        self._last = self.start
+        self.blocked[cell] = 1
+        self._update_vertex(cell)
+        for neighbour in self._neighbours(cell):
+            self._update_vertex(neighbour)
+
+    def path(self) -> list[tuple[int, int]]:
+        """
+        :return: the cells of the shortest path from the robot cell to the goal, both included
+        """
+        self.compute_shortest_path()
+        g = self._g
+        if g.get(self.start, _INFINITY) == _INFINITY:
+            raise CleaningRobotError("The goal cannot be reached")
+
+        cell = self.start
+        path = [self._coordinates(cell)]
+        while cell != self.goal:
+            cell = min(self._neighbours(cell), key=lambda neighbour: self._cost(cell, neighbour) + g.get(neighbour, _INFINITY))
+            path.append(self._coordinates(cell))
+        return path
+
+    def commands(self, heading: str) -> str:
+        """
+        :param heading: the heading of the robot
+        :return: the commands moving the robot along the shortest path to the goal
+        """
+        return path_to_commands(self.path(), CleaningRobot.HEADING_INDEX[heading])[0]
+
+    def handle_status(self, status: str) -> str:
+        """
+        Update the planner with a status returned by the robot and repair the route
+        :param status: the string returned by execute_command, e.g., "(1,2,N)(1,3)"
+        :return: the commands moving the robot from its reported pose to the goal
+        """
+        robot_status = RobotStatus.parse(status)
+        self.move_to(robot_status.x, robot_status.y)
+        if robot_status.obstacle is not None:
+            self.add_obstacle(*robot_status.obstacle)
+        return self.commands(robot_status.heading)
@@ -0,0 +1,65 @@
+class ResourceMonitor:
+    """
+    Keeps the cleaning resources state of a robot up to date through GPIO edge events,
+    so that checking the resources before a command does not need to read any pin.
+    """
+
+    def __init__(self, robot, bouncetime: int = 200):
+        """
+        :param robot: the CleaningRobot whose resources are monitored
+        :param bouncetime: switch bounce timeout in ms, given to add_event_detect which ignores the edges closer
+            than this
+        """
+        self.robot = robot
+        self.bouncetime = bouncetime
+        self._checks = {
+            robot.GARBAGE_BAG_PIN: robot.check_garbage_bag,
+            robot.SOAP_CONTAINER_PIN: robot.check_soap_container,
+            robot.WATER_CONTAINER_PIN: robot.check_water_container,
+        }
+        self._available = False
+        self.running = False
+
+    def start(self) -> None:
+        """
+        Read the current state of the resources and start listening for changes
+        """
+        if self.running:
+            return
+        gpio = self.robot.gpio
+        for pin in self._checks:
+            gpio.add_event_detect(pin, gpio.BOTH, self._on_edge, self.bouncetime)
+        self.running = True
+        self.refresh()
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        for pin in self._checks:
+            self.robot.gpio.remove_event_detect(pin)
+        self.running = False
+
+    def refresh(self) -> bool:
+        """
+        Read all the resource pins and update the LEDs
+        :return: True if all the resources are available
+        """
+        for check in self._checks.values():
+            check()
+        return self._update_available()
+
+    def _on_edge(self, channel: int) -> None:
+        # The GPIO library already debounces the edges. The level is read again rather than toggled,
+        # so an edge dropped by the debounce cannot leave a stale state
+        self._checks[channel]()
+        self._update_available()
+
+    def _update_available(self) -> bool:
+        robot = self.robot
+        self._available = bool(robot.garbage_bag_resource_available
+                               and robot.soap_container_resource_available
+                               and robot.water_container_resource_available)
+        return self._available
+
+    def resources_available(self) -> bool:
+        return self._available
@@ -0,0 +1,270 @@
+import asyncio
+import struct
+from collections import deque
+from typing import Iterable, Sequence
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError, RobotStatus, DEPLOYMENT
+
+# Binary protocol. After the line "BINARY\n", the client sends command frames: a header followed by the command
+# in ASCII (e.g., "f", "r", "f12"), and gets back one fixed size status record per frame, in the same order.
+# Without that line, the connection is in text mode: "<robot> <command>\n" lines answered by status lines.
+BINARY_HELLO = b"BINARY\n"
+COMMAND_HEADER = struct.Struct("<IHB")  # sequence number, robot index, command length
+STATUS_RECORD = struct.Struct("<IiiBBxxii")  # sequence number, x, y, heading, flags, obstacle x, obstacle y
+
+FLAG_OBSTACLE = 1
+FLAG_RECHARGE = 2
+FLAG_ERROR = 4
+NO_HEADING = 255
+
+
+def pack_status(sequence: int, status: RobotStatus | None) -> bytes:
+    """
+    :param status: the status returned by the robot, None if the command failed
+    :return: the binary record of a status
+    """
+    if status is None:
+        return STATUS_RECORD.pack(sequence, 0, 0, NO_HEADING, FLAG_ERROR, 0, 0)
+    flags = 0
+    obstacle_x = obstacle_y = 0
+    if status.obstacle is not None:
+        flags |= FLAG_OBSTACLE
+        obstacle_x, obstacle_y = status.obstacle
+    if status.recharge:
+        flags |= FLAG_RECHARGE
+    heading = CleaningRobot.HEADING_INDEX.get(status.heading, NO_HEADING)
+    return STATUS_RECORD.pack(sequence, status.x, status.y, heading, flags, obstacle_x, obstacle_y)
+
+
+def unpack_status(record: bytes) -> tuple[int, RobotStatus | None]:
+    """
+    :return: the sequence number and the status of a binary record, None for a failed command
+    """
+    sequence, x, y, heading, flags, obstacle_x, obstacle_y = STATUS_RECORD.unpack(record)
+    if flags & FLAG_ERROR:
+        return sequence, None
+    obstacle = (obstacle_x, obstacle_y) if flags & FLAG_OBSTACLE else None
+    heading = CleaningRobot.HEADINGS[heading] if heading != NO_HEADING else None
+    return sequence, RobotStatus(x, y, heading, obstacle, bool(flags & FLAG_RECHARGE))
+
+
+class RMSServer:
+    """
+    Network front end hosting one or more robots, so that a remote RMS can keep many commands in flight
+    over a single TCP or Unix socket connection. The commands of a connection are executed in order.
+    """
+
+    def __init__(self, robots: Sequence[CleaningRobot], threaded: bool = DEPLOYMENT):
+        """
+        :param robots: the robots, addressed by their index
+        :param threaded: if True, the commands run in a worker thread so that the motors do not block the
+            event loop; otherwise they run inline, which is faster when there is no real hardware
+        """
+        self.robots = list(robots)
+        self.threaded = threaded
+        self._locks = [asyncio.Lock() for _ in self.robots] if threaded else None
+        self.commands = 0  # Commands executed so far
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        return await asyncio.start_unix_server(self._handle_connection, path)
+
+    def execute(self, robot_index: int, command: str) -> str:
+        """
+        :return: the status returned by the robot
+        """
+        if not 0 <= robot_index < len(self.robots):
+            raise CleaningRobotError(f"Unknown robot {robot_index}")
+        self.commands += 1
+        return self.robots[robot_index].execute_command(command)
+
+    async def _execute_async(self, robot_index: int, command: str) -> str:
+        if not 0 <= robot_index < len(self.robots):
+            raise CleaningRobotError(f"Unknown robot {robot_index}")
+        async with self._locks[robot_index]:
+            return await asyncio.to_thread(self.execute, robot_index, command)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            first_line = await reader.readline()
+            if first_line == BINARY_HELLO:
+                await self._serve(reader, writer, self._parse_binary, b"")
+            else:
+                await self._serve(reader, writer, self._parse_text, first_line)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, parse, buffer: bytes) -> None:
+        """
+        Execute the complete requests found in the buffer, write their replies with a single write, and repeat
+        """
+        while True:
+            requests, buffer = parse(buffer)
+            if requests:
+                if self.threaded:
+                    replies = await asyncio.gather(*(self._reply_async(*request) for request in requests))
+                else:
+                    replies = [self._reply(*request) for request in requests]
+                writer.write(b"".join(replies))
+                await writer.drain()
+            data = await reader.read(65536)
+            if not data:
+                return
+            buffer += data
+
+    def _reply(self, binary: bool, sequence: int, robot_index: int, command: str | None) -> bytes:
+        try:
+            if command is None:
+                raise CleaningRobotError("Commands must be ASCII")
+            status = self.execute(robot_index, command)
+            # Packed in the try: a pose which does not fit the record is reported like any failure
+            return self._record(sequence, robot_index, status) if binary else f"{status}\n".encode()
+        except Exception as error:  # Reported to the client, the other commands in flight go on
+            return pack_status(sequence, None) if binary else f"ERR {error}\n".encode()
+
+    async def _reply_async(self, binary: bool, sequence: int, robot_index: int, command: str | None) -> bytes:
+        try:
+            if command is None:
+                raise CleaningRobotError("Commands must be ASCII")
+            status = await self._execute_async(robot_index, command)
+            # Packed in the try: a pose which does not fit the record is reported like any failure
+            return self._record(sequence, robot_index, status) if binary else f"{status}\n".encode()
+        except Exception as error:  # Reported to the client, the other commands in flight go on
+            return pack_status(sequence, None) if binary else f"ERR {error}\n".encode()
+
+    def _record(self, sequence: int, robot_index: int, status: str) -> bytes:
+        # Every status is the pose of the robot, plus the cell in front of it when blocked:
+        # they are packed from the robot without parsing the string
+        robot = self.robots[robot_index]
+        if status[0] == "(":
+            obstacle_x, obstacle_y = robot._next_cell()
+            return STATUS_RECORD.pack(sequence, robot.pos_x, robot.pos_y, robot._heading, FLAG_OBSTACLE,
+                                      obstacle_x, obstacle_y)
+        flags = FLAG_RECHARGE if status[0] == "!" else 0
+        return STATUS_RECORD.pack(sequence, robot.pos_x, robot.pos_y, robot._heading, flags, 0, 0)
+
+    @staticmethod
+    def _parse_binary(buffer: bytes) -> tuple[list, bytes]:
+        requests = []
+        offset = 0
+        header_size = COMMAND_HEADER.size
+        while len(buffer) - offset >= header_size:
+            sequence, robot_index, length = COMMAND_HEADER.unpack_from(buffer, offset)
+            end = offset + header_size + length
+            if end > len(buffer):
+                break
+            try:
+                command = buffer[offset + header_size:end].decode("ascii")
+            except UnicodeDecodeError:
+                command = None  # Answered with an error record
+            requests.append((True, sequence, robot_index, command))
+            offset = end
+        return requests, buffer[offset:]
+
+    @staticmethod
+    def _parse_text(buffer: bytes) -> tuple[list, bytes]:
+        *lines, rest = buffer.split(b"\n")
+        requests = []
+        for sequence, line in enumerate(lines):
+            fields = line.decode("ascii", "replace").split()
+            if len(fields) == 2 and fields[0].isascii() and fields[0].isdigit():
+                requests.append((False, sequence, int(fields[0]), fields[1]))
+            else:
+                requests.append((False, sequence, -1, line.decode("ascii", "replace")))
+        return requests, rest
+
+
+class RMSClient:
+    """
+    Client of an RMSServer, standing in for the RMS. Commands can be sent by concurrent tasks:
+    they are pipelined over the connection and each caller gets the status of its own command.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, binary: bool = True):
+        self._reader = reader
+        self._writer = writer
+        self.binary = binary
+        self._pending = deque()
+        self._sequence = 0
+        if binary:
+            writer.write(BINARY_HELLO)
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect_tcp(cls, host: str, port: int, binary: bool = True) -> "RMSClient":
+        return cls(*await asyncio.open_connection(host, port), binary)
+
+    @classmethod
+    async def connect_unix(cls, path: str, binary: bool = True) -> "RMSClient":
+        return cls(*await asyncio.open_unix_connection(path), binary)
+
+    def send(self, robot_index: int, command: str) -> asyncio.Future:
+        """
+        Send a command without waiting for the previous ones
+        :return: a future of the status (a RobotStatus in binary mode, a string in text mode; None if it failed)
+        """
+        if self.binary:
+            encoded = command.encode("ascii")
+            if len(encoded) > 255:
+                raise CleaningRobotError("Commands longer than 255 characters cannot be sent in binary mode")
+            frame = COMMAND_HEADER.pack(self._sequence, robot_index, len(encoded)) + encoded
+        else:
+            frame = f"{robot_index} {command}\n".encode("ascii")
+        future = asyncio.get_running_loop().create_future()
+        self._writer.write(frame)
+        self._sequence = (self._sequence + 1) & 0xFFFFFFFF
+        self._pending.append(future)
+        return future
+
+    async def execute(self, robot_index: int, command: str):
+        """
+        :return: the status of the command, see send
+        """
+        future = self.send(robot_index, command)
+        await self._writer.drain()
+        return await future
+
+    async def execute_many(self, commands: Iterable[tuple[int, str]]) -> list:
+        """
+        Send (robot index, command) pairs back to back
+        :return: their statuses, in the same order
+        """
+        futures = [self.send(robot_index, command) for robot_index, command in commands]
+        await self._writer.drain()
+        return list(await asyncio.gather(*futures))
+
+    async def _receive(self) -> None:
+        reader = self._reader
+        pending = self._pending
+        buffer = b""
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    raise ConnectionError("closed by the server")
+                buffer += data
+                if self.binary:
+                    complete = len(buffer) - len(buffer) % STATUS_RECORD.size
+                    for offset in range(0, complete, STATUS_RECORD.size):
+                        pending.popleft().set_result(unpack_status(buffer[offset:offset + STATUS_RECORD.size])[1])
+                    buffer = buffer[complete:]
+                else:
+                    *lines, buffer = buffer.split(b"\n")
+                    for line in lines:
+                        pending.popleft().set_result(None if line.startswith(b"ERR ") else line.decode("ascii"))
+        except ConnectionError as error:
+            while pending:
+                pending.popleft().set_exception(ConnectionError(f"Connection to the RMS server lost: {error}"))
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._receiver.cancel()
+        try:
+            await self._receiver
+        except asyncio.CancelledError:
+            pass
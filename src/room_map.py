@@ -0,0 +1,137 @@
+import os
+import struct
+
+import numpy as np
+
+from src.cleaning_robot import CleaningRobotError
+
+
+class RoomMap:
+    """
+    Dense map of the room, one byte of flags per cell.
+    The grid grows automatically to contain any cell that is marked, including negative coordinates.
+    """
+
+    OBSTACLE = 1
+    CLEANED = 2
+
+    # File layout: header, then the grid in row-major (x, y) order
+    _MAGIC = b"CRMAP001"
+    _HEADER = struct.Struct("<8sqqqq")  # magic, origin x, origin y, width, height
+    _DATA_OFFSET = 64
+
+    def __init__(self, width: int = 16, height: int = 16, origin: tuple[int, int] = (0, 0)):
+        """
+        :param width: initial number of cells along x
+        :param height: initial number of cells along y
+        :param origin: coordinates of the bottom-left cell of the grid
+        """
+        self.grid = np.zeros((max(width, 1), max(height, 1)), dtype=np.uint8)
+        self.origin_x, self.origin_y = origin
+        self.version = 0  # Incremented every time an obstacle is added, to invalidate what depends on them
+
+    @property
+    def width(self) -> int:
+        return self.grid.shape[0]
+
+    @property
+    def height(self) -> int:
+        return self.grid.shape[1]
+
+    def bounds(self) -> tuple[int, int, int, int]:
+        """
+        :return: (min x, min y, max x, max y) of the cells covered by the grid
+        """
+        return (self.origin_x, self.origin_y,
+                self.origin_x + self.width - 1, self.origin_y + self.height - 1)
+
+    def cell(self, x: int, y: int) -> int:
+        """
+        :return: the flags of a cell, 0 for cells outside the grid
+        """
+        gx = x - self.origin_x
+        gy = y - self.origin_y
+        if 0 <= gx < self.grid.shape[0] and 0 <= gy < self.grid.shape[1]:
+            return int(self.grid[gx, gy])
+        return 0
+
+    def is_obstacle(self, x: int, y: int) -> bool:
+        return bool(self.cell(x, y) & self.OBSTACLE)
+
+    def is_cleaned(self, x: int, y: int) -> bool:
+        return bool(self.cell(x, y) & self.CLEANED)
+
+    def mark_obstacle(self, x: int, y: int) -> None:
+        gx, gy = self._grow_to(x, y)
+        if not self.grid[gx, gy] & self.OBSTACLE:
+            self.grid[gx, gy] |= self.OBSTACLE
+            self.version += 1
+
+    def mark_cleaned(self, x: int, y: int) -> None:
+        gx, gy = self._grow_to(x, y)
+        self.grid[gx, gy] |= self.CLEANED
+
+    def obstacle_grid(self) -> np.ndarray:
+        """
+        :return: a boolean grid of the obstacles, indexed like grid (see src.preview.preview)
+        """
+        return (self.grid & self.OBSTACLE).astype(bool)
+
+    def _grow_to(self, x: int, y: int) -> tuple[int, int]:
+        gx = x - self.origin_x
+        gy = y - self.origin_y
+        width, height = self.grid.shape
+        if 0 <= gx < width and 0 <= gy < height:
+            return gx, gy
+
+        # Grow by at least doubling the size, so that walking along a direction costs amortized O(1)
+        shift_x = shift_y = 0
+        new_width, new_height = width, height
+        if gx < 0:
+            shift_x = max(-gx, width)
+        elif gx >= width:
+            new_width = max(gx + 1, 2 * width)
+        if gy < 0:
+            shift_y = max(-gy, height)
+        elif gy >= height:
+            new_height = max(gy + 1, 2 * height)
+
+        grid = np.zeros((new_width + shift_x, new_height + shift_y), dtype=np.uint8)
+        grid[shift_x:shift_x + width, shift_y:shift_y + height] = self.grid
+        self.grid = grid
+        self.origin_x -= shift_x
+        self.origin_y -= shift_y
+        return gx + shift_x, gy + shift_y
+
+    def save(self, path: str) -> None:
+        """
+        Write the map to a file that can be memory-mapped by load
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(self._HEADER.pack(self._MAGIC, self.origin_x, self.origin_y, self.width, self.height)
+                       .ljust(self._DATA_OFFSET, b"\0"))
+            file.write(np.ascontiguousarray(self.grid).tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "RoomMap":
+        """
+        Open a map written by save
+        :param mmap: if True, the grid is memory-mapped and changes are written back to the file
+        (until the grid has to grow)
+        """
+        with open(path, "rb") as file:
+            magic, origin_x, origin_y, width, height = cls._HEADER.unpack(file.read(cls._HEADER.size))
+        if magic != cls._MAGIC:
+            raise CleaningRobotError(f"{path} is not a room map")
+
+        room_map = cls.__new__(cls)
+        room_map.origin_x = origin_x
+        room_map.origin_y = origin_y
+        room_map.version = 0
+        if mmap:
+            room_map.grid = np.memmap(path, dtype=np.uint8, mode="r+", offset=cls._DATA_OFFSET, shape=(width, height))
+        else:
+            room_map.grid = np.fromfile(path, dtype=np.uint8, offset=cls._DATA_OFFSET).reshape(width, height)
+        return room_map
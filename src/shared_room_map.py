@@ -0,0 +1,240 @@
+import multiprocessing
+import struct
+from multiprocessing import shared_memory
+
+from src.cleaning_robot import CleaningRobotError
+
+
+class SharedRoomMap:
+    """
+    Map of the room shared by the robots of several processes through shared memory: an obstacle layer,
+    a cleaned layer and a reservation slot per cell, holding the id of the robot which claimed the cell.
+    Marking a cell is a single byte write, so the layers are updated without locks; a reservation is
+    taken with a compare-and-set under one of a few striped locks.
+    Unlike RoomMap the grid does not grow, so it must cover the whole room.
+    It is passed to the robot processes as an argument when they are started (e.g., Process(args=(...))),
+    which attaches them to the same memory; the process which created it calls unlink() once done.
+    """
+
+    OBSTACLE = 1
+    CLEANED = 2
+
+    _MAGIC = b"CRSHM001"
+    _HEADER = struct.Struct("<8sqqqq")  # magic, origin x, origin y, width, height
+    _VERSION = struct.Struct("<q")
+    _VERSION_OFFSET = 48
+    _DATA_OFFSET = 64
+
+    def __init__(self, width: int, height: int, origin: tuple[int, int] = (0, 0), stripes: int = 64):
+        """
+        :param width: number of cells along x
+        :param height: number of cells along y
+        :param origin: coordinates of the bottom-left cell of the grid
+        :param stripes: number of locks guarding the reservations, a cell uses the lock of its index modulo stripes
+        """
+        if width < 1 or height < 1:
+            raise CleaningRobotError("The shared map must have at least one cell")
+        cells = width * height
+        size = self._DATA_OFFSET + 2 * cells + (-2 * cells) % 4 + 4 * cells
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        self._HEADER.pack_into(shm.buf, 0, self._MAGIC, origin[0], origin[1], width, height)
+        self._VERSION.pack_into(shm.buf, self._VERSION_OFFSET, 0)
+        self._locks = [multiprocessing.Lock() for _ in range(stripes)]
+        self._version_lock = multiprocessing.Lock()
+        self._owner = True
+        self._attach(shm)
+
+    def _attach(self, shm: shared_memory.SharedMemory) -> None:
+        self._shm = shm
+        magic, self.origin_x, self.origin_y, self.width, self.height = self._HEADER.unpack_from(shm.buf, 0)
+        if magic != self._MAGIC:
+            raise CleaningRobotError("Not a shared room map")
+        cells = self.width * self.height
+        start = self._DATA_OFFSET
+        self._obstacles = shm.buf[start:start + cells]
+        self._cleaned = shm.buf[start + cells:start + 2 * cells]
+        start += 2 * cells + (-2 * cells) % 4
+        self._reservations = shm.buf[start:start + 4 * cells].cast("i")
+
+    def __getstate__(self) -> dict:
+        return {"name": self._shm.name, "locks": self._locks, "version_lock": self._version_lock}
+
+    def __setstate__(self, state: dict) -> None:
+        self._locks = state["locks"]
+        self._version_lock = state["version_lock"]
+        self._owner = False
+        self._attach(shared_memory.SharedMemory(name=state["name"]))
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def version(self) -> int:
+        """
+        Incremented every time an obstacle is added by any robot, to invalidate what depends on them
+        """
+        return self._VERSION.unpack_from(self._shm.buf, self._VERSION_OFFSET)[0]
+
+    def bounds(self) -> tuple[int, int, int, int]:
+        """
+        :return: (min x, min y, max x, max y) of the cells covered by the grid
+        """
+        return (self.origin_x, self.origin_y,
+                self.origin_x + self.width - 1, self.origin_y + self.height - 1)
+
+    def _index(self, x: int, y: int) -> int | None:
+        gx = x - self.origin_x
+        gy = y - self.origin_y
+        if 0 <= gx < self.width and 0 <= gy < self.height:
+            return gx * self.height + gy
+        return None
+
+    def cell(self, x: int, y: int) -> int:
+        """
+        :return: the flags of a cell, 0 for cells outside the grid
+        """
+        index = self._index(x, y)
+        if index is None:
+            return 0
+        return self._obstacles[index] | self._cleaned[index] << 1
+
+    def is_obstacle(self, x: int, y: int) -> bool:
+        index = self._index(x, y)
+        return index is not None and self._obstacles[index] == 1
+
+    def is_cleaned(self, x: int, y: int) -> bool:
+        index = self._index(x, y)
+        return index is not None and self._cleaned[index] == 1
+
+    def mark_obstacle(self, x: int, y: int) -> None:
+        """
+        Mark a cell as an obstacle, cells outside the grid are ignored
+        """
+        index = self._index(x, y)
+        if index is None or self._obstacles[index]:
+            return
+        with self._version_lock:
+            if not self._obstacles[index]:
+                self._obstacles[index] = 1
+                version = self._VERSION.unpack_from(self._shm.buf, self._VERSION_OFFSET)[0]
+                self._VERSION.pack_into(self._shm.buf, self._VERSION_OFFSET, version + 1)
+
+    def mark_cleaned(self, x: int, y: int) -> None:
+        """
+        Mark a cell as cleaned, cells outside the grid are ignored
+        """
+        index = self._index(x, y)
+        if index is not None:
+            self._cleaned[index] = 1
+
+    def reserve(self, x: int, y: int, robot_id: int) -> bool:
+        """
+        Claim a cell for a robot
+        :param robot_id: a positive number identifying the robot
+        :return: True if the cell is now claimed by the robot, False if another robot holds it.
+            Cells outside the grid cannot be held by anyone, so they are always granted
+        """
+        if robot_id < 1:
+            raise CleaningRobotError("Robot ids must be positive")
+        index = self._index(x, y)
+        if index is None:
+            return True
+        reservations = self._reservations
+        holder = reservations[index]
+        if holder == robot_id:
+            return True
+        if holder:
+            return False  # Checked without the lock: a claimed cell is only released by its holder
+        with self._locks[index % len(self._locks)]:
+            if reservations[index]:
+                return False
+            reservations[index] = robot_id
+            return True
+
+    def release(self, x: int, y: int, robot_id: int) -> None:
+        """
+        Release a cell, if the robot holds it
+        """
+        index = self._index(x, y)
+        if index is None:
+            return
+        with self._locks[index % len(self._locks)]:
+            if self._reservations[index] == robot_id:
+                self._reservations[index] = 0
+
+    def reserved_by(self, x: int, y: int) -> int | None:
+        """
+        :return: the id of the robot holding the cell, None if it is free
+        """
+        index = self._index(x, y)
+        if index is None:
+            return None
+        return self._reservations[index] or None
+
+    def claims(self, robot_id: int) -> "CellClaims":
+        """
+        :return: the claims of a robot on this map, to be set as CleaningRobot.cell_claims
+        """
+        return CellClaims(self, robot_id)
+
+    def close(self) -> None:
+        """
+        Detach this process from the shared memory
+        """
+        self._reservations.release()
+        self._obstacles.release()
+        self._cleaned.release()
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """
+        Free the shared memory, once every process is done with it; only the creator can do it
+        """
+        if not self._owner:
+            raise CleaningRobotError("Only the process which created the shared map can unlink it")
+        self._shm.unlink()
+
+    def __enter__(self) -> "SharedRoomMap":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+        if self._owner:
+            self.unlink()
+
+
+class CellClaims:
+    """
+    The cells held by one robot: the one it is in and, while it moves, the one it is moving to
+    """
+
+    def __init__(self, shared_map: SharedRoomMap, robot_id: int):
+        self.shared_map = shared_map
+        self.robot_id = robot_id
+        self.held = []
+
+    def claim(self, x: int, y: int) -> bool:
+        """
+        Claim the cell the robot is about to enter
+        :return: False if another robot holds the cell
+        """
+        if not self.shared_map.reserve(x, y, self.robot_id):
+            return False
+        if (x, y) not in self.held:
+            self.held.append((x, y))
+        return True
+
+    def arrived(self, x: int, y: int) -> None:
+        """
+        Release the cells the robot left, keeping the one it is in
+        """
+        for held_x, held_y in self.held:
+            if (held_x, held_y) != (x, y):
+                self.shared_map.release(held_x, held_y, self.robot_id)
+        self.held = [(x, y)]
+
+    def release_all(self) -> None:
+        for x, y in self.held:
+            self.shared_map.release(x, y, self.robot_id)
+        self.held = []
@@ -0,0 +1,159 @@
+import os
+import struct
+import time
+
+import numpy as np
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+
+# Flags of a record
+GARBAGE_BAG_OK = 1
+SOAP_CONTAINER_OK = 2
+WATER_CONTAINER_OK = 4
+BLOCKED = 8  # The infrared sensor (or another robot) stopped a forward move
+RECHARGE = 16
+
+NO_CHARGE = -1  # The battery has not been read yet
+NO_HEADING = 255
+MAX_REPEAT = 2 ** 32 - 1
+
+RECORD = np.dtype([
+    ("time", "<f8"),  # time.time() at the end of the step
+    ("duration", "<f4"),  # Seconds spent executing the step
+    ("x", "<i4"),
+    ("y", "<i4"),
+    ("repeat", "<u4"),  # Cells of a run-length command (e.g., 5 for "f5"), 1 for a single step
+    ("action", "S1"),  # "f", "l" or "r"
+    ("heading", "u1"),
+    ("charge", "i1"),
+    ("flags", "u1"),
+])
+
+
+class TelemetryLog:
+    """
+    Fixed capacity ring buffer of the steps executed by a robot, kept in a preallocated structured array:
+    recording a step stores the fields in place, so the control loop does not allocate any record.
+    The records not yet written can be appended to a file, which can be memory-mapped by load.
+    """
+
+    # File layout: header, then the records in chronological order
+    _MAGIC = b"CRTLM002"
+    _HEADER = struct.Struct("<8sq")  # magic, number of records
+    _DATA_OFFSET = 64
+
+    def __init__(self, capacity: int = 65536):
+        if capacity < 1:
+            raise CleaningRobotError("The telemetry log needs room for at least one record")
+        self.records = np.zeros(capacity, dtype=RECORD)
+        self.capacity = capacity
+        self.count = 0  # Steps recorded so far, including the ones overwritten
+        self._flushed = 0  # Steps already appended to a file
+        self.dropped = 0  # Steps overwritten before they could be appended to a file
+        # One view per field, so that recording writes the fields without creating a record object
+        self._time = self.records["time"]
+        self._duration = self.records["duration"]
+        self._x = self.records["x"]
+        self._y = self.records["y"]
+        self._repeat = self.records["repeat"]
+        self._action = self.records["action"]
+        self._heading = self.records["heading"]
+        self._charge = self.records["charge"]
+        self._flags = self.records["flags"]
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def record(self, robot: CleaningRobot, command: str, status: str, duration: float) -> None:
+        """
+        Store a step, overwriting the oldest one when the log is full
+        :param command: the command of the step, stored as its action and its repeat count
+        :param status: the status returned for the step
+        :param duration: seconds spent executing it
+        """
+        repeat = command[1:]
+        if not repeat:
+            repeat = 1
+        elif repeat.isascii() and repeat.isdigit() and int(repeat) <= MAX_REPEAT:
+            repeat = int(repeat)
+        else:
+            raise CleaningRobotError(f"The command {command} cannot be recorded")
+        index = self.count % self.capacity
+        self._time[index] = time.time()
+        self._duration[index] = duration
+        self._x[index] = robot.pos_x
+        self._y[index] = robot.pos_y
+        self._repeat[index] = repeat
+        self._action[index] = command[:1]
+        self._heading[index] = NO_HEADING if robot._heading is None else robot._heading
+        charge = robot.last_charge_left
+        self._charge[index] = NO_CHARGE if charge is None else charge
+        flags = 0
+        if robot.garbage_bag_resource_available:
+            flags |= GARBAGE_BAG_OK
+        if robot.soap_container_resource_available:
+            flags |= SOAP_CONTAINER_OK
+        if robot.water_container_resource_available:
+            flags |= WATER_CONTAINER_OK
+        if status[0] == "(":
+            flags |= BLOCKED
+        elif status[0] == "!":
+            flags |= RECHARGE
+        self._flags[index] = flags
+        self.count += 1
+
+    def latest(self, n: int | None = None) -> np.ndarray:
+        """
+        :return: a copy of the last n records (all the stored ones if None), oldest first
+        """
+        stored = len(self)
+        n = stored if n is None else min(n, stored)
+        return self._since(self.count - n)
+
+    def _since(self, first: int) -> np.ndarray:
+        indices = np.arange(first, self.count) % self.capacity
+        return self.records[indices]
+
+    def flush(self, path: str) -> int:
+        """
+        Append the records stored since the last flush to a file, creating it if needed
+        :return: the number of records appended
+        """
+        first = max(self._flushed, self.count - self.capacity)
+        self.dropped += first - self._flushed
+        records = self._since(first)
+
+        if os.path.exists(path):
+            file = open(path, "r+b")
+            magic, stored = self._HEADER.unpack(file.read(self._HEADER.size))
+            if magic != self._MAGIC:
+                file.close()
+                raise CleaningRobotError(f"{path} is not a telemetry file")
+        else:
+            file = open(path, "w+b")
+            stored = 0
+        with file:
+            file.seek(self._DATA_OFFSET + stored * RECORD.itemsize)
+            file.write(records.tobytes())
+            file.flush()
+            # The count is updated after the records, so a torn write only loses the new records
+            file.seek(0)
+            file.write(self._HEADER.pack(self._MAGIC, stored + len(records)).ljust(self._DATA_OFFSET, b"\0"))
+        self._flushed = self.count
+        return len(records)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> np.ndarray:
+        """
+        Read the records of a file written by flush
+        :param mmap: if True, the records are memory-mapped (read only) instead of read in memory
+        """
+        with open(path, "rb") as file:
+            magic, stored = cls._HEADER.unpack(file.read(cls._HEADER.size))
+        if magic != cls._MAGIC:
+            raise CleaningRobotError(f"{path} is not a telemetry file")
+        if stored == 0:
+            return np.zeros(0, dtype=RECORD)
+        if mmap:
+            return np.memmap(path, dtype=RECORD, mode="r", offset=cls._DATA_OFFSET, shape=(stored,))
+        return np.fromfile(path, dtype=RECORD, count=stored, offset=cls._DATA_OFFSET)
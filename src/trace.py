@@ -0,0 +1,453 @@
+import struct
+import threading
+from collections import deque
+from typing import Iterator, NamedTuple
+
+import src.cleaning_robot as cleaning_robot
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+
+# Trace file layout: the magic, then one event after the other. An event starts with its kind:
+OUTPUT = b"O"  # pin, value
+OUTPUT_MANY = b"M"  # number of pins, the pins, their values
+INPUT = b"I"  # pin, level read by a recorded call (255 when the library returned None)
+LEVEL = b"L"  # pin, level read outside the recorded calls, e.g., by a ResourceMonitor
+CHARGE = b"C"  # charge read from the IBS by a recorded call, int16 (-32768 when it returned None)
+POLLED_CHARGE = b"P"  # charge read outside the recorded calls, e.g., by a BatteryMonitor
+INITIALIZE = b"N"  # initialize_robot was called
+COMMAND = b"X"  # length, ASCII command: execute_command was called
+BATCH = b"B"  # refresh_every int64, optimize: execute_commands was called
+BATCH_COMMAND = b"Q"  # length, ASCII command read by execute_commands from its sequence
+MOVE = b"V"  # cells int64: move_forward was called
+DOCK = b"D"  # max_attempts int64: return_to_dock was called
+STATUS = b"S"  # length, ASCII status returned by the call (or by a step of execute_commands)
+
+_MAGIC = b"CRTRC003"
+_PIN_VALUE = struct.Struct("<BB")
+_CHARGE = struct.Struct("<h")
+_BATCH = struct.Struct("<qB")
+_NUMBER = struct.Struct("<q")
+_NO_LEVEL = 255
+_NO_CHARGE = -32768
+
+
+class TraceWriter:
+    """
+    Writes the events of a session to a trace file
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "wb")
+        self._file.write(_MAGIC)
+        self.events = 0
+
+    def output(self, channel, value) -> None:
+        self.events += 1
+        if isinstance(channel, int):
+            self._file.write(OUTPUT + _PIN_VALUE.pack(channel, 1 if value else 0))
+            return
+        if not isinstance(value, (list, tuple)):
+            value = [value] * len(channel)
+        self._file.write(OUTPUT_MANY + bytes((len(channel), *channel)) + bytes(1 if v else 0 for v in value))
+
+    def input(self, channel: int, level) -> None:
+        self._pin_level(INPUT, channel, level)
+
+    def level(self, channel: int, level) -> None:
+        self._pin_level(LEVEL, channel, level)
+
+    def _pin_level(self, kind: bytes, channel: int, level) -> None:
+        self.events += 1
+        self._file.write(kind + _PIN_VALUE.pack(channel, _NO_LEVEL if level is None else (1 if level else 0)))
+
+    def charge(self, charge_left) -> None:
+        self._charge(CHARGE, charge_left)
+
+    def polled_charge(self, charge_left) -> None:
+        self._charge(POLLED_CHARGE, charge_left)
+
+    def _charge(self, kind: bytes, charge_left) -> None:
+        self.events += 1
+        self._file.write(kind + _CHARGE.pack(_NO_CHARGE if charge_left is None else charge_left))
+
+    def initialize(self) -> None:
+        self.events += 1
+        self._file.write(INITIALIZE)
+
+    def command(self, command: str) -> None:
+        self._text(COMMAND, command)
+
+    def batch(self, refresh_every: int, optimize: bool) -> None:
+        self.events += 1
+        self._file.write(BATCH + _BATCH.pack(refresh_every, 1 if optimize else 0))
+
+    def batch_command(self, command: str) -> None:
+        self._text(BATCH_COMMAND, command)
+
+    def move(self, cells: int) -> None:
+        self.events += 1
+        self._file.write(MOVE + _NUMBER.pack(cells))
+
+    def dock(self, max_attempts: int) -> None:
+        self.events += 1
+        self._file.write(DOCK + _NUMBER.pack(max_attempts))
+
+    def status(self, status: str) -> None:
+        self._text(STATUS, status)
+
+    def _text(self, kind: bytes, text: str) -> None:
+        encoded = text.encode("ascii")
+        if len(encoded) > 255:
+            raise CleaningRobotError("Commands and statuses longer than 255 characters cannot be traced")
+        self.events += 1
+        self._file.write(kind + bytes((len(encoded),)) + encoded)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "TraceWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_trace(path: str) -> Iterator[tuple[bytes, tuple]]:
+    """
+    :return: the (kind, arguments) of the events of a trace file, in order
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if data[:len(_MAGIC)] != _MAGIC:
+        raise CleaningRobotError(f"{path} is not a trace file")
+
+    offset = len(_MAGIC)
+    end = len(data)
+    while offset < end:
+        kind = data[offset:offset + 1]
+        offset += 1
+        if kind == OUTPUT or kind == INPUT or kind == LEVEL:
+            pin, level = _PIN_VALUE.unpack_from(data, offset)
+            offset += _PIN_VALUE.size
+            yield kind, (pin, None if level == _NO_LEVEL else level)
+        elif kind == OUTPUT_MANY:
+            count = data[offset]
+            pins = list(data[offset + 1:offset + 1 + count])
+            values = list(data[offset + 1 + count:offset + 1 + 2 * count])
+            offset += 1 + 2 * count
+            yield kind, (pins, values)
+        elif kind == CHARGE or kind == POLLED_CHARGE:
+            charge_left, = _CHARGE.unpack_from(data, offset)
+            offset += _CHARGE.size
+            yield kind, (None if charge_left == _NO_CHARGE else charge_left,)
+        elif kind == INITIALIZE:
+            yield kind, ()
+        elif kind == BATCH:
+            refresh_every, optimize = _BATCH.unpack_from(data, offset)
+            offset += _BATCH.size
+            yield kind, (refresh_every, optimize == 1)
+        elif kind == MOVE or kind == DOCK:
+            number, = _NUMBER.unpack_from(data, offset)
+            offset += _NUMBER.size
+            yield kind, (number,)
+        elif kind == COMMAND or kind == BATCH_COMMAND or kind == STATUS:
+            length = data[offset]
+            yield kind, (data[offset + 1:offset + 1 + length].decode("ascii"),)
+            offset += 1 + length
+        else:
+            raise CleaningRobotError(f"Unknown event {kind!r} in {path}")
+
+
+class _Calls(threading.local):
+    """
+    Number of recorded calls being executed by the current thread
+    """
+
+    depth = 0
+
+
+class RecordingGPIO:
+    """
+    GPIO library forwarding every call to the real one and tracing the pin reads and writes.
+    The reads made outside the calls of a recording robot (by a ResourceMonitor when it starts or on an edge, ...)
+    are traced as the level of the pin rather than as readings of a call.
+    """
+
+    def __init__(self, gpio, writer: TraceWriter, calls: _Calls | None = None):
+        self._gpio = gpio
+        self._writer = writer
+        self._calls = calls
+
+    def __getattr__(self, name):
+        return getattr(self._gpio, name)
+
+    def input(self, channel):
+        level = self._gpio.input(channel)
+        if self._calls is None or self._calls.depth:
+            self._writer.input(channel, level)
+        else:
+            self._writer.level(channel, level)
+        return level
+
+    def output(self, channel, value):
+        self._writer.output(channel, value)
+        self._gpio.output(channel, value)
+
+
+class RecordingIBS:
+    """
+    IBS forwarding the reads to the real one and tracing them, like RecordingGPIO (e.g., the polls of a
+    BatteryMonitor are traced as polled charges)
+    """
+
+    def __init__(self, ibs, writer: TraceWriter, calls: _Calls | None = None):
+        self._ibs = ibs
+        self._writer = writer
+        self._calls = calls
+
+    def __getattr__(self, name):
+        return getattr(self._ibs, name)
+
+    def get_charge_left(self):
+        charge_left = self._ibs.get_charge_left()
+        if self._calls is None or self._calls.depth:
+            self._writer.charge(charge_left)
+        else:
+            self._writer.polled_charge(charge_left)
+        return charge_left
+
+
+def recording_robot(writer: TraceWriter, gpio=None, ibs=None) -> CleaningRobot:
+    """
+    Create a robot whose GPIO and IBS traffic, and calls to initialize_robot, execute_command, execute_commands,
+    move_forward and return_to_dock with the statuses they returned, are written to a trace.
+    The asyncio methods are not recorded.
+    :param gpio: the GPIO library to record, by default the one imported by src.cleaning_robot
+    :param ibs: the battery sensor to record, by default an IBS on the I2C bus
+    """
+    if gpio is None:
+        gpio = cleaning_robot.GPIO
+    if ibs is None:
+        ibs = cleaning_robot.BACKEND.create_ibs()
+    calls = _Calls()
+    robot = CleaningRobot(gpio=RecordingGPIO(gpio, writer, calls), ibs=RecordingIBS(ibs, writer, calls))
+    initialize_robot = robot.initialize_robot
+    execute_command = robot.execute_command
+    execute_commands = robot.execute_commands
+    move_forward = robot.move_forward
+    return_to_dock = robot.return_to_dock
+
+    def call(method, *args):
+        calls.depth += 1
+        try:
+            return method(*args)
+        finally:
+            calls.depth -= 1
+
+    def recorded(method, *args) -> str:
+        try:
+            status = call(method, *args)
+        except CleaningRobotError as error:
+            writer.status(f"ERR {error}")
+            raise
+        writer.status(status)
+        return status
+
+    def recorded_initialize_robot() -> None:
+        if not calls.depth:
+            writer.initialize()
+        call(initialize_robot)
+
+    def recorded_execute_command(command: str) -> str:
+        if calls.depth:  # Called by another recorded method, which replays it
+            return execute_command(command)
+        writer.command(command)
+        return recorded(execute_command, command)
+
+    def recorded_commands(sequence):
+        for command in sequence:
+            writer.batch_command(command)
+            yield command
+
+    def recorded_execute_commands(sequence, refresh_every: int = 1, optimize: bool = False):
+        if calls.depth:
+            yield from execute_commands(sequence, refresh_every, optimize)
+            return
+        # Traced when the iteration starts, which is when the steps are executed
+        writer.batch(refresh_every, optimize)
+        statuses = execute_commands(recorded_commands(sequence), refresh_every, optimize)
+        while True:
+            try:
+                status = recorded(next, statuses)
+            except StopIteration:
+                return
+            yield status
+
+    def recorded_move_forward(cells: int) -> str:
+        if calls.depth:
+            return move_forward(cells)
+        writer.move(cells)
+        return recorded(move_forward, cells)
+
+    def recorded_return_to_dock(max_attempts: int = 10) -> str:
+        if calls.depth:
+            return return_to_dock(max_attempts)
+        writer.dock(max_attempts)
+        return recorded(return_to_dock, max_attempts)
+
+    robot.initialize_robot = recorded_initialize_robot
+    robot.execute_command = recorded_execute_command
+    robot.execute_commands = recorded_execute_commands
+    robot.move_forward = recorded_move_forward
+    robot.return_to_dock = recorded_return_to_dock
+    return robot
+
+
+class ReplayGPIO:
+    """
+    GPIO library returning the levels recorded in a trace. Each pin returns its own recorded levels in order,
+    so a build reading the pins in another order still gets the same values; the writes are collected in outputs.
+    Once the readings of a pin are used up, it returns the last level read outside the calls, if any
+    (e.g., a resource pin watched by a ResourceMonitor in the recorded session).
+    """
+
+    BOARD = 10
+    BCM = 11
+    IN = 1
+    OUT = 0
+    HIGH = 1
+    LOW = 0
+    BOTH = 33
+
+    def __init__(self, inputs: dict[int, deque]):
+        self._inputs = inputs
+        self.levels = {}
+        self.outputs = []
+
+    def input(self, channel):
+        levels = self._inputs.get(channel)
+        if levels:
+            return levels.popleft()
+        if channel in self.levels:
+            return self.levels[channel]
+        raise CleaningRobotError(f"The trace has no more readings of pin {channel}")
+
+    def output(self, channel, value):
+        self.outputs.append((channel, value))
+
+    def __getattr__(self, name):
+        # setmode, setup, add_event_detect, ...: nothing to replay
+        return lambda *args, **kwargs: None
+
+
+class ReplayIBS:
+    """
+    IBS returning the charges recorded in a trace, then the last polled charge, if any
+    """
+
+    def __init__(self, charges: deque):
+        self._charges = charges
+        self.polled = deque(maxlen=1)
+
+    def get_charge_left(self):
+        if self._charges:
+            return self._charges.popleft()
+        if self.polled:
+            return self.polled[0]
+        raise CleaningRobotError("The trace has no more battery readings")
+
+
+class ReplayReport(NamedTuple):
+    commands: list[str]  # Command of each status, "return_to_dock" for the statuses of return_to_dock
+    recorded: list[str]  # Statuses of the recorded session
+    replayed: list[str]  # Statuses returned by the replayed robot, "" when it returned fewer statuses
+
+    @property
+    def mismatches(self) -> list[tuple[int, str, str, str]]:
+        """
+        :return: (index, command, recorded status, replayed status) of the commands whose status changed
+        """
+        return [(index, command, recorded, replayed)
+                for index, (command, recorded, replayed) in enumerate(zip(self.commands, self.recorded, self.replayed))
+                if recorded != replayed]
+
+
+def _replayed_statuses(statuses: Iterator[str], count: int) -> list[str]:
+    """
+    :return: the first count statuses of a replayed execute_commands
+    """
+    replayed = []
+    try:
+        while len(replayed) < count:
+            replayed.append(next(statuses, ""))
+    except CleaningRobotError as error:
+        replayed.append(f"ERR {error}")
+    return replayed + [""] * (count - len(replayed))
+
+
+def replay(path: str, robot_class=CleaningRobot, setup=None) -> ReplayReport:
+    """
+    Call the recorded methods of a session again on a robot fed with the recorded readings.
+    The robot does not wait for its motors, even on the hardware, so a long session replays in seconds.
+    :param robot_class: the class of the robot to replay the session with, e.g., a new build
+    :param setup: called with the robot before the replay, to give it the components of the recorded robot
+        (room map, dock router, ...); monitors are not needed, the readings they made are replayed as levels
+    """
+    inputs = {}
+    charges = deque()
+    session = []  # [kind, arguments, commands of execute_commands, recorded statuses], in order
+    call = None
+    for kind, arguments in read_trace(path):
+        if kind == INPUT:
+            inputs.setdefault(arguments[0], deque()).append(arguments[1])
+        elif kind == CHARGE:
+            charges.append(arguments[0])
+        elif kind == STATUS:
+            call[3].append(arguments[0])
+        elif kind == BATCH_COMMAND:
+            call[2].append(arguments[0])
+        elif kind == LEVEL or kind == POLLED_CHARGE:
+            session.append([kind, arguments, None, None])
+        elif kind != OUTPUT and kind != OUTPUT_MANY:
+            call = [kind, arguments, [], []]
+            session.append(call)
+
+    gpio = ReplayGPIO(inputs)
+    ibs = ReplayIBS(charges)
+    robot = robot_class(gpio=gpio, ibs=ibs, wait_for_motors=False)
+    if setup is not None:
+        setup(robot)
+    commands = []
+    recorded = []
+    replayed = []
+    for kind, arguments, batch, statuses in session:
+        if kind == LEVEL:
+            gpio.levels[arguments[0]] = arguments[1]
+        elif kind == POLLED_CHARGE:
+            ibs.polled.append(arguments[0])
+        elif kind == INITIALIZE:
+            robot.initialize_robot()
+        elif kind == BATCH:
+            refresh_every, optimize = arguments
+            if optimize:
+                from src.command_optimizer import optimize_commands
+                commands.extend(list(optimize_commands(batch))[:len(statuses)])
+            else:
+                commands.extend(batch[:len(statuses)])
+            replayed.extend(_replayed_statuses(robot.execute_commands(batch, refresh_every, optimize), len(statuses)))
+            recorded.extend(statuses)
+        else:
+            if kind == COMMAND:
+                commands.append(arguments[0])
+                method = robot.execute_command
+            elif kind == MOVE:
+                commands.append(f"{CleaningRobot.FORWARD}{arguments[0]}")
+                method = robot.move_forward
+            else:
+                commands.append("return_to_dock")
+                method = robot.return_to_dock
+            try:
+                replayed.append(method(arguments[0]))
+            except CleaningRobotError as error:
+                replayed.append(f"ERR {error}")
+            recorded.extend(statuses)
+    return ReplayReport(commands, recorded, replayed)
@@ -0,0 +1,91 @@
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import Mock, patch, call
+
+from mock import GPIO
+from mock.ibs import IBS
+from src.battery_monitor import BatteryMonitor
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+
+
+class TestBatteryMonitor(TestCase):
+
+    def test_charge_left_is_cached(self):
+        ibs = Mock()
+        ibs.get_charge_left.return_value = 80
+        monitor = BatteryMonitor(ibs, max_age=60)
+        self.assertEqual(monitor.charge_left(), 80)
+        self.assertEqual(monitor.charge_left(), 80)
+        ibs.get_charge_left.assert_called_once()
+
+    @patch("src.battery_monitor.time.monotonic")
+    def test_stale_charge_left_is_read_again(self, mock_time: Mock):
+        ibs = Mock()
+        ibs.get_charge_left.side_effect = [80, 70]
+        mock_time.side_effect = [0, 100, 100]
+        monitor = BatteryMonitor(ibs, max_age=60)
+        monitor.sample()
+        self.assertEqual(monitor.charge_left(), 70)
+
+    def test_smoothed_charge_left(self):
+        ibs = Mock()
+        ibs.get_charge_left.side_effect = [80, 60]
+        monitor = BatteryMonitor(ibs, smoothing=0.5)
+        monitor.sample()
+        monitor.sample()
+        self.assertEqual(monitor.charge_left(), 60)
+        self.assertEqual(monitor.smoothed_charge_left(), 70)
+
+    def test_background_sampling(self):
+        ibs = Mock()
+        ibs.get_charge_left.return_value = 50
+        monitor = BatteryMonitor(ibs, interval=0.01)
+        monitor.start()
+        monitor.stop()
+        ibs.get_charge_left.assert_called()
+        self.assertFalse(monitor.is_stale())
+
+    def test_stale_reads_do_not_overlap_the_poller(self):
+        in_flight = []
+        overlaps = []
+        lock = threading.Lock()
+
+        def get_charge_left():
+            with lock:
+                in_flight.append(1)
+                overlaps.append(len(in_flight) > 1)
+            time.sleep(0.001)
+            with lock:
+                in_flight.pop()
+            return 50
+
+        ibs = Mock()
+        ibs.get_charge_left.side_effect = get_charge_left
+        monitor = BatteryMonitor(ibs, interval=0.0005, max_age=1e-9)
+        monitor.start()
+        try:
+            for _ in range(50):
+                self.assertEqual(monitor.charge_left(), 50)
+        finally:
+            monitor.stop()
+        self.assertGreater(len(overlaps), 25)
+        self.assertFalse(any(overlaps))
+
+    def test_invalid_smoothing(self):
+        self.assertRaises(CleaningRobotError, BatteryMonitor, Mock(), smoothing=0)
+
+    @patch.object(GPIO, "output")
+    @patch.object(IBS, "get_charge_left")
+    def test_manage_cleaning_system_reads_monitor(self, mock_ibs: Mock, mock_output: Mock):
+        ibs = Mock()
+        ibs.get_charge_left.side_effect = [50, 9]
+        r = CleaningRobot()
+        r.battery_monitor = BatteryMonitor(ibs, max_age=60)
+        r.manage_cleaning_system()
+        r.manage_cleaning_system()
+        r.battery_monitor.sample()
+        r.manage_cleaning_system()
+        mock_ibs.assert_not_called()
+        self.assertEqual(mock_output.call_args_list, [call(12, False), call(13, True), call(12, True), call(13, False)])
+        self.assertTrue(r.recharge_led_on)
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock import GPIO
+from mock.ibs import IBS
+from src.checkpoint import TELEMETRY_RECORD_SIZE, Checkpointer
+from src.docking import DockRouter
+from src.cleaning_robot import CleaningRobot
+from src.room_map import RoomMap
+from src.telemetry import RECORD, TelemetryLog
+
+
+class TestCheckpointer(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_session(self, commands: str, snapshot_every: int, r: CleaningRobot | None = None) -> CleaningRobot:
+        if r is None:
+            r = CleaningRobot()
+        r.room_map = RoomMap()
+        r.telemetry = TelemetryLog(16)
+        checkpointer = Checkpointer(self.directory.name, snapshot_every)
+        self.assertFalse(checkpointer.resume(r))
+        for command in commands:
+            r.execute_command(command)
+        checkpointer.close()
+        return r
+
+    def resumed_robot(self) -> tuple[CleaningRobot, bool]:
+        r = CleaningRobot()
+        checkpointer = Checkpointer(self.directory.name)
+        restored = checkpointer.resume(r)
+        self.addCleanup(checkpointer.close)
+        return r, restored
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_resume_from_snapshot_and_journal(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN or r.pos_y == 2
+        mock_ibs.return_value = 50
+        r = CleaningRobot()
+        self.run_session("ffrflff", snapshot_every=3, r=r)
+
+        restored_robot, restored = self.resumed_robot()
+        self.assertTrue(restored)
+        self.assertEqual(restored_robot.robot_status(), r.robot_status())
+        self.assertEqual(restored_robot.last_charge_left, 50)
+        self.assertTrue(restored_robot.garbage_bag_resource_available)
+        self.assertTrue((restored_robot.room_map.grid == r.room_map.grid).all())
+        self.assertTrue(restored_robot.room_map.is_obstacle(0, 3))
+        # The last step is in the journal only
+        self.assertEqual(restored_robot.telemetry.count, 7)
+        self.assertEqual(restored_robot.telemetry.latest().tobytes(), r.telemetry.latest().tobytes())
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_restored_telemetry_is_not_flushed_again(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 50
+        path = os.path.join(self.directory.name, "telemetry.bin")
+        r = CleaningRobot()
+        r.telemetry = TelemetryLog(16)
+        checkpointer = Checkpointer(self.directory.name, snapshot_every=3)
+        checkpointer.resume(r)
+        for command in "ffff":
+            r.execute_command(command)
+        r.telemetry.flush(path)  # After the snapshot of the third step
+        r.execute_command("f")
+        checkpointer.close()
+
+        restored_robot, _ = self.resumed_robot()
+        restored_robot.execute_command("f")
+        self.assertEqual(restored_robot.telemetry.flush(path), 2)
+        self.assertEqual(TelemetryLog.load(path, mmap=False)["y"].tolist(), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(restored_robot.telemetry.dropped, 0)
+
+    def test_telemetry_record_size(self):
+        self.assertEqual(TELEMETRY_RECORD_SIZE, RECORD.itemsize)
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_journal_replays_run_length_moves(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 50
+        r = CleaningRobot()
+        r.room_map = RoomMap()
+        checkpointer = Checkpointer(self.directory.name)
+        checkpointer.resume(r)
+        r.execute_command("f4")
+        r.execute_command("r")
+        checkpointer.close()
+
+        # Only the starting state is in the snapshot, the cells crossed by f4 come from the journal
+        restored_robot, _ = self.resumed_robot()
+        self.assertEqual(restored_robot.robot_status(), "0,4,E")
+        self.assertEqual([restored_robot.room_map.is_cleaned(0, y) for y in range(6)], [True, True, True, True, True, False])
+        self.assertTrue((restored_robot.room_map.grid == r.room_map.grid).all())
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_torn_journal_record_is_ignored(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 50
+        self.run_session("fff", snapshot_every=1000)
+        journal = os.path.join(self.directory.name, Checkpointer.JOURNAL_FILE)
+        os.truncate(journal, os.path.getsize(journal) - 5)
+
+        restored_robot, restored = self.resumed_robot()
+        self.assertTrue(restored)
+        self.assertEqual(restored_robot.robot_status(), "0,2,N")
+        restored_robot.execute_command("f")
+        restored_robot.checkpointer.close()
+        self.assertEqual(self.resumed_robot()[0].robot_status(), "0,3,N")
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_return_to_dock_is_journaled(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.side_effect = [100, 100, 100, 5]
+        r = CleaningRobot()
+        r.room_map = RoomMap()
+        r.dock_router = DockRouter(r.room_map)
+        checkpointer = Checkpointer(self.directory.name)
+        checkpointer.resume(r)
+        self.assertEqual([r.execute_command(command) for command in "frff"][-1], "!(1,1,E)")
+        self.assertEqual(r.return_to_dock(), "0,0,W")
+        checkpointer.close()
+
+        self.assertEqual(self.resumed_robot()[0].robot_status(), "0,0,W")
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_async_commands_are_journaled(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 50
+        r = CleaningRobot()
+        checkpointer = Checkpointer(self.directory.name)
+        checkpointer.resume(r)
+        asyncio.run(r.execute_command_async("f"))
+        asyncio.run(r.execute_command_async("f2"))
+        checkpointer.close()
+
+        self.assertEqual(self.resumed_robot()[0].robot_status(), "0,3,N")
+
+    def test_nothing_saved(self):
+        r, restored = self.resumed_robot()
+        self.assertFalse(restored)
+        self.assertEqual(r.robot_status(), "0,0,N")
@@ -0,0 +1,107 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock.ibs import IBS
+from src.checkpoint import Checkpointer
+from src.chunked_map import ChunkedMap
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.docking import DockRouter
+
+
+class TestChunkedMap(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_mark_cells(self):
+        room_map = ChunkedMap(self.directory.name)
+        room_map.mark_obstacle(-1, 70)
+        room_map.mark_cleaned(10**9, -10**9)
+        self.assertTrue(room_map.is_obstacle(-1, 70))
+        self.assertFalse(room_map.is_cleaned(-1, 70))
+        self.assertTrue(room_map.is_cleaned(10**9, -10**9))
+        self.assertEqual(room_map.resident_chunks, 2)
+
+    def test_reading_unknown_cells_allocates_nothing(self):
+        room_map = ChunkedMap(self.directory.name)
+        self.assertFalse(room_map.is_obstacle(5, 5))
+        self.assertEqual(room_map.resident_chunks, 0)
+
+    def test_cold_chunks_are_spilled(self):
+        room_map = ChunkedMap(self.directory.name, chunk_bits=2, max_chunks=2)
+        for x in range(0, 40, 4):
+            room_map.mark_obstacle(x, 0)
+        self.assertEqual(room_map.resident_chunks, 2)
+        for x in range(0, 40, 4):
+            self.assertTrue(room_map.is_obstacle(x, 0))
+            self.assertFalse(room_map.is_obstacle(x + 1, 0))
+
+    def test_flush_and_reopen(self):
+        room_map = ChunkedMap(self.directory.name)
+        room_map.mark_cleaned(3, -3)
+        room_map.flush()
+        self.assertTrue(ChunkedMap(self.directory.name).is_cleaned(3, -3))
+
+    def test_reopen_with_another_chunk_size(self):
+        room_map = ChunkedMap(self.directory.name, chunk_bits=4)
+        room_map.mark_cleaned(3, -3)
+        room_map.flush()
+        self.assertRaises(CleaningRobotError, ChunkedMap, self.directory.name, chunk_bits=6)
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "obstacle_found")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    def test_robot_records_into_map(self, mock_wheel: Mock, mock_obstacle: Mock, mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        mock_obstacle.side_effect = [False, True]
+        r = CleaningRobot()
+        r.room_map = ChunkedMap(self.directory.name)
+        r.initialize_robot()
+        list(r.execute_commands("ff"))
+        self.assertTrue(r.room_map.is_cleaned(0, 1))
+        self.assertTrue(r.room_map.is_obstacle(0, 2))
+
+    def test_dock_router_on_chunked_map(self):
+        room_map = ChunkedMap(self.directory.name, chunk_bits=2)
+        room_map.mark_obstacle(0, 1)
+        self.assertEqual(room_map.bounds(), (0, 0, 3, 3))
+        router = DockRouter(room_map)
+        self.assertEqual(router.route(0, 2, "S"), "lfrffrf")
+        room_map.mark_obstacle(1, 1)
+        self.assertEqual(room_map.version, 2)
+        self.assertEqual(router.distance(0, 2), 4)  # Around the obstacles, through x = -1
+        self.assertEqual(router.computations, 2)
+
+    def test_close_removes_temporary_directory(self):
+        room_map = ChunkedMap(chunk_bits=2, max_chunks=1)
+        room_map.mark_cleaned(0, 0)
+        room_map.mark_cleaned(10, 10)
+        self.assertTrue(os.path.isdir(room_map.directory))
+        room_map.close()
+        self.assertFalse(os.path.exists(room_map.directory))
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "obstacle_found")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    def test_checkpoint_writes_changed_chunks(self, mock_wheel: Mock, mock_obstacle: Mock, mock_ibs: Mock,
+                                              mock_ccr: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        mock_obstacle.return_value = False
+        map_directory = os.path.join(self.directory.name, "map")
+        r = CleaningRobot()
+        r.room_map = ChunkedMap(map_directory)
+        checkpointer = Checkpointer(os.path.join(self.directory.name, "checkpoint"), snapshot_every=2)
+        checkpointer.resume(r)
+        r.execute_command("f")
+        r.execute_command("f")
+        checkpointer.close()
+        self.assertTrue(ChunkedMap(map_directory).is_cleaned(0, 2))
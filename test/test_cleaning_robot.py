@@ -1,3 +1,4 @@
+import asyncio
 import unittest.mock
 from platform import system
 from unittest import TestCase
@@ -5,7 +6,7 @@ from unittest.mock import Mock, patch, call, MagicMock
 
 from mock import GPIO
 from mock.ibs import IBS
-from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.cleaning_robot import CleaningRobot, CleaningRobotError, RobotStatus
 
 
 class TestCleaningRobot(TestCase):
@@ -274,3 +275,216 @@ class TestCleaningRobot(TestCase):
         r.initialize_robot()
         mock_ccr.assert_called()
 
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    @patch.object(CleaningRobot, "activate_rotation_motor")
+    def test_execute_commands(self, mock_rotation: Mock, mock_wheel: Mock, mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        r = CleaningRobot()
+        r.initialize_robot()
+        result = list(r.execute_commands("frf"))
+        self.assertEqual(result, ["0,1,N", "0,1,E", "1,1,E"])
+        self.assertEqual(mock_ibs.call_count, 3)
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    def test_execute_commands_refreshes_sensors_every_n_steps(self, mock_wheel: Mock, mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        r = CleaningRobot()
+        r.initialize_robot()
+        result = list(r.execute_commands("fffff", refresh_every=2))
+        self.assertEqual(result[-1], "0,5,N")
+        self.assertEqual(mock_ibs.call_count, 3)
+        self.assertEqual(mock_ccr.call_count, 4)  # One of them from initialize_robot
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "obstacle_found")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    def test_execute_commands_stops_at_obstacle(self, mock_wheel: Mock, mock_obstacle: Mock, mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        mock_obstacle.side_effect = [False, True]
+        r = CleaningRobot()
+        r.initialize_robot()
+        result = list(r.execute_commands("fff"))
+        self.assertEqual(result, ["0,1,N", "(0,1,N)(0,2)"])
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    def test_execute_commands_stops_when_battery_is_under_10(self, mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.return_value = 9
+        mock_ccr.return_value = True
+        r = CleaningRobot()
+        r.initialize_robot()
+        result = list(r.execute_commands("fff"))
+        self.assertEqual(result, ["!(0,0,N)"])
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "activate_rotation_motor_async")
+    @patch.object(CleaningRobot, "activate_wheel_motor_async")
+    def test_execute_command_async(self, mock_wheel: Mock, mock_rotation: Mock, mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        r = CleaningRobot()
+        r.initialize_robot()
+        asyncio.run(r.execute_command_async("f"))
+        result = asyncio.run(r.execute_command_async("r"))
+        mock_wheel.assert_awaited_once()
+        mock_rotation.assert_awaited_once_with("r")
+        self.assertEqual(result, "0,1,E")
+
+    @patch("src.cleaning_robot.DEPLOYMENT", True)
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(GPIO, "input")
+    @patch.object(GPIO, "output")
+    def test_execute_command_async_cancelled_stops_the_motor(self, mock_output: Mock, mock_input: Mock, mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        mock_input.return_value = False
+        r = CleaningRobot()
+        r.initialize_robot()
+
+        async def cancel_while_moving():
+            task = asyncio.create_task(r.execute_command_async("f"))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_while_moving())
+        mock_output.assert_called_with([22, 16, 33], [GPIO.LOW, GPIO.LOW, GPIO.LOW])
+        self.assertEqual(r.robot_status(), "0,0,N")
+
+    @patch.object(GPIO, "output")
+    def test_activate_wheel_motor_writes_pins_in_bulk(self, mock_output: Mock):
+        r = CleaningRobot()
+        r.activate_wheel_motor()
+        r.activate_wheel_motor()
+        mock_output.assert_has_calls([
+            call([22, 18, 16, 33], [GPIO.HIGH, GPIO.LOW, GPIO.HIGH, GPIO.HIGH]),
+            call([22, 16, 33], [GPIO.LOW, GPIO.LOW, GPIO.LOW]),
+            call([22, 16, 33], [GPIO.HIGH, GPIO.HIGH, GPIO.HIGH]),
+            call([22, 16, 33], [GPIO.LOW, GPIO.LOW, GPIO.LOW])
+        ])
+        self.assertEqual(r.gpio_output.elided, 3)
+
+    def test_motor_levels_come_from_the_robot_gpio(self):
+        gpio = Mock()
+        gpio.HIGH, gpio.LOW = "high", "low"
+        r = CleaningRobot(gpio=gpio)
+        r.activate_rotation_motor("l")
+        gpio.output.assert_any_call([29, 31, 32, 33], ["high", "low", "high", "high"])
+
+    @patch.object(GPIO, "output")
+    @patch.object(GPIO, "input")
+    def test_check_garbage_bag_does_not_rewrite_led(self, mock_garbage_pin: Mock, mock_garbage_led: Mock):
+        mock_garbage_pin.return_value = True
+        r = CleaningRobot()
+        r.check_garbage_bag()
+        r.check_garbage_bag()
+        mock_garbage_led.assert_called_once_with(6, False)
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    @patch.object(CleaningRobot, "activate_rotation_motor")
+    def test_execute_commands_every_heading(self, mock_rotation: Mock, mock_wheel: Mock, mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        r = CleaningRobot()
+        r.initialize_robot()
+        result = list(r.execute_commands("lflflflfrrrr"))
+        self.assertEqual(result[:8], ["0,0,W", "-1,0,W", "-1,0,S", "-1,-1,S", "-1,-1,E", "0,-1,E", "0,-1,N", "0,0,N"])
+        self.assertEqual(result[8:], ["0,0,E", "0,0,S", "0,0,W", "0,0,N"])
+
+    def test_set_wrong_heading(self):
+        r = CleaningRobot()
+        with self.assertRaises(CleaningRobotError):
+            r.heading = "X"
+
+    def test_robot_has_no_instance_dict_entries(self):
+        r = CleaningRobot()
+        r.initialize_robot()
+        self.assertEqual(r.__dict__, {})
+
+    def test_parse_status(self):
+        self.assertEqual(RobotStatus.parse("1,-2,N"), RobotStatus(1, -2, "N"))
+        self.assertEqual(RobotStatus.parse("!(1,2,E)"), RobotStatus(1, 2, "E", recharge=True))
+        self.assertEqual(RobotStatus.parse("(1,2,S)(1,1)"), RobotStatus(1, 2, "S", (1, 1)))
+        self.assertRaises(CleaningRobotError, RobotStatus.parse, "1,2")
+
+    @patch.object(GPIO, "output")
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "obstacle_found")
+    def test_execute_command_move_forward_several_cells(self, mock_obstacle: Mock, mock_ibs: Mock, mock_ccr: Mock, mock_output: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        mock_obstacle.return_value = False
+        r = CleaningRobot()
+        r.initialize_robot()
+        r.manage_cleaning_system()
+        mock_output.reset_mock()
+        result = r.execute_command("f3")
+        self.assertEqual(result, "0,3,N")
+        self.assertEqual(mock_obstacle.call_count, 3)
+        mock_output.assert_has_calls([
+            call([22, 18, 16, 33], [GPIO.HIGH, GPIO.LOW, GPIO.HIGH, GPIO.HIGH]),
+            call([22, 16, 33], [GPIO.LOW, GPIO.LOW, GPIO.LOW])
+        ])
+        self.assertEqual(mock_output.call_count, 2)
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "obstacle_found")
+    def test_move_forward_stops_at_obstacle(self, mock_obstacle: Mock, mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        mock_obstacle.side_effect = [False, False, True]
+        r = CleaningRobot()
+        r.initialize_robot()
+        result = r.move_forward(5)
+        self.assertEqual(result, "(0,2,N)(0,3)")
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    def test_execute_command_non_ascii_digits(self, mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        r = CleaningRobot()
+        r.initialize_robot()
+        self.assertRaises(CleaningRobotError, r.execute_command, "f\u00b2")
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "obstacle_found")
+    def test_execute_command_async_move_forward_several_cells(self, mock_obstacle: Mock, mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        mock_obstacle.side_effect = [False, False, False, True]
+        r = CleaningRobot()
+        r.initialize_robot()
+        self.assertEqual(asyncio.run(r.execute_command_async("f3")), "0,3,N")
+        self.assertEqual(asyncio.run(r.execute_command_async("f3")), "(0,3,N)(0,4)")
+        self.assertRaises(CleaningRobotError, asyncio.run, r.execute_command_async("f\u00b2"))
+
+    def test_move_forward_no_cells(self):
+        r = CleaningRobot()
+        r.initialize_robot()
+        self.assertRaises(CleaningRobotError, r.move_forward, 0)
+
+    @patch("time.sleep")
+    def test_wait_for_motors(self, mock_sleep: Mock):
+        CleaningRobot(wait_for_motors=True).activate_wheel_motor()
+        mock_sleep.assert_called_once_with(CleaningRobot.MOTOR_ACTIVATION_TIME)
+        with patch("src.cleaning_robot.DEPLOYMENT", True):
+            CleaningRobot(wait_for_motors=False).activate_rotation_motor("r")
+        mock_sleep.assert_called_once()
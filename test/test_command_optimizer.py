@@ -0,0 +1,61 @@
+import itertools
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock.ibs import IBS
+from src.cleaning_robot import CleaningRobot
+from src.command_optimizer import optimize_commands
+from src.preview import preview
+
+
+class TestCommandOptimizer(TestCase):
+
+    def test_optimize_rotation_runs(self):
+        self.assertEqual("".join(optimize_commands("lr")), "")
+        self.assertEqual("".join(optimize_commands("rrr")), "l")
+        self.assertEqual("".join(optimize_commands("llll")), "")
+        self.assertEqual("".join(optimize_commands("flllfrrfrlr")), "frfrrfr")
+
+    def test_same_poses_at_forward_commands(self):
+        commands = "ffrrrflrlflllllfrrff"
+        optimized = "".join(optimize_commands(commands))
+        original = preview(commands)
+        result = preview(optimized)
+        forward = [i for i, command in enumerate(commands) if command == "f"]
+        forward_optimized = [i for i, command in enumerate(optimized) if command == "f"]
+        self.assertEqual(original.x[forward].tolist(), result.x[forward_optimized].tolist())
+        self.assertEqual(original.y[forward].tolist(), result.y[forward_optimized].tolist())
+        self.assertEqual(original.heading[-1], result.heading[-1])
+
+    def test_unbounded_stream(self):
+        stream = optimize_commands(itertools.cycle("rrf"))
+        self.assertEqual("".join(itertools.islice(stream, 6)), "rrfrrf")
+
+    def test_rotation_runs_are_released_after_lookahead(self):
+        def live_stream():
+            yield "f"
+            yield from "rrrrr"
+            raise AssertionError("No more command has arrived yet")
+
+        stream = optimize_commands(live_stream(), lookahead=5)
+        self.assertEqual(list(itertools.islice(stream, 2)), ["f", "r"])
+
+    def test_endless_rotations(self):
+        stream = optimize_commands(itertools.repeat("r"), lookahead=3)
+        self.assertEqual("".join(itertools.islice(stream, 4)), "llll")
+
+    def test_other_commands_are_kept(self):
+        self.assertEqual(list(optimize_commands(["r", "r", "r", "f5", "x"])), ["l", "f5", "x"])
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    @patch.object(CleaningRobot, "activate_rotation_motor")
+    def test_execute_commands_optimized(self, mock_rotation: Mock, mock_wheel: Mock, mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        r = CleaningRobot()
+        r.initialize_robot()
+        result = list(r.execute_commands("rrrflrf", optimize=True))
+        self.assertEqual(result, ["0,0,W", "-1,0,W", "-2,0,W"])
+        mock_rotation.assert_called_once_with("l")
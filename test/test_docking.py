@@ -0,0 +1,76 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock.ibs import IBS
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.docking import DockRouter
+from src.room_map import RoomMap
+
+
+class TestDockRouter(TestCase):
+
+    def test_route(self):
+        room_map = RoomMap(4, 4)
+        room_map.mark_obstacle(0, 1)
+        router = DockRouter(room_map)
+        self.assertEqual(router.distance(0, 2), 4)
+        self.assertEqual(router.route(0, 2, "S"), "lfrffrf")
+
+    def test_distance_field_is_cached_until_obstacle_added(self):
+        room_map = RoomMap(4, 4)
+        router = DockRouter(room_map)
+        router.route(3, 3, "N")
+        room_map.mark_cleaned(2, 2)
+        router.route(2, 2, "N")
+        self.assertEqual(router.computations, 1)
+        room_map.mark_obstacle(1, 1)
+        router.route(2, 2, "N")
+        self.assertEqual(router.computations, 2)
+
+    def test_unreachable_dock(self):
+        room_map = RoomMap(3, 3, origin=(-1, -1))
+        for x, y in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+            room_map.mark_obstacle(x, y)
+        router = DockRouter(room_map, margin=0)
+        self.assertRaises(CleaningRobotError, router.route, 1, 1, "N")
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "obstacle_found")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    @patch.object(CleaningRobot, "activate_rotation_motor")
+    def test_robot_returns_to_dock_when_battery_low(self, mock_rotation: Mock, mock_wheel: Mock, mock_obstacle: Mock,
+                                                    mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.side_effect = [100, 100, 100, 5]
+        mock_ccr.return_value = True
+        mock_obstacle.return_value = False
+        r = CleaningRobot()
+        r.room_map = RoomMap()
+        r.dock_router = DockRouter(r.room_map)
+        r.initialize_robot()
+        result = list(r.execute_commands("frff"))
+        self.assertEqual(result[-1], "!(1,1,E)")
+        self.assertEqual(r.dock_route, "rfrf")
+        self.assertEqual(r.return_to_dock(), "0,0,W")
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "obstacle_found")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    def test_battery_low_with_unreachable_dock(self, mock_wheel: Mock, mock_obstacle: Mock, mock_ibs: Mock,
+                                               mock_ccr: Mock):
+        mock_ibs.return_value = 5
+        mock_ccr.return_value = True
+        mock_obstacle.return_value = False
+        r = CleaningRobot()
+        r.room_map = RoomMap(3, 3, origin=(-1, -1))
+        for x, y in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+            r.room_map.mark_obstacle(x, y)
+        r.dock_router = DockRouter(r.room_map, dock=(2, 2), margin=0)  # Walled off from the robot
+        r.initialize_robot()
+        self.assertEqual(r.execute_command("f"), "!(0,0,N)")
+        self.assertIsNone(r.dock_route)
+        self.assertTrue(r.recharge_led_on)
+        self.assertFalse(r.cleaning_system_on)
+        self.assertEqual(r.execute_command("f"), "!(0,0,N)")
+        mock_wheel.assert_not_called()
@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from sim.GPIO import SimGPIO
+from sim.ibs import IBS as SimIBS
+from sim.board import I2C
+from sim.world import SimWorld
+from src.cleaning_robot import CleaningRobot
+from src.fleet import RobotSpec, simulate_fleet, simulate_robot
+
+
+class TestFleet(TestCase):
+
+    def test_robots_in_one_process_do_not_share_hardware(self):
+        first_world = SimWorld(obstacles={(0, 1)})
+        second_world = SimWorld(charge=5)
+        first = CleaningRobot(gpio=SimGPIO(first_world), ibs=SimIBS(I2C(), world=first_world))
+        second = CleaningRobot(gpio=SimGPIO(second_world), ibs=SimIBS(I2C(), world=second_world))
+        first.initialize_robot()
+        second.initialize_robot()
+        self.assertEqual(first.execute_command("f"), "(0,0,N)(0,1)")
+        self.assertEqual(second.execute_command("f"), "!(0,0,N)")
+        self.assertEqual(first.execute_command("r"), "0,0,E")
+        self.assertEqual(first_world.pose, (0, 0, "E"))
+        self.assertEqual(second_world.pose, (0, 0, "N"))
+
+    def test_simulate_robot_metrics(self):
+        result = simulate_robot(RobotSpec("ffrfff", obstacles=((0, 3),), size=(2, 3)))
+        self.assertEqual(result.commands, 6)
+        self.assertEqual(result.status, "(1,2,E)(2,2)")
+        self.assertEqual(result.cells_cleaned, 4)
+        self.assertEqual(result.coverage, 4 / 6)
+        self.assertEqual(result.obstacle_hits, 2)
+        self.assertFalse(result.stopped)
+
+    def test_run_length_move_cleans_every_cell_crossed(self):
+        result = simulate_robot(RobotSpec(["f3"], size=(1, 4)))
+        self.assertEqual(result.status, "0,3,N")
+        self.assertEqual(result.cells_cleaned, 4)
+        self.assertEqual(result.coverage, 1.0)
+
+    def test_robot_stops_when_battery_runs_out(self):
+        result = simulate_robot(RobotSpec("ffff", charge=11, drain=1))
+        self.assertEqual(result.commands, 2)
+        self.assertTrue(result.stopped)
+        self.assertEqual(result.status, "!(0,2,N)")
+
+    def test_fleet_matches_robots_simulated_one_by_one(self):
+        specs = [RobotSpec("f" * n + "r" + "f" * n, size=(4, 4)) for n in range(6)]
+        report = simulate_fleet(specs, workers=2)
+        self.assertEqual(report.robots, [simulate_robot(spec)._replace(elapsed=result.elapsed)
+                                         for spec, result in zip(specs, report.robots)])
+        self.assertEqual(report.commands, sum(2 * n + 1 for n in range(6)))
+        self.assertEqual(report.obstacle_hits, sum(result.obstacle_hits for result in report.robots))
+        self.assertGreater(report.throughput, 0)
@@ -0,0 +1,40 @@
+from unittest import TestCase
+from unittest.mock import Mock, call
+
+from src.gpio_output import GPIOOutput
+
+
+class TestGPIOOutput(TestCase):
+
+    def test_write_skips_same_level(self):
+        gpio = Mock()
+        out = GPIOOutput(gpio)
+        out.write(12, True)
+        out.write(12, 1)
+        out.write(12, False)
+        gpio.output.assert_has_calls([call(12, True), call(12, False)])
+        self.assertEqual(out.writes, 2)
+        self.assertEqual(out.elided, 1)
+
+    def test_write_many_single_call(self):
+        gpio = Mock()
+        out = GPIOOutput(gpio)
+        out.write(7, False)
+        out.write_many([6, 7, 8], [True, False, True])
+        gpio.output.assert_called_with([6, 8], [True, True])
+        self.assertEqual(out.level(8), 1)
+
+    def test_write_many_single_changed_pin(self):
+        gpio = Mock()
+        out = GPIOOutput(gpio)
+        out.write_many([6, 7], [True, False])
+        out.write_many([6, 7], [True, True])
+        gpio.output.assert_called_with(7, True)
+
+    def test_invalidate(self):
+        gpio = Mock()
+        out = GPIOOutput(gpio)
+        out.write(6, True)
+        out.invalidate()
+        out.write(6, True)
+        self.assertEqual(gpio.output.call_count, 2)
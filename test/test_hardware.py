@@ -0,0 +1,50 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+import mock.GPIO
+import sim.GPIO
+from mock import GPIO
+from src import cleaning_robot
+from src.cleaning_robot import CleaningRobot
+from src.hardware import Backend, select_backend
+
+
+class TestHardware(TestCase):
+
+    def test_select_backend(self):
+        self.assertIs(select_backend("sim").gpio, sim.GPIO)
+        self.assertIs(select_backend("mock").gpio, mock.GPIO)
+        self.assertRaises(ValueError, select_backend, "arduino")
+
+    @patch.dict("os.environ", {"CLEANING_ROBOT_BACKEND": "auto"})
+    def test_auto_falls_back_to_mocks_without_raspberry_pi(self):
+        try:
+            import RPi.GPIO  # noqa: F401
+            self.skipTest("RPi.GPIO is installed")
+        except (ImportError, RuntimeError):
+            pass
+        self.assertEqual(select_backend().name, "mock")
+
+    def test_libraries_imported_on_first_use(self):
+        backend = Backend("test", "mock.GPIO", "no.such.board", "no.such.ibs", deployment=False)
+        self.assertIs(backend.gpio, mock.GPIO)
+        self.assertRaises(ImportError, backend.create_ibs)
+
+    @patch.object(GPIO, "setup")
+    def test_pins_set_up_in_bulk(self, mock_setup: Mock):
+        CleaningRobot()
+        self.assertEqual(mock_setup.call_count, 2)
+        mock_setup.assert_any_call(CleaningRobot.INPUT_PINS, GPIO.IN)
+        mock_setup.assert_any_call(CleaningRobot.OUTPUT_PINS, GPIO.OUT, initial=GPIO.LOW)
+        self.assertEqual(sorted(CleaningRobot.INPUT_PINS + CleaningRobot.OUTPUT_PINS),
+                         [6, 7, 8, 9, 10, 11, 12, 13, 15, 16, 18, 22, 29, 31, 32, 33])
+
+    def test_ibs_created_on_first_battery_read(self):
+        with patch.object(cleaning_robot.BACKEND, "create_ibs") as mock_create_ibs:
+            mock_create_ibs.return_value.get_charge_left.return_value = 100
+            r = CleaningRobot()
+            mock_create_ibs.assert_not_called()
+            r.manage_cleaning_system()
+            r.manage_cleaning_system()
+        mock_create_ibs.assert_called_once_with()
+        self.assertTrue(r.cleaning_system_on)
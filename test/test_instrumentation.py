@@ -0,0 +1,113 @@
+import asyncio
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock import GPIO
+from mock.ibs import IBS
+from src import cleaning_robot
+from src.battery_monitor import BatteryMonitor
+from src.cleaning_robot import CleaningRobot
+from src.instrumentation import Histogram, Instrumentation, prometheus_text
+
+
+class TestInstrumentation(TestCase):
+
+    def test_histogram_buckets(self):
+        histogram = Histogram((0.001, 0.01))
+        for seconds in (0.0005, 0.001, 0.005, 2.0):
+            histogram.observe(seconds)
+        self.assertEqual(histogram.cumulative(), [(0.001, 2), (0.01, 3), (float("inf"), 4)])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.total, 2.0065)
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_stages_and_io_counters(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 100
+        r = CleaningRobot()
+        r.initialize_robot()
+        with Instrumentation(r) as instrumentation:
+            self.assertEqual(r.execute_command("f"), "0,1,N")
+        stats = instrumentation.stats()
+        self.assertEqual({stage: stage_stats["count"] for stage, stage_stats in stats["stages"].items()},
+                         {"command": 1, "battery": 1, "resources": 1, "infrared": 1, "motor": 1, "status": 1})
+        self.assertEqual(stats["gpio_inputs"], 4)
+        # Recharge LED and cleaning system, 4 pins to start the motor, 3 to stop it (AIN2 is already low)
+        self.assertEqual(stats["gpio_outputs"], 9)
+        self.assertEqual(stats["i2c_transactions"], 1)
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_detach_restores_the_robot(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.return_value = True
+        mock_ibs.return_value = 100
+        r = CleaningRobot()
+        r.initialize_robot()
+        r.obstacle_found = Mock(return_value=False)
+        instrumentation = Instrumentation(r).attach()
+        instrumentation.detach()
+        self.assertIs(r.gpio, GPIO)
+        self.assertIs(r.gpio_output.gpio, GPIO)
+        self.assertNotIn("execute_command", vars(r))
+        self.assertIsInstance(r.obstacle_found, Mock)
+        r.execute_command("f")
+        self.assertEqual(instrumentation.stats()["stages"]["command"]["count"], 0)
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_async_stages(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 100
+        r = CleaningRobot()
+        r.initialize_robot()
+        with Instrumentation(r) as instrumentation:
+            self.assertEqual(asyncio.run(r.execute_command_async("f2")), "0,2,N")
+            self.assertEqual(asyncio.run(r.execute_command_async("r")), "0,2,E")
+        stages = instrumentation.stats()["stages"]
+        self.assertEqual(stages["command"]["count"], 2)
+        self.assertEqual(stages["motor"]["count"], 2)
+        self.assertNotIn("_drive_async", vars(r))
+
+    @patch.object(cleaning_robot.BACKEND, "create_ibs")
+    @patch.object(GPIO, "input")
+    def test_attach_does_not_create_the_ibs(self, mock_input: Mock, mock_create_ibs: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_create_ibs.return_value.get_charge_left.return_value = 100
+        r = CleaningRobot()
+        instrumentation = Instrumentation(r).attach()
+        mock_create_ibs.assert_not_called()
+        r.initialize_robot()
+        self.assertEqual(r.execute_command("f"), "0,1,N")
+        mock_create_ibs.assert_called_once_with()
+        self.assertEqual(instrumentation.i2c_transactions, 1)
+        instrumentation.detach()
+        self.assertIs(r.ibs, mock_create_ibs.return_value)
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_battery_monitor_reads_are_counted(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 100
+        ibs = IBS(None)
+        r = CleaningRobot(ibs=ibs)
+        r.battery_monitor = BatteryMonitor(ibs)
+        r.initialize_robot()
+        with Instrumentation(r) as instrumentation:
+            r.battery_monitor.sample()
+            self.assertEqual(r.execute_command("f"), "0,1,N")
+        self.assertEqual(instrumentation.i2c_transactions, 1)
+        self.assertEqual(instrumentation.stats()["stages"]["battery"]["count"], 1)
+        self.assertIs(r.battery_monitor.ibs, ibs)
+        self.assertIs(r.ibs, ibs)
+
+    def test_prometheus_text(self):
+        instrumentation = Instrumentation(CleaningRobot(), buckets=(0.5,))
+        instrumentation.histograms["battery"].observe(0.25)
+        instrumentation.i2c_transactions = 3
+        text = prometheus_text({"kitchen": instrumentation})
+        self.assertIn('cleaning_robot_stage_seconds_bucket{robot="kitchen",stage="battery",le="0.5"} 1\n', text)
+        self.assertIn('cleaning_robot_stage_seconds_bucket{robot="kitchen",stage="battery",le="+Inf"} 1\n', text)
+        self.assertIn('cleaning_robot_stage_seconds_sum{robot="kitchen",stage="battery"} 0.25\n', text)
+        self.assertIn("# TYPE cleaning_robot_i2c_transactions_total counter\n", text)
+        self.assertIn('cleaning_robot_i2c_transactions_total{robot="kitchen"} 3\n', text)
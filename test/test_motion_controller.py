@@ -0,0 +1,96 @@
+import asyncio
+from unittest import TestCase
+from unittest.mock import Mock, patch, call
+
+from mock import GPIO
+from mock.ibs import IBS
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.motion_controller import MotionController
+
+
+class TestMotionController(TestCase):
+
+    def test_trapezoidal_profile(self):
+        controller = MotionController(Mock(), cruise_duty=50, acceleration=100, full_speed=4, ramp_steps=2)
+        profile = controller.profile(3)
+        self.assertEqual([duty for duty, _ in profile], [12.5, 37.5, 50, 37.5, 12.5])
+        self.assertAlmostEqual(controller.duration(3), 2.0)
+        travelled = sum(4 * duty / 100 * seconds for duty, seconds in profile)
+        self.assertAlmostEqual(travelled, 3)
+
+    def test_triangular_profile_for_short_distance(self):
+        controller = MotionController(Mock(), cruise_duty=100, acceleration=100, full_speed=1, ramp_steps=1)
+        profile = controller.profile(0.25)
+        self.assertEqual(len(profile), 2)
+        self.assertAlmostEqual(profile[0][0], 25)
+        self.assertAlmostEqual(controller.duration(0.25), 1.0)
+
+    def test_run_changes_duty_cycle(self):
+        gpio = Mock()
+        controller = MotionController(gpio, cruise_duty=50, acceleration=100, full_speed=4, ramp_steps=2)
+        sleep = Mock()
+        self.assertEqual(controller.run(16, 3, sleep), 3)
+        gpio.PWM.assert_called_once_with(16, 1000)
+        pwm = gpio.PWM.return_value
+        pwm.ChangeDutyCycle.assert_has_calls([call(12.5), call(37.5), call(50), call(37.5), call(12.5), call(0)])
+        self.assertAlmostEqual(sum(args[0] for args, _ in sleep.call_args_list), 2.0)
+
+    def test_run_stopped_by_on_step(self):
+        gpio = Mock()
+        controller = MotionController(gpio)
+        steps = []
+        self.assertEqual(controller.run(16, 5, on_step=lambda step: steps.append(step) or step < 2), 2)
+        self.assertEqual(steps, [1, 2])
+        gpio.PWM.return_value.ChangeDutyCycle.assert_called_with(0)
+
+    def test_on_step_called_when_each_step_is_reached(self):
+        controller = MotionController(Mock(), cruise_duty=50, acceleration=100, full_speed=4, ramp_steps=2)
+        elapsed = [0.0]
+        step_times = []
+
+        def sleep(seconds):
+            elapsed[0] += seconds
+
+        controller.run(16, 10, sleep, lambda step: step_times.append(elapsed[0]))
+        self.assertEqual(len(step_times), 10)
+        # 2 steps/s at cruise speed, after a ramp of 0.5 s covering half a step
+        for step, seconds in enumerate(step_times[:-1], start=1):
+            self.assertAlmostEqual(seconds, 0.5 + (step - 0.5) / 2)
+        self.assertAlmostEqual(step_times[-1], controller.duration(10))
+
+    def test_stopped_motor_ramps_down(self):
+        gpio = Mock()
+        controller = MotionController(gpio, cruise_duty=50, acceleration=100, full_speed=4, ramp_steps=2)
+        elapsed = [0.0]
+        step_times = []
+
+        def sleep(seconds):
+            elapsed[0] += seconds
+
+        self.assertEqual(controller.run(16, 5, sleep, lambda step: step_times.append(elapsed[0]) or step < 2), 2)
+        pwm = gpio.PWM.return_value
+        self.assertEqual([args[0] for args, _ in pwm.ChangeDutyCycle.call_args_list],
+                         [12.5, 37.5, 50, 37.5, 12.5, 0])
+        self.assertAlmostEqual(elapsed[0] - step_times[-1], 0.5)  # The deceleration ramp of the profile
+
+    def test_run_async(self):
+        controller = MotionController(Mock())
+        self.assertEqual(asyncio.run(controller.run_async(32, 1, realtime=False)), 1)
+
+    def test_invalid_cruise_duty(self):
+        self.assertRaises(CleaningRobotError, MotionController, Mock(), cruise_duty=120)
+
+    @patch.object(GPIO, "output")
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "obstacle_found")
+    def test_robot_moves_with_motion_controller(self, mock_obstacle: Mock, mock_ibs: Mock, mock_ccr: Mock, mock_output: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        mock_obstacle.side_effect = [False, False, True]
+        r = CleaningRobot()
+        r.motion_controller = MotionController(Mock())
+        r.initialize_robot()
+        self.assertEqual(r.execute_command("f4"), "(0,2,N)(0,3)")
+        mock_output.assert_any_call([22, 18, 33], [GPIO.HIGH, GPIO.LOW, GPIO.HIGH])
+        self.assertNotIn(16, [args[0] for args, _ in mock_output.call_args_list if not isinstance(args[0], list)])
@@ -0,0 +1,113 @@
+import time
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock import GPIO
+from mock.ibs import IBS
+from src.cleaning_robot import CleaningRobot
+from src.pipelined_executor import PipelinedExecutor
+
+
+class TestPipelinedExecutor(TestCase):
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    @patch.object(CleaningRobot, "activate_rotation_motor")
+    def run_with_draining_battery(self, pipelined: bool, commands: str, mock_rotation: Mock, mock_wheel: Mock,
+                                  mock_ibs: Mock, mock_input: Mock) -> list[str]:
+        # The battery starts at 20% and every move uses 6%
+        moves = []
+
+        def move(*args):
+            time.sleep(0.01)  # The prefetch runs meanwhile
+            moves.append(1)
+
+        mock_wheel.side_effect = mock_rotation.side_effect = move
+        mock_ibs.side_effect = lambda: 20 - 6 * len(moves)
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        r = CleaningRobot()
+        r.initialize_robot()
+        if not pipelined:
+            return list(r.execute_commands(commands))
+        with PipelinedExecutor(r) as executor:
+            return list(executor.run(commands))
+
+    def test_same_statuses_as_serial_execution(self):
+        serial = self.run_with_draining_battery(False, "frfff")
+        self.assertEqual(serial, ["0,1,N", "0,1,E", "!(0,1,E)"])
+        self.assertEqual(self.run_with_draining_battery(True, "frfff"), serial)
+
+    def test_charge_crossing_threshold_during_move(self):
+        serial = self.run_with_draining_battery(False, "ffff")
+        self.assertEqual(serial, ["0,1,N", "0,2,N", "!(0,2,N)"])
+        self.assertEqual(self.run_with_draining_battery(True, "ffff"), serial)
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    def test_container_removed_during_move(self, mock_wheel: Mock, mock_ibs: Mock, mock_input: Mock):
+        bag = [True]
+
+        def move():
+            time.sleep(0.01)  # The prefetch runs meanwhile
+            bag[0] = False
+
+        mock_wheel.side_effect = move
+        mock_ibs.return_value = 100
+        mock_input.side_effect = lambda pin: bag[0] if pin == CleaningRobot.GARBAGE_BAG_PIN else \
+            pin != CleaningRobot.INFRARED_PIN
+        r = CleaningRobot()
+        r.initialize_robot()
+        with PipelinedExecutor(r) as executor:
+            self.assertEqual(list(executor.run("fff")), ["0,1,N", "0,1,N"])
+        self.assertTrue(r.garbage_bag_led_on)
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_stops_when_resources_missing(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.SOAP_CONTAINER_PIN
+        mock_ibs.return_value = 100
+        r = CleaningRobot()
+        r.initialize_robot()
+        with PipelinedExecutor(r) as executor:
+            result = list(executor.run("ff"))
+        self.assertEqual(result, ["0,0,N"])
+        self.assertTrue(r.soap_container_led_on)
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    def test_sensors_are_read_before_motor_stops(self, mock_wheel: Mock, mock_ibs: Mock, mock_input: Mock):
+        motions_done = []
+        motions_done_at_read = []
+
+        def move():
+            time.sleep(0.05)
+            motions_done.append(True)
+
+        def charge_left():
+            motions_done_at_read.append(len(motions_done))
+            return 100
+
+        mock_wheel.side_effect = move
+        mock_ibs.side_effect = charge_left
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        r = CleaningRobot()
+        r.initialize_robot()
+        with PipelinedExecutor(r) as executor:
+            self.assertEqual(list(executor.run("fff"))[-1], "0,3,N")
+        # The readings for a step are taken before the motor of the previous step stops
+        self.assertEqual(motions_done_at_read, [0, 0, 1])
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    def test_failed_prefetch_is_read_again(self, mock_wheel: Mock, mock_ibs: Mock, mock_input: Mock):
+        mock_ibs.side_effect = [100, OSError("I2C error"), 100]
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        r = CleaningRobot()
+        r.initialize_robot()
+        with PipelinedExecutor(r) as executor:
+            self.assertEqual(list(executor.run("ff")), ["0,1,N", "0,2,N"])
+            self.assertEqual(executor.prefetch_failures, 1)
@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+import numpy as np
+
+from src.cleaning_robot import CleaningRobotError
+from src.planner import path_to_commands, plan_coverage
+from src.preview import preview
+
+
+class TestPlanner(TestCase):
+
+    def assert_covers(self, width, height, obstacles, commands, start=(0, 0, "N")):
+        grid = np.zeros((width, height), dtype=bool)
+        for cell in obstacles:
+            grid[cell] = True
+        trajectory = preview(commands, start_pose=start, obstacles=grid)
+        self.assertIsNone(trajectory.blocked_step)
+        visited = set(zip(trajectory.x.tolist(), trajectory.y.tolist())) | {start[:2]}
+        self.assertTrue(all(0 <= x < width and 0 <= y < height for x, y in visited))
+        return visited
+
+    def test_plan_empty_room(self):
+        commands = plan_coverage(3, 3)
+        self.assertEqual(commands, "ffrfrfflflff")
+        self.assertEqual(len(self.assert_covers(3, 3, [], commands)), 9)
+
+    def test_plan_room_with_obstacles(self):
+        obstacles = [(1, 1), (1, 2), (3, 0), (2, 3)]
+        commands = plan_coverage(5, 4, obstacles)
+        self.assertEqual(len(self.assert_covers(5, 4, obstacles, commands)), 16)
+
+    def test_plan_skips_unreachable_cells(self):
+        obstacles = [(2, 0), (2, 1), (2, 2)]
+        commands = plan_coverage(4, 3, obstacles)
+        self.assertEqual(len(self.assert_covers(4, 3, obstacles, commands)), 6)
+
+    def test_plan_from_start_pose(self):
+        commands = plan_coverage(2, 2, start=(1, 1, "S"))
+        self.assertEqual(len(self.assert_covers(2, 2, [], commands, start=(1, 1, "S"))), 4)
+
+    def test_plan_from_obstacle(self):
+        self.assertRaises(CleaningRobotError, plan_coverage, 2, 2, [(0, 0)])
+
+    def test_path_to_commands(self):
+        self.assertEqual(path_to_commands([(0, 0), (0, 1), (1, 1), (1, 0)], 0), ("frfrf", 2))
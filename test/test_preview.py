@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+import numpy as np
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.preview import preview
+
+
+class TestPreview(TestCase):
+
+    def test_preview(self):
+        trajectory = preview("frflf")
+        self.assertEqual(trajectory.x.tolist(), [0, 0, 1, 1, 1])
+        self.assertEqual(trajectory.y.tolist(), [1, 1, 1, 1, 2])
+        self.assertEqual([CleaningRobot.HEADINGS[h] for h in trajectory.heading], ["N", "E", "E", "N", "N"])
+        self.assertIsNone(trajectory.blocked_step)
+
+    def test_preview_from_start_pose(self):
+        trajectory = preview("lff", start_pose=(2, 3, "S"))
+        self.assertEqual((trajectory.x[-1], trajectory.y[-1], trajectory.heading[-1]), (4, 3, 1))
+
+    def test_preview_stops_at_obstacle(self):
+        obstacles = np.zeros((3, 3), dtype=bool)
+        obstacles[1, 2] = True
+        trajectory = preview("rflfff", obstacles=obstacles, origin=(0, -1))
+        self.assertEqual(trajectory.blocked_step, 3)
+        self.assertEqual(trajectory.blocked_cell, (1, 1))
+        self.assertEqual(trajectory.x.tolist(), [0, 1, 1])
+
+    def test_preview_invalid_command(self):
+        self.assertRaises(CleaningRobotError, preview, "ffx")
+
+    def test_robot_preview_does_not_move_robot(self):
+        r = CleaningRobot()
+        r.initialize_robot()
+        trajectory = r.preview("ff")
+        self.assertEqual(trajectory.y[-1], 2)
+        self.assertEqual(r.robot_status(), "0,0,N")
+
+    def test_preview_long_route(self):
+        trajectory = preview("fr" * 1_000_000)
+        self.assertEqual(len(trajectory.x), 2_000_000)
+        self.assertEqual((trajectory.x[-1], trajectory.y[-1]), (0, 0))
@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+from src.cleaning_robot import CleaningRobotError
+from src.replanner import DStarLite
+
+
+class TestDStarLite(TestCase):
+
+    def test_path(self):
+        planner = DStarLite(3, 3, (0, 0), (2, 2), obstacles=[(1, 0), (1, 1)])
+        self.assertEqual(planner.path(), [(0, 0), (0, 1), (0, 2), (1, 2), (2, 2)])
+        self.assertEqual(planner.commands("N"), "ffrff")
+
+    def test_handle_status_with_obstacle(self):
+        planner = DStarLite(3, 3, (0, 0), (0, 2))
+        self.assertEqual(planner.commands("N"), "ff")
+        commands = planner.handle_status("(0,0,N)(0,1)")
+        self.assertEqual(commands, "rflfflf")
+        self.assertNotIn((0, 1), planner.path())
+
+    def test_handle_status_after_move(self):
+        planner = DStarLite(3, 3, (0, 0), (2, 0))
+        planner.commands("E")
+        self.assertEqual(planner.handle_status("1,0,E"), "f")
+
+    def test_repair_is_local(self):
+        planner = DStarLite(60, 60, (0, 0), (59, 59))
+        planner.path()
+        expansions = planner.expansions
+        planner.handle_status("(0,0,E)(1,0)")
+        self.assertLess(planner.expansions - expansions, expansions // 10)
+        self.assertEqual(len(planner.path()), 119)
+
+    def test_unreachable_goal(self):
+        planner = DStarLite(3, 3, (0, 0), (2, 2), obstacles=[(1, 0), (1, 1), (1, 2)])
+        self.assertRaises(CleaningRobotError, planner.path)
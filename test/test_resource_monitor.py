@@ -0,0 +1,66 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch, call
+
+from mock import GPIO
+from src.cleaning_robot import CleaningRobot
+from src.resource_monitor import ResourceMonitor
+
+
+class TestResourceMonitor(TestCase):
+
+    @patch.object(GPIO, "add_event_detect")
+    @patch.object(GPIO, "input")
+    def test_start_registers_edge_detection(self, mock_input: Mock, mock_event_detect: Mock):
+        mock_input.return_value = True
+        r = CleaningRobot()
+        monitor = ResourceMonitor(r, bouncetime=50)
+        monitor.start()
+        mock_event_detect.assert_has_calls([
+            call(9, GPIO.BOTH, monitor._on_edge, 50),
+            call(10, GPIO.BOTH, monitor._on_edge, 50),
+            call(11, GPIO.BOTH, monitor._on_edge, 50)
+        ])
+        self.assertTrue(monitor.resources_available())
+
+    @patch.object(GPIO, "add_event_detect")
+    @patch.object(GPIO, "output")
+    @patch.object(GPIO, "input")
+    def test_check_cleaning_resources_reads_no_pin(self, mock_input: Mock, mock_output: Mock, mock_event_detect: Mock):
+        mock_input.return_value = True
+        r = CleaningRobot()
+        r.resource_monitor = ResourceMonitor(r)
+        r.resource_monitor.start()
+        mock_input.reset_mock()
+        mock_output.reset_mock()
+        self.assertTrue(r.check_cleaning_resources())
+        mock_input.assert_not_called()
+        mock_output.assert_not_called()
+
+    @patch.object(GPIO, "add_event_detect")
+    @patch.object(GPIO, "output")
+    @patch.object(GPIO, "input")
+    def test_edge_updates_resources_and_led(self, mock_input: Mock, mock_output: Mock, mock_event_detect: Mock):
+        mock_input.return_value = True
+        r = CleaningRobot()
+        monitor = ResourceMonitor(r, bouncetime=0)
+        monitor.start()
+        mock_input.return_value = False
+        monitor._on_edge(10)
+        mock_output.assert_called_with(7, True)
+        self.assertTrue(r.soap_container_led_on)
+        self.assertFalse(monitor.resources_available())
+
+    @patch.object(GPIO, "add_event_detect")
+    @patch.object(GPIO, "input")
+    def test_quick_edges_end_on_the_final_level(self, mock_input: Mock, mock_event_detect: Mock):
+        mock_input.return_value = True
+        r = CleaningRobot()
+        monitor = ResourceMonitor(r, bouncetime=10000)
+        monitor.start()
+        # The bag is removed and put back within the bouncetime
+        mock_input.return_value = False
+        monitor._on_edge(9)
+        mock_input.return_value = True
+        monitor._on_edge(9)
+        self.assertTrue(r.garbage_bag_resource_available)
+        self.assertTrue(monitor.resources_available())
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock import GPIO
+from mock.ibs import IBS
+from src.cleaning_robot import CleaningRobot, CleaningRobotError, RobotStatus
+from src.rms_server import BINARY_HELLO, COMMAND_HEADER, RMSClient, RMSServer, STATUS_RECORD, pack_status, unpack_status
+
+
+class TestRMSServer(TestCase):
+
+    def setUp(self):
+        self.robots = [CleaningRobot(), CleaningRobot()]
+        for robot in self.robots:
+            robot.initialize_robot()
+
+    def test_status_record_round_trip(self):
+        for status in ("1,2,N", "!(-1,2,W)", "(1,2,E)(2,2)"):
+            record = pack_status(7, RobotStatus.parse(status))
+            self.assertEqual(len(record), STATUS_RECORD.size)
+            self.assertEqual(unpack_status(record), (7, RobotStatus.parse(status)))
+        self.assertEqual(unpack_status(pack_status(8, None)), (8, None))
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_binary_pipelined_commands(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 100
+
+        async def run():
+            server = await RMSServer(self.robots).start_tcp()
+            client = await RMSClient.connect_tcp(*server.sockets[0].getsockname()[:2])
+            statuses = await client.execute_many([(0, "f"), (1, "r"), (0, "f3"), (1, "x"), (2, "f")])
+            await client.close()
+            server.close()
+            await server.wait_closed()
+            return statuses
+
+        statuses = asyncio.run(run())
+        self.assertEqual(statuses, [RobotStatus(0, 1, "N"), RobotStatus(0, 0, "E"), RobotStatus(0, 4, "N"), None, None])
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_text_mode_over_unix_socket(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN or self.robots[1].pos_y == 1
+        mock_ibs.return_value = 100
+
+        async def run(path):
+            server = await RMSServer(self.robots, threaded=True).start_unix(path)
+            client = await RMSClient.connect_unix(path, binary=False)
+            first, second = await asyncio.gather(client.execute(1, "f"), client.execute(1, "f"))
+            await client.close()
+            server.close()
+            await server.wait_closed()
+            return first, second
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(asyncio.run(run(os.path.join(directory, "rms.sock"))), ("0,1,N", "(0,1,N)(0,2)"))
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_bad_frames_do_not_drop_the_commands_in_flight(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 100
+        self.robots[1].execute_command = Mock(side_effect=RuntimeError("sensor failure"))
+        frames = [(0, b"f"), (0, b"\xff"), (1, b"f"), (0, b"r")]
+
+        async def run():
+            server = await RMSServer(self.robots, threaded=True).start_tcp()
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(BINARY_HELLO + b"".join(COMMAND_HEADER.pack(sequence, robot_index, len(command)) + command
+                                                 for sequence, (robot_index, command) in enumerate(frames)))
+            records = await reader.readexactly(len(frames) * STATUS_RECORD.size)
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return [unpack_status(records[offset:offset + STATUS_RECORD.size])
+                    for offset in range(0, len(records), STATUS_RECORD.size)]
+
+        self.assertEqual(asyncio.run(run()), [(0, RobotStatus(0, 1, "N")), (1, None), (2, None),
+                                              (3, RobotStatus(0, 1, "E"))])
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_text_mode_bad_lines(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 100
+
+        async def run():
+            server = await RMSServer(self.robots).start_tcp()
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write("\u00b2 f\n0 f\u00b2\n0 f\n".encode())
+            replies = [await reader.readline() for _ in range(3)]
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return replies
+
+        replies = asyncio.run(run())
+        self.assertTrue(replies[0].startswith(b"ERR "))
+        self.assertTrue(replies[1].startswith(b"ERR "))
+        self.assertEqual(replies[2], b"0,1,N\n")
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_pose_which_does_not_fit_the_record(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 100
+        self.robots[1].pos_x = 2 ** 31
+
+        async def run(threaded):
+            server = await RMSServer(self.robots, threaded=threaded).start_tcp()
+            client = await RMSClient.connect_tcp(*server.sockets[0].getsockname()[:2])
+            statuses = await client.execute_many([(1, "r"), (0, "f")])
+            await client.close()
+            server.close()
+            await server.wait_closed()
+            return statuses
+
+        self.assertEqual(asyncio.run(run(False)), [None, RobotStatus(0, 1, "N")])
+        self.assertEqual(asyncio.run(run(True)), [None, RobotStatus(0, 2, "N")])
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_long_binary_command(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 100
+
+        async def run():
+            server = await RMSServer(self.robots).start_tcp()
+            client = await RMSClient.connect_tcp(*server.sockets[0].getsockname()[:2])
+            try:
+                self.assertRaises(CleaningRobotError, client.send, 0, "f" * 256)
+                return await client.execute(0, "r")
+            finally:
+                await client.close()
+                server.close()
+                await server.wait_closed()
+
+        self.assertEqual(asyncio.run(run()), RobotStatus(0, 0, "E"))
@@ -0,0 +1,63 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+import numpy as np
+
+from mock.ibs import IBS
+from src.cleaning_robot import CleaningRobot
+from src.room_map import RoomMap
+
+
+class TestRoomMap(TestCase):
+
+    def test_mark_cells(self):
+        room_map = RoomMap(4, 4)
+        room_map.mark_obstacle(1, 2)
+        room_map.mark_cleaned(0, 0)
+        self.assertTrue(room_map.is_obstacle(1, 2))
+        self.assertFalse(room_map.is_cleaned(1, 2))
+        self.assertTrue(room_map.is_cleaned(0, 0))
+        self.assertFalse(room_map.is_obstacle(100, -100))
+
+    def test_grow_to_negative_coordinates(self):
+        room_map = RoomMap(4, 4)
+        room_map.mark_obstacle(3, 3)
+        room_map.mark_cleaned(-1, -6)
+        room_map.mark_cleaned(9, 0)
+        self.assertEqual(room_map.bounds()[:2], (-4, -6))
+        self.assertGreaterEqual(room_map.bounds()[2], 9)
+        self.assertTrue(room_map.is_obstacle(3, 3))
+        self.assertTrue(room_map.is_cleaned(-1, -6))
+        self.assertTrue(room_map.is_cleaned(9, 0))
+
+    def test_save_and_load(self):
+        room_map = RoomMap(4, 4, origin=(-2, -2))
+        room_map.mark_obstacle(-2, 1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "room.map")
+            room_map.save(path)
+            loaded = RoomMap.load(path)
+            self.assertIsInstance(loaded.grid, np.memmap)
+            self.assertTrue(loaded.is_obstacle(-2, 1))
+            loaded.mark_cleaned(1, 1)
+            loaded.grid.flush()
+            del loaded
+            self.assertTrue(RoomMap.load(path, mmap=False).is_cleaned(1, 1))
+
+    @patch.object(CleaningRobot, "check_cleaning_resources")
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(CleaningRobot, "obstacle_found")
+    @patch.object(CleaningRobot, "activate_wheel_motor")
+    def test_robot_records_into_map(self, mock_wheel: Mock, mock_obstacle: Mock, mock_ibs: Mock, mock_ccr: Mock):
+        mock_ibs.return_value = 100
+        mock_ccr.return_value = True
+        mock_obstacle.side_effect = [False, True]
+        r = CleaningRobot()
+        r.room_map = RoomMap()
+        r.initialize_robot()
+        list(r.execute_commands("ff"))
+        self.assertTrue(r.room_map.is_cleaned(0, 0))
+        self.assertTrue(r.room_map.is_cleaned(0, 1))
+        self.assertTrue(r.room_map.is_obstacle(0, 2))
@@ -0,0 +1,111 @@
+import multiprocessing
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock import GPIO
+from mock.ibs import IBS
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.shared_room_map import SharedRoomMap
+
+
+def _explore(shared_map: SharedRoomMap, robot_id: int, results) -> None:
+    shared_map.mark_obstacle(3, 4)
+    shared_map.mark_cleaned(1, 1)
+    results.put(shared_map.reserve(2, 2, robot_id))
+    shared_map.close()
+
+
+class TestSharedRoomMap(TestCase):
+
+    def setUp(self):
+        self.shared_map = SharedRoomMap(8, 8, origin=(-2, -2))
+
+    def tearDown(self):
+        self.shared_map.close()
+        self.shared_map.unlink()
+
+    def test_layers(self):
+        self.shared_map.mark_obstacle(-2, 5)
+        self.shared_map.mark_cleaned(0, 0)
+        self.shared_map.mark_cleaned(-2, 5)
+        self.assertTrue(self.shared_map.is_obstacle(-2, 5))
+        self.assertTrue(self.shared_map.is_cleaned(0, 0))
+        self.assertEqual(self.shared_map.cell(-2, 5), SharedRoomMap.OBSTACLE | SharedRoomMap.CLEANED)
+        self.assertEqual(self.shared_map.cell(100, 0), 0)
+        self.assertEqual(self.shared_map.bounds(), (-2, -2, 5, 5))
+        self.shared_map.mark_cleaned(6, 0)
+        self.shared_map.mark_obstacle(6, 0)
+        self.assertEqual(self.shared_map.cell(6, 0), 0)
+        self.assertEqual(self.shared_map.version, 1)
+
+    def test_version_counts_new_obstacles(self):
+        self.shared_map.mark_obstacle(1, 1)
+        self.shared_map.mark_obstacle(1, 1)
+        self.shared_map.mark_obstacle(1, 2)
+        self.assertEqual(self.shared_map.version, 2)
+
+    def test_reservations(self):
+        self.assertTrue(self.shared_map.reserve(1, 1, 1))
+        self.assertTrue(self.shared_map.reserve(1, 1, 1))
+        self.assertFalse(self.shared_map.reserve(1, 1, 2))
+        self.shared_map.release(1, 1, 2)
+        self.assertEqual(self.shared_map.reserved_by(1, 1), 1)
+        self.shared_map.release(1, 1, 1)
+        self.assertTrue(self.shared_map.reserve(1, 1, 2))
+        self.assertTrue(self.shared_map.reserve(6, 0, 1))
+        self.assertIsNone(self.shared_map.reserved_by(6, 0))
+        self.assertRaises(CleaningRobotError, self.shared_map.reserve, 1, 1, 0)
+
+    def test_claims_hold_current_and_next_cell(self):
+        claims = self.shared_map.claims(7)
+        claims.claim(0, 0)
+        claims.claim(0, 1)
+        self.assertEqual(claims.held, [(0, 0), (0, 1)])
+        claims.arrived(0, 1)
+        self.assertIsNone(self.shared_map.reserved_by(0, 0))
+        self.assertEqual(claims.held, [(0, 1)])
+
+    def test_shared_with_other_process(self):
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_explore, args=(self.shared_map, 2, results))
+        process.start()
+        self.assertTrue(results.get(timeout=10))
+        process.join(10)
+        self.assertTrue(self.shared_map.is_obstacle(3, 4))
+        self.assertTrue(self.shared_map.is_cleaned(1, 1))
+        self.assertEqual(self.shared_map.version, 1)
+        self.assertFalse(self.shared_map.reserve(2, 2, 1))
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_robot_does_not_enter_cell_claimed_by_another_robot(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 100
+        self.shared_map.reserve(0, 3, 2)
+        r = CleaningRobot()
+        r.room_map = self.shared_map
+        r.cell_claims = self.shared_map.claims(1)
+        r.initialize_robot()
+        self.assertEqual(r.execute_command("f5"), "(0,2,N)(0,3)")
+        self.assertFalse(self.shared_map.is_obstacle(0, 3))
+        self.assertTrue(self.shared_map.is_cleaned(0, 2))
+        self.assertEqual(r.cell_claims.held, [(0, 2)])
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_robot_stops_at_the_wall_of_the_shared_map(self, mock_ibs: Mock, mock_input: Mock):
+        mock_ibs.return_value = 100
+        shared_map = SharedRoomMap(3, 3)
+        try:
+            r = CleaningRobot()
+            r.room_map = shared_map
+            r.cell_claims = shared_map.claims(1)
+            mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN or r.pos_y == 2
+            r.initialize_robot()
+            self.assertEqual(r.execute_command("f5"), "(0,2,N)(0,3)")
+            self.assertFalse(shared_map.is_obstacle(0, 3))
+            self.assertTrue(shared_map.is_cleaned(0, 2))
+            self.assertEqual(r.cell_claims.held, [(0, 2)])
+        finally:
+            shared_map.close()
+            shared_map.unlink()
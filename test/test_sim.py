@@ -0,0 +1,80 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+import sim.GPIO as SIM_GPIO
+from sim.world import SimWorld
+from src.cleaning_robot import CleaningRobot
+from src.hardware import BACKENDS
+from src.resource_monitor import ResourceMonitor
+
+
+@patch("src.cleaning_robot.BACKEND", BACKENDS["sim"])
+@patch("src.cleaning_robot.GPIO", SIM_GPIO)
+class TestSimulatedRobot(TestCase):
+
+    def test_infrared_follows_the_pose(self):
+        SIM_GPIO.use_world(SimWorld(obstacles={(0, 2)}))
+        r = CleaningRobot()
+        r.initialize_robot()
+        self.assertEqual(r.execute_command("f"), "0,1,N")
+        self.assertEqual(r.execute_command("f"), "(0,1,N)(0,2)")
+        self.assertEqual(SIM_GPIO.world.pose, (0, 1, "N"))
+
+    def test_rotations_and_moves_drive_the_body(self):
+        world = SIM_GPIO.use_world(SimWorld(size=(3, 3)))
+        r = CleaningRobot()
+        r.initialize_robot()
+        self.assertEqual(list(r.execute_commands("rfflf")), ["0,0,E", "1,0,E", "2,0,E", "2,0,N", "2,1,N"])
+        self.assertEqual(world.pose, (2, 1, "N"))
+        self.assertEqual(r.execute_command("r"), "2,1,E")
+        self.assertEqual(r.execute_command("f"), "(2,1,E)(3,1)")
+        self.assertEqual(world.collisions, 0)
+
+    def test_run_length_move_stops_in_front_of_obstacle(self):
+        world = SIM_GPIO.use_world(SimWorld(obstacles={(0, 3)}))
+        r = CleaningRobot()
+        r.initialize_robot()
+        self.assertEqual(r.execute_command("f5"), "(0,2,N)(0,3)")
+        self.assertEqual(world.pose, (0, 2, "N"))
+        self.assertEqual(world.activations, 1)
+
+    def test_battery_drains_per_activation(self):
+        SIM_GPIO.use_world(SimWorld(charge=10.5, drain=1))
+        r = CleaningRobot()
+        r.initialize_robot()
+        self.assertEqual(r.execute_command("f"), "0,1,N")
+        self.assertEqual(r.execute_command("f"), "!(0,1,N)")
+        self.assertTrue(r.recharge_led_on)
+
+    def test_scripted_container_event_reaches_resource_monitor(self):
+        SIM_GPIO.use_world(SimWorld(events=[(2, CleaningRobot.SOAP_CONTAINER_PIN, SIM_GPIO.LOW)]))
+        r = CleaningRobot()
+        r.initialize_robot()
+        monitor = ResourceMonitor(r, bouncetime=0)
+        monitor.start()
+        self.assertEqual(list(r.execute_commands("fff")), ["0,1,N", "0,2,N", "0,2,N"])
+        self.assertTrue(r.soap_container_led_on)
+
+
+class TestSimWorld(TestCase):
+
+    def test_bulk_output_sets_levels(self):
+        world = SimWorld()
+        world.output([6, 7, 8], [1, 0, 1])
+        world.output([12, 13], 1)
+        self.assertEqual([world.input(pin) for pin in (6, 7, 8, 12, 13)], [1, 0, 1, 1, 1])
+
+    def test_callbacks_filtered_by_edge(self):
+        world = SimWorld()
+        callback = Mock()
+        world.add_event_detect(9, 32, callback)
+        world.set_input(9, 0)
+        world.set_input(9, 1)
+        callback.assert_called_once_with(9)
+
+    def test_move_into_wall_is_refused(self):
+        world = SimWorld(size=(1, 1))
+        world.output([22, 18, 33], [1, 0, 1])
+        world.output([22, 18, 33], [0, 0, 0])
+        self.assertEqual(world.pose, (0, 0, "N"))
+        self.assertEqual(world.collisions, 1)
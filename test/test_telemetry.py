@@ -0,0 +1,96 @@
+import asyncio
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock import GPIO
+from mock.ibs import IBS
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.telemetry import BLOCKED, GARBAGE_BAG_OK, RECHARGE, SOAP_CONTAINER_OK, WATER_CONTAINER_OK, TelemetryLog
+
+
+class TestTelemetryLog(TestCase):
+
+    def make_robot(self, capacity: int) -> CleaningRobot:
+        r = CleaningRobot()
+        r.telemetry = TelemetryLog(capacity)
+        r.initialize_robot()
+        return r
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_records_steps(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN or r.pos_y == 1
+        mock_ibs.side_effect = [50, 40, 40, 5]
+        r = self.make_robot(8)
+        for command in ("f", "f", "r", "f3"):
+            r.execute_command(command)
+        records = r.telemetry.latest()
+        resources = GARBAGE_BAG_OK | SOAP_CONTAINER_OK | WATER_CONTAINER_OK
+        self.assertEqual(records["action"].tolist(), [b"f", b"f", b"r", b"f"])
+        self.assertEqual(records["repeat"].tolist(), [1, 1, 1, 3])
+        self.assertEqual(records["y"].tolist(), [1, 1, 1, 1])
+        self.assertEqual(records["heading"].tolist(), [0, 0, 1, 1])
+        self.assertEqual(records["charge"].tolist(), [50, 40, 40, 5])
+        self.assertEqual(records["flags"].tolist(), [resources, resources | BLOCKED, resources, resources | RECHARGE])
+        self.assertTrue((records["duration"] >= 0).all())
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_records_moves_outside_execute_command(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 100
+        r = self.make_robot(8)
+        r.move_forward(2)
+        asyncio.run(r.execute_command_async("r"))
+        asyncio.run(r.move_forward_async(3))
+        records = r.telemetry.latest()
+        self.assertEqual(records["action"].tolist(), [b"f", b"r", b"f"])
+        self.assertEqual(records["repeat"].tolist(), [2, 1, 3])
+        self.assertEqual(records["x"].tolist(), [0, 0, 3])
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_long_run_length_commands(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN or r.pos_y == 3
+        mock_ibs.return_value = 100
+        r = self.make_robot(8)
+        self.assertEqual(r.execute_command("f12345"), "(0,3,N)(0,4)")
+        self.assertEqual(r.execute_command("f0000001"), "(0,3,N)(0,4)")
+        records = r.telemetry.latest()
+        self.assertEqual(records["action"].tolist(), [b"f", b"f"])
+        self.assertEqual(records["repeat"].tolist(), [12345, 1])
+        self.assertRaises(CleaningRobotError, r.telemetry.record, r, "f4294967296", "0,3,N", 0.0)
+        self.assertEqual(len(r.telemetry), 2)
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_ring_buffer_keeps_latest(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 100
+        r = self.make_robot(3)
+        for _ in range(5):
+            r.execute_command("f")
+        self.assertEqual(len(r.telemetry), 3)
+        self.assertEqual(r.telemetry.latest()["y"].tolist(), [3, 4, 5])
+        self.assertEqual(r.telemetry.latest(2)["y"].tolist(), [4, 5])
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_flush_appends_and_load_maps(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.return_value = 100
+        r = self.make_robot(4)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "telemetry.bin")
+            r.execute_command("f")
+            self.assertEqual(r.telemetry.flush(path), 1)
+            for _ in range(6):
+                r.execute_command("f")
+            self.assertEqual(r.telemetry.flush(path), 4)
+            self.assertEqual(r.telemetry.dropped, 2)
+            records = TelemetryLog.load(path)
+            self.assertEqual(records["y"].tolist(), [1, 4, 5, 6, 7])
+            self.assertEqual(TelemetryLog.load(path, mmap=False)["y"].tolist(), [1, 4, 5, 6, 7])
+            del records
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock import GPIO
+from mock.ibs import IBS
+from src.battery_monitor import BatteryMonitor
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.docking import DockRouter
+from src.resource_monitor import ResourceMonitor
+from src.room_map import RoomMap
+from src.trace import BATCH, BATCH_COMMAND, CHARGE, COMMAND, INITIALIZE, INPUT, LEVEL, MOVE, OUTPUT_MANY, \
+    POLLED_CHARGE, STATUS, TraceWriter, read_trace, recording_robot, replay
+
+
+class TestTrace(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "session.trace")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def record_session(self, mock_ibs: Mock, mock_input: Mock) -> list[str]:
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN or r.pos_y == 2
+        mock_ibs.side_effect = [80, 80, 70, 60, 5]
+        with TraceWriter(self.path) as writer:
+            r = recording_robot(writer)
+            r.initialize_robot()
+            statuses = [r.execute_command(command) for command in ("f", "f", "f")]
+            self.assertRaises(CleaningRobotError, r.execute_command, "x")
+            statuses.append(r.execute_command("r"))
+        return statuses
+
+    def test_trace_events(self):
+        self.record_session()
+        events = list(read_trace(self.path))
+        self.assertEqual(events[0], (INITIALIZE, ()))
+        self.assertEqual(events[1], (INPUT, (CleaningRobot.GARBAGE_BAG_PIN, 1)))
+        self.assertIn((COMMAND, ("f",)), events)
+        self.assertIn((CHARGE, (80,)), events)
+        self.assertIn((STATUS, ("(0,2,N)(0,3)",)), events)
+        self.assertIn((STATUS, ("ERR Invalid command",)), events)
+        self.assertIn((OUTPUT_MANY, ([CleaningRobot.AIN1, CleaningRobot.AIN2, CleaningRobot.PWMA, CleaningRobot.STBY],
+                                     [1, 0, 1, 1])), events)
+
+    def test_replay_gives_same_statuses(self):
+        statuses = self.record_session()
+        self.assertEqual(statuses, ["0,1,N", "0,2,N", "(0,2,N)(0,3)", "!(0,2,N)"])
+        report = replay(self.path)
+        self.assertEqual(report.commands, ["f", "f", "f", "x", "r"])
+        self.assertEqual(report.replayed, report.recorded)
+        self.assertEqual(report.mismatches, [])
+
+    def test_replay_reports_changed_statuses(self):
+        self.record_session()
+
+        class NewBuild(CleaningRobot):
+            def robot_status(self) -> str:
+                return f"{self.pos_x};{self.pos_y};{self.heading}"
+
+        report = replay(self.path, NewBuild)
+        self.assertEqual(report.mismatches, [(0, "f", "0,1,N", "0;1;N"), (1, "f", "0,2,N", "0;2;N")])
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_replay_batches_and_moves(self, mock_ibs: Mock, mock_input: Mock):
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN
+        mock_ibs.side_effect = [80, 70, 5]
+        def setup(robot: CleaningRobot) -> None:
+            robot.room_map = RoomMap()
+            robot.dock_router = DockRouter(robot.room_map)
+
+        with TraceWriter(self.path) as writer:
+            r = recording_robot(writer)
+            setup(r)
+            r.initialize_robot()
+            statuses = list(r.execute_commands("frff", refresh_every=2))
+            statuses.append(r.move_forward(2))
+            statuses.append(r.execute_command("f"))
+            statuses.append(r.return_to_dock())
+        self.assertEqual(statuses, ["0,1,N", "0,1,E", "1,1,E", "2,1,E", "4,1,E", "!(4,1,E)", "0,0,W"])
+        events = list(read_trace(self.path))
+        self.assertIn((BATCH, (2, False)), events)
+        self.assertIn((BATCH_COMMAND, ("r",)), events)
+        self.assertIn((MOVE, (2,)), events)
+
+        with patch("src.cleaning_robot.DEPLOYMENT", True), patch("time.sleep") as mock_sleep:
+            report = replay(self.path, setup=setup)
+        mock_sleep.assert_not_called()
+        self.assertEqual(report.commands, ["f", "r", "f", "f", "f2", "f", "return_to_dock"])
+        self.assertEqual(report.replayed, report.recorded)
+        self.assertEqual(report.replayed[-1], "0,0,W")
+        self.assertEqual(replay(self.path).replayed[-1], "ERR No dock router")
+
+    @patch.object(GPIO, "input")
+    @patch.object(IBS, "get_charge_left")
+    def test_replay_with_monitors(self, mock_ibs: Mock, mock_input: Mock):
+        garbage_bag = [True]
+        mock_input.side_effect = lambda pin: pin != CleaningRobot.INFRARED_PIN and (
+            pin != CleaningRobot.GARBAGE_BAG_PIN or garbage_bag[0])
+        mock_ibs.return_value = 80
+        with TraceWriter(self.path) as writer:
+            r = recording_robot(writer)
+            r.battery_monitor = BatteryMonitor(r.ibs)
+            r.battery_monitor.sample()
+            r.resource_monitor = ResourceMonitor(r)
+            r.resource_monitor.start()
+            r.initialize_robot()
+            statuses = [r.execute_command("f"), r.execute_command("f")]
+            garbage_bag[0] = False
+            edge = threading.Thread(target=r.resource_monitor._on_edge, args=(CleaningRobot.GARBAGE_BAG_PIN,))
+            edge.start()
+            edge.join()
+            statuses.append(r.execute_command("f"))
+            statuses.extend(r.execute_commands("ff"))
+        self.assertEqual(mock_ibs.call_count, 1)
+        self.assertEqual(statuses, ["0,1,N", "0,2,N", "0,2,N", "0,2,N"])  # No garbage bag after the edge
+        events = list(read_trace(self.path))
+        self.assertIn((POLLED_CHARGE, (80,)), events)
+        self.assertIn((LEVEL, (CleaningRobot.GARBAGE_BAG_PIN, 0)), events)
+        self.assertNotIn((CHARGE, (80,)), events)
+
+        report = replay(self.path)
+        self.assertEqual(report.commands, ["f", "f", "f", "f"])
+        self.assertEqual(report.recorded, statuses)
+        self.assertEqual(report.replayed, statuses)